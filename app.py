@@ -28,14 +28,33 @@ def create_app():
 
     
     
+    # Prometheus metrics - before db.init_app so the pool is instrumented
+    from utils.metrics import init_metrics
+    init_metrics(app)
+    
     # Initialize extensions with the app instance
     # This pattern allows for multiple app instances and easier testing
     db.init_app(app)  # Configure SQLAlchemy with app
     jwt.init_app(app)  # Configure JWT authentication
     mail.init_app(app)  # Set up email service
     migrate.init_app(app, db)  # Set up database migrations
+    
+    # Role claims in tokens + revocation list for deleted/demoted principals
+    from utils.auth import init_auth
+    init_auth(jwt)
+    
+    # Counter-cache columns (applications_count, payments_made, ...) follow ORM writes
+    import utils.counters  # noqa: F401 - registers mapper events
+    import utils.matching  # noqa: F401 - keeps the match index in step
+    import utils.search  # noqa: F401 - keeps the listing full-text index in step
+    import utils.facets  # noqa: F401 - invalidates cached facet counts
     with app.app_context():
         upgrade()  # Apply any pending database migrations at startup
+    
+    # Per-request query count / DB time (after upgrade(), whose logging
+    # fileConfig would otherwise disable the profiler's logger)
+    from utils.query_profiler import init_query_profiler
+    init_query_profiler(app)
 
     # Configure CORS (Cross-Origin Resource Sharing)
     # This allows the frontend (React/Vue) to communicate with the backend API
@@ -100,22 +119,31 @@ def create_app():
     except Exception as e:
         print(f"❌ Failed to register payment routes: {e}")
     
+    try:
+        from routes.exports import exports_bp
+        app.register_blueprint(exports_bp, url_prefix='/api/exports')
+        print("✅ Export routes registered")
+    except Exception as e:
+        print(f"❌ Failed to register export routes: {e}")
+    
     # Role-based middleware
     def token_required(allowed_roles=None):
         def decorator(f):
             @wraps(f)
             @jwt_required()
             def decorated_function(*args, **kwargs):
-                user_id = get_jwt_identity()
-                from models import User
-                user = User.query.get_or_404(user_id)
+                # Role comes from the token claims - no per-request user lookup
+                from utils.auth import current_principal
+                principal = current_principal()
+                if principal is None:
+                    return jsonify({'error': 'User not found'}), 404
                 
-                user_role = user.role.value
+                user_role = principal['role']
                 
                 if allowed_roles and user_role not in allowed_roles:
                     return jsonify({'error': f'Access denied. Required roles: {", ".join(allowed_roles)}'}), 403
                 
-                request.current_user = {'user_id': user.id, 'email': user.email, 'role': user_role}
+                request.current_user = {'user_id': principal['id'], 'email': principal['email'], 'role': user_role}
                 return f(*args, **kwargs)
             return decorated_function
         return decorator
@@ -143,15 +171,31 @@ def create_app():
                 }
             }), 400
         
+        # Throttle before any lookup or password hash is spent on the attempt
+        from utils.ratelimit import check_login_rate
+        retry_after = check_login_rate(email)
+        if retry_after:
+            return jsonify({
+                "success": False,
+                "modal": {
+                    "type": "error",
+                    "title": "Too Many Attempts",
+                    "message": f"Too many login attempts. Please try again in {retry_after} seconds."
+                }
+            }), 429, {'Retry-After': str(retry_after)}
+        
         # Import models here to avoid circular imports
         from models import User, Lender, Buyer, Admin
+        from utils.auth import create_principal_token
+        from utils.passwords import rehash_on_login
         
         # Check User table (legacy admin users)
         # This table contains the original admin users before separate tables were created
         user = User.query.filter_by(email=email).first()
         if user and password and user.check_password(password):
+            rehash_on_login(user, password)
             # Create JWT token with 'U' prefix to identify legacy users
-            token = create_access_token(identity=f"U{user.id}")
+            token = create_principal_token(user)
             return jsonify({
                 "success": True,
                 "user": {
@@ -167,7 +211,8 @@ def create_app():
         # Check Buyer table
         buyer = Buyer.query.filter_by(email=email).first()
         if buyer and password and buyer.check_password(password):
-            token = create_access_token(identity=f"B{buyer.id}")
+            rehash_on_login(buyer, password)
+            token = create_principal_token(buyer)
             return jsonify({
                 "success": True,
                 "user": {
@@ -183,7 +228,8 @@ def create_app():
         # Check Admin table
         admin = Admin.query.filter_by(email=email).first()
         if admin and password and admin.check_password(password):
-            token = create_access_token(identity=f"A{admin.id}")
+            rehash_on_login(admin, password)
+            token = create_principal_token(admin)
             return jsonify({
                 "success": True,
                 "user": {
@@ -199,7 +245,8 @@ def create_app():
         # Check Lender table
         lender = Lender.query.filter_by(email=email).first()
         if lender and password and lender.check_password(password):
-            token = create_access_token(identity=f"L{lender.id}")
+            rehash_on_login(lender, password)
+            token = create_principal_token(lender)
             return jsonify({
                 "success": True,
                 "user": {
@@ -240,6 +287,7 @@ def create_app():
             }), 400
         
         from models import User, UserRole, Lender, Buyer, Admin
+        from utils.auth import create_principal_token
         
         # Check if email exists in any table
         if (User.query.filter_by(email=email).first() or 
@@ -266,7 +314,7 @@ def create_app():
             db.session.add(buyer)
             db.session.commit()
             
-            token = create_access_token(identity=f"B{buyer.id}")
+            token = create_principal_token(buyer)
             return jsonify({
                 "success": True,
                 "user": {
@@ -289,7 +337,7 @@ def create_app():
             db.session.add(admin)
             db.session.commit()
             
-            token = create_access_token(identity=f"A{admin.id}")
+            token = create_principal_token(admin)
             return jsonify({
                 "success": True,
                 "user": {
@@ -313,7 +361,7 @@ def create_app():
             db.session.add(lender)
             db.session.commit()
             
-            token = create_access_token(identity=f"L{lender.id}")
+            token = create_principal_token(lender)
             return jsonify({
                 "success": True,
                 "user": {
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Nightly archiver: move REJECTED and EXPIRED mortgage applications not updated
+for APPLICATION_ARCHIVE_AFTER_DAYS into mortgage_applications_archive, so
+lender inboxes and the duplicate check only scan live work.
+
+Schedule it once a day, e.g. cron: 45 0 * * * python archive_applications.py
+"""
+
+import argparse
+from datetime import date
+
+from app import create_app
+from utils.archive import archive_applications, archive_status
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive settled mortgage applications')
+    parser.add_argument('--as-of', type=date.fromisoformat, help='Reference date (default today)')
+    parser.add_argument('--batch-size', type=int, help='Applications per batch (default APPLICATION_ARCHIVE_BATCH_SIZE)')
+    parser.add_argument('--dry-run', action='store_true', help='Count what would move without writing')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        try:
+            stats = archive_applications(args.as_of, args.batch_size, dry_run=args.dry_run)
+        except Exception as e:
+            print(f"❌ Archiving failed: {e}")
+            raise SystemExit(1)
+        verb = 'Would archive' if args.dry_run else 'Archived'
+        print(f"✅ {verb} {stats['rows']} applications last updated before {stats['cutoff']} "
+              f"({stats['batches']} batches)")
+        status = archive_status()
+        print(f"   mortgage_applications: {status['hotApplications']} rows, "
+              f"archive: {status['archivedApplications']} rows")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Nightly archiver: move the payment_schedules rows of mortgages closed more
+than PAYMENT_ARCHIVE_AFTER_DAYS ago into payment_schedules_archive, keeping
+the hot table to loans that can still change.
+
+Schedule it once a day after run_delinquency.py (which completes paid-off
+mortgages), e.g. cron: 30 0 * * * python archive_payment_schedules.py
+"""
+
+import argparse
+from datetime import date
+
+from app import create_app
+from utils.archive import archive_payment_schedules, archive_status
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive payment schedules of closed mortgages')
+    parser.add_argument('--as-of', type=date.fromisoformat, help='Reference date (default today)')
+    parser.add_argument('--batch-size', type=int, help='Mortgages per batch (default PAYMENT_ARCHIVE_BATCH_SIZE)')
+    parser.add_argument('--dry-run', action='store_true', help='Count what would move without writing')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        try:
+            stats = archive_payment_schedules(args.as_of, args.batch_size, dry_run=args.dry_run)
+        except Exception as e:
+            print(f"❌ Archiving failed: {e}")
+            raise SystemExit(1)
+        verb = 'Would archive' if args.dry_run else 'Archived'
+        print(f"✅ {verb} {stats['rows']} installments of {stats['mortgages']} mortgages "
+              f"closed before {stats['cutoff']} ({stats['batches']} batches)")
+        status = archive_status()
+        print(f"   payment_schedules: {status['hotRows']} rows, archive: {status['archivedRows']} rows "
+              f"({status['archivedMortgages']} mortgages)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Concurrent approval load test for POST /api/lender/applications/<id>/approve.
+
+Creates --listings fresh listings for a benchmark lender, each with
+--applicants competing PENDING applications, then fires an approval for every
+application at once from --threads threads, in shuffled order. Afterwards each
+listing must have exactly one ActiveMortgage, one APPROVED application and
+every other application REJECTED; the script exits with status 1 otherwise.
+
+Reports approval throughput (successful approvals per second), request
+latency and the status-code mix (a 409 is a correctly refused loser).
+
+    DATABASE_URL=postgresql://localhost/netlend_bench \\
+        python -m benchmarks.approval_concurrency --listings 50 --applicants 5 --threads 16
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import func
+
+from app import create_app, db
+from models import (
+    ActiveMortgage, ApplicationStatus, KenyanCounty, Lender, MortgageApplication, MortgageListing,
+    PaymentSchedule, PropertyType
+)
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+BENCH_LENDER_EMAIL = 'bench-approvals@netlend.test'
+
+
+def _percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def prepare(listings, applicants, repayment_years):
+    """Create the listings and applications; returns (lender token, {listing id: [application ids]})"""
+    lender = Lender.query.filter_by(email=BENCH_LENDER_EMAIL).first()
+    if lender is None:
+        lender = Lender(institution_name='Approval Bench Bank', contact_person='Bench', email=BENCH_LENDER_EMAIL)
+        lender.set_password('benchmark-password')
+        db.session.add(lender)
+        db.session.flush()
+
+    created = [MortgageListing(
+        lender_id=lender.id, property_title=f'Approval bench house {i}', property_type=PropertyType.APARTMENT,
+        address='Bench Road', county=KenyanCounty.NAIROBI, price_range=6000000, interest_rate=12,
+        repayment_period=repayment_years, down_payment=1000000
+    ) for i in range(listings)]
+    db.session.add_all(created)
+    db.session.flush()
+
+    applications = {}
+    for listing in created:
+        rows = [MortgageApplication(
+            borrower_id=1_000_000 + j, lender_id=lender.id, listing_id=listing.id,
+            requested_amount=5000000, repayment_years=repayment_years
+        ) for j in range(applicants)]
+        db.session.add_all(rows)
+        db.session.flush()
+        applications[listing.id] = [row.id for row in rows]
+    db.session.commit()
+    return create_access_token(identity=f'L{lender.id}'), applications
+
+
+def _approve(app, token, application_id):
+    client = app.test_client()
+    with app.app_context():
+        started = time.perf_counter()
+        response = client.post(f'/api/lender/applications/{application_id}/approve',
+                               headers={'Authorization': f'Bearer {token}'})
+        elapsed = time.perf_counter() - started
+        db.session.remove()
+    return elapsed, response.status_code
+
+
+def verify(applications, repayment_years):
+    """Correctness violations per listing (empty when every listing has one winner)"""
+    listing_ids = list(applications)
+    mortgages = dict(db.session.query(MortgageApplication.listing_id, func.count(ActiveMortgage.id)).join(
+        ActiveMortgage, ActiveMortgage.application_id == MortgageApplication.id
+    ).filter(MortgageApplication.listing_id.in_(listing_ids)).group_by(MortgageApplication.listing_id).all())
+    statuses = Counter(db.session.query(MortgageApplication.listing_id, MortgageApplication.status).filter(
+        MortgageApplication.listing_id.in_(listing_ids)
+    ).all())
+    schedule_rows = dict(db.session.query(MortgageApplication.listing_id, func.count(PaymentSchedule.id)).join(
+        ActiveMortgage, ActiveMortgage.application_id == MortgageApplication.id
+    ).join(PaymentSchedule, PaymentSchedule.mortgage_id == ActiveMortgage.id).filter(
+        MortgageApplication.listing_id.in_(listing_ids)
+    ).group_by(MortgageApplication.listing_id).all())
+
+    violations = {}
+    for listing_id, application_ids in applications.items():
+        problems = []
+        if mortgages.get(listing_id, 0) != 1:
+            problems.append(f'{mortgages.get(listing_id, 0)} mortgages')
+        if statuses[(listing_id, ApplicationStatus.APPROVED)] != 1:
+            problems.append(f'{statuses[(listing_id, ApplicationStatus.APPROVED)]} approved applications')
+        if statuses[(listing_id, ApplicationStatus.REJECTED)] != len(application_ids) - 1:
+            problems.append(f'{statuses[(listing_id, ApplicationStatus.REJECTED)]} rejected applications')
+        if schedule_rows.get(listing_id, 0) != repayment_years * 12 + 1:
+            problems.append(f'{schedule_rows.get(listing_id, 0)} schedule rows')
+        if problems:
+            violations[listing_id] = problems
+    return violations
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Load-test concurrent approvals of competing applications')
+    parser.add_argument('--listings', type=int, default=50)
+    parser.add_argument('--applicants', type=int, default=5, help='Competing applications per listing')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--repayment-years', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--label', default='approval-concurrency')
+    parser.add_argument('-o', '--output', help='Results file (defaults to benchmarks/results/<label>.json)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    app = create_app()
+    app.logger.setLevel(logging.CRITICAL)
+    logging.getLogger('netlend.queries').setLevel(logging.WARNING)
+
+    with app.app_context():
+        token, applications = prepare(args.listings, args.applicants, args.repayment_years)
+        database = db.engine.dialect.name
+    requests = [application_id for ids in applications.values() for application_id in ids]
+    random.Random(args.seed).shuffle(requests)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        samples = list(pool.map(lambda application_id: _approve(app, token, application_id), requests))
+    wall = time.perf_counter() - started
+
+    with app.app_context():
+        violations = verify(applications, args.repayment_years)
+
+    latencies = sorted(s[0] * 1000 for s in samples)
+    codes = Counter(str(s[1]) for s in samples)
+    result = {
+        'label': args.label,
+        'created_at': datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'database': database,
+        'settings': {k: v for k, v in vars(args).items() if k not in ('label', 'output')},
+        'requests': len(samples),
+        'wall_seconds': round(wall, 3),
+        'approvals_per_second': round(codes.get('200', 0) / wall, 2),
+        'requests_per_second': round(len(samples) / wall, 2),
+        'p50_ms': round(_percentile(latencies, 50), 3),
+        'p95_ms': round(_percentile(latencies, 95), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'status_codes': dict(codes),
+        'violations': {str(k): v for k, v in violations.items()}
+    }
+    print(f"{len(samples)} approvals over {args.listings} listings with {args.threads} threads ({database})")
+    print(f"{result['approvals_per_second']:.1f} approvals/s  {result['requests_per_second']:.1f} req/s  "
+          f"p50 {result['p50_ms']:.1f}ms  p95 {result['p95_ms']:.1f}ms  codes {dict(codes)}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f'{args.label}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+    if violations:
+        print(f"❌ {len(violations)} listings broke the one-winner rule, e.g. "
+              f"{next(iter(violations.items()))}")
+        raise SystemExit(1)
+    print(f"✅ Every listing has exactly one approved application; results written to {output}")
+
+if __name__ == '__main__':
+    main()
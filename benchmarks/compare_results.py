@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark results files (e.g. main vs a feature branch).
+
+    python -m benchmarks.compare_results benchmarks/results/main.json \\
+        benchmarks/results/my-branch.json --fail-on-regression 15
+
+Positive deltas on latency are regressions; positive deltas on throughput are
+improvements. With --fail-on-regression the exit code is 1 if any scenario's
+p95 got slower by more than the given percentage.
+"""
+
+import argparse
+import json
+import sys
+
+
+def _delta(base, head):
+    if base in (None, 0) or head is None:
+        return None
+    return (head - base) / base * 100
+
+
+def _fmt_delta(value):
+    return '     n/a' if value is None else f'{value:+7.1f}%'
+
+
+def compare(base, head, threshold=None):
+    print(f"base: {base['label']} ({(base['git'].get('commit') or '')[:10]})  "
+          f"head: {head['label']} ({(head['git'].get('commit') or '')[:10]})")
+    if base.get('dataset') != head.get('dataset'):
+        print('⚠️  Datasets differ between runs - deltas may not be comparable')
+    print(f"{'scenario':<28}{'p50 base':>10}{'p50 head':>10}{'Δ':>9}"
+          f"{'p95 base':>10}{'p95 head':>10}{'Δ':>9}{'rps Δ':>9}{'q/req':>12}")
+
+    regressions = []
+    for name in sorted(set(base['scenarios']) | set(head['scenarios'])):
+        b = base['scenarios'].get(name)
+        h = head['scenarios'].get(name)
+        if not b or not h:
+            print(f"{name:<28} only in {'head' if h else 'base'}")
+            continue
+        p95_delta = _delta(b['p95_ms'], h['p95_ms'])
+        print(f"{name:<28}{b['p50_ms']:>10.2f}{h['p50_ms']:>10.2f}{_fmt_delta(_delta(b['p50_ms'], h['p50_ms'])):>9}"
+              f"{b['p95_ms']:>10.2f}{h['p95_ms']:>10.2f}{_fmt_delta(p95_delta):>9}"
+              f"{_fmt_delta(_delta(b['throughput_rps'], h['throughput_rps'])):>9}"
+              f"{b['queries_per_request']:>6.1f}→{h['queries_per_request']:<5.1f}")
+        if threshold is not None and p95_delta is not None and p95_delta > threshold:
+            regressions.append((name, p95_delta))
+
+    if regressions:
+        print(f"❌ p95 regressions over {threshold}%: " + ', '.join(f'{n} ({d:+.1f}%)' for n, d in regressions))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files')
+    parser.add_argument('base')
+    parser.add_argument('head')
+    parser.add_argument('--fail-on-regression', type=float, metavar='PCT')
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    regressions = compare(base, head, args.fail_on_regression)
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
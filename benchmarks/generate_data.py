@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator for benchmarks and load tests.
+
+Creates N lenders, listings, buyers, applications and amortized mortgages
+(with full payment schedules) using bulk executemany inserts in fixed-size
+chunks. A seeded RNG makes every run with the same arguments produce the same
+dataset, so results from different branches are comparable.
+
+Point DATABASE_URL at a scratch database first - this appends rows:
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.generate_data \\
+        --lenders 50 --listings 20000 --buyers 100000 \\
+        --applications 200000 --mortgages 10000 --seed 42
+"""
+
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from dateutil.relativedelta import relativedelta
+from flask import current_app
+from sqlalchemy import func, insert
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from utils.counters import repair_counters
+from utils.credit_scoring import rescore_range
+from utils.matching import rebuild_index
+from utils.search import rebuild_search_index
+from models import (
+    Admin, Lender, Buyer, MortgageListing, MortgageApplication, ActiveMortgage,
+    PaymentSchedule, PropertyType, KenyanCounty, ListingStatus, ApplicationStatus,
+    MortgageStatus, PaymentStatus
+)
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+BENCHMARK_ADMIN_EMAIL = 'bench-admin@netlend.test'
+
+COUNTIES = list(KenyanCounty)
+PROPERTY_TYPES = list(PropertyType)
+OPEN_APPLICATION_STATUSES = [ApplicationStatus.PENDING, ApplicationStatus.REJECTED, ApplicationStatus.NEEDS_INFO]
+STREETS = ['Ngong Road', 'Waiyaki Way', 'Kiambu Road', 'Thika Road', 'Mombasa Road',
+           'Lang\'ata Road', 'Limuru Road', 'Moi Avenue', 'Oginga Odinga Street', 'Kenyatta Avenue']
+ESTATES = ['Westlands', 'Kilimani', 'Karen', 'Runda', 'Kileleshwa', 'Lavington',
+           'Syokimau', 'Ruaka', 'Kitengela', 'Nyali', 'Milimani', 'Section 58']
+
+
+def monthly_payment(principal, annual_rate, months):
+    """Standard amortization payment (same formula as the approval workflow)"""
+    monthly_rate = annual_rate / 100 / 12
+    if monthly_rate == 0:
+        return principal / months
+    return principal * (monthly_rate * (1 + monthly_rate)**months) / ((1 + monthly_rate)**months - 1)
+
+
+def remaining_balance(principal, annual_rate, months, payments_made):
+    monthly_rate = annual_rate / 100 / 12
+    if monthly_rate == 0:
+        return principal - principal / months * payments_made
+    payment = monthly_payment(principal, annual_rate, months)
+    growth = (1 + monthly_rate)**payments_made
+    return max(0.0, principal * growth - payment * (growth - 1) / monthly_rate)
+
+
+class BulkWriter:
+    """Buffers rows per model and flushes them as executemany inserts"""
+
+    def __init__(self, chunk_size):
+        self.chunk_size = chunk_size
+        self.buffers = {}
+        self.counts = {}
+
+    def add(self, model, row):
+        buffer = self.buffers.setdefault(model, [])
+        buffer.append(row)
+        if len(buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        # Buffers are flushed in first-use order, which is parent-before-child
+        for m in self.buffers:
+            rows = self.buffers.get(m)
+            if rows:
+                db.session.execute(insert(m), rows)
+                self.counts[m.__tablename__] = self.counts.get(m.__tablename__, 0) + len(rows)
+                self.buffers[m] = []
+        db.session.commit()
+
+
+def _next_id(model):
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def generate(lenders=10, listings=1000, buyers=5000, applications=10000, mortgages=500,
+             seed=42, chunk_size=5000, paid_ratio=0.95, today=None):
+    """Bulk-create a reproducible synthetic dataset and return row counts per table"""
+    rng = random.Random(seed)
+    today = today or date.today()
+    now = datetime.combine(today, datetime.min.time())
+    writer = BulkWriter(chunk_size)
+    # Hashing is deliberately slow; every synthetic account shares one hash
+    password_hash = generate_password_hash(BENCHMARK_PASSWORD)
+
+    if not Admin.query.filter_by(email=BENCHMARK_ADMIN_EMAIL).first():
+        writer.add(Admin, {
+            'name': 'Benchmark Admin', 'email': BENCHMARK_ADMIN_EMAIL,
+            'password_hash': password_hash, 'verified': True, 'created_at': now
+        })
+
+    # Lenders
+    lender_start = _next_id(Lender)
+    lender_ids = list(range(lender_start, lender_start + lenders))
+    for lender_id in lender_ids:
+        writer.add(Lender, {
+            'id': lender_id,
+            'institution_name': f'Benchmark Bank {lender_id}',
+            'contact_person': f'Contact {lender_id}',
+            'email': f'lender{lender_id}-{seed}@bench.netlend.test',
+            'password_hash': password_hash,
+            'verified': True,
+            'company_type': rng.choice(['Bank', 'SACCO', 'Microfinance']),
+            'county': rng.choice(COUNTIES),
+            'created_at': now - timedelta(days=rng.randint(0, 1500))
+        })
+    writer.flush()
+
+    # Buyers
+    buyer_start = _next_id(Buyer)
+    buyer_ids = list(range(buyer_start, buyer_start + buyers))
+    for buyer_id in buyer_ids:
+        net_income = round(rng.lognormvariate(11.8, 0.6), -2)  # ~KES 130k median
+        property_value = round(net_income * rng.uniform(30, 120), -3)
+        down_payment = round(property_value * rng.uniform(0.05, 0.35), -3)
+        writer.add(Buyer, {
+            'id': buyer_id,
+            'name': f'Buyer {buyer_id}',
+            'email': f'buyer{buyer_id}-{seed}@bench.netlend.test',
+            'password_hash': password_hash,
+            'verified': True,
+            'employment_status': rng.choice(['employed', 'self-employed', 'contract']),
+            'employment_duration': rng.randint(0, 240),
+            'monthly_gross_income': round(net_income * 1.3, -2),
+            'monthly_net_income': net_income,
+            'monthly_loan_repayments': round(net_income * rng.choice([0, 0, 0.05, 0.1, 0.2, 0.35]), -2),
+            'has_existing_loans': rng.random() < 0.4,
+            'preferred_property_type': rng.choice(PROPERTY_TYPES),
+            'target_county': rng.choice(COUNTIES),
+            'estimated_property_value': property_value,
+            'desired_loan_amount': property_value - down_payment,
+            'desired_repayment_period': rng.choice([10, 15, 20, 25]),
+            'down_payment_amount': down_payment,
+            'national_id_uploaded': rng.random() < 0.8,
+            'kra_pin_uploaded': rng.random() < 0.7,
+            'bank_statement_uploaded': rng.random() < 0.6,
+            'proof_of_residence_uploaded': rng.random() < 0.5,
+            'profile_complete': rng.random() < 0.6,
+            'created_at': now - timedelta(days=rng.randint(0, 1000))
+        })
+    writer.flush()
+
+    # Listings - the first `mortgages` listings are the ones that get sold
+    listing_start = _next_id(MortgageListing)
+    listing_rows = {}
+    for offset in range(listings):
+        listing_id = listing_start + offset
+        price = round(rng.uniform(2_000_000, 40_000_000), -4)
+        rate = round(rng.uniform(9.0, 16.0), 2)
+        years = rng.choice([10, 15, 20, 25, 30])
+        down = round(price * rng.uniform(0.1, 0.3), -3)
+        bedrooms = rng.randint(1, 6)
+        property_type = rng.choice(PROPERTY_TYPES)
+        row = {
+            'id': listing_id,
+            'lender_id': rng.choice(lender_ids),
+            'property_title': f'{bedrooms}BR {property_type.value.title()} in {rng.choice(ESTATES)}',
+            'property_type': property_type,
+            'bedrooms': bedrooms,
+            'address': f'{rng.randint(1, 999)} {rng.choice(STREETS)}',
+            'county': rng.choice(COUNTIES),
+            'price_range': price,
+            'interest_rate': rate,
+            'repayment_period': years,
+            'down_payment': down,
+            'monthly_payment': round(monthly_payment(price - down, rate, years * 12), 2),
+            'eligibility_criteria': f'Minimum net income KSH {int(price / 100):,}/month',
+            'images': [],
+            'status': ListingStatus.ACQUIRED if offset < mortgages else ListingStatus.ACTIVE,
+            'created_at': now - timedelta(days=rng.randint(0, 900))
+        }
+        listing_rows[listing_id] = row
+        writer.add(MortgageListing, row)
+    writer.flush()
+    listing_ids = list(listing_rows)
+
+    # Open applications (pending / rejected / needs info)
+    for _ in range(applications):
+        listing = listing_rows[rng.choice(listing_ids)]
+        writer.add(MortgageApplication, {
+            'borrower_id': rng.choice(buyer_ids),
+            'lender_id': listing['lender_id'],
+            'listing_id': listing['id'],
+            'requested_amount': float(listing['price_range']) - listing['down_payment'],
+            'repayment_years': listing['repayment_period'],
+            'status': rng.choice(OPEN_APPLICATION_STATUSES),
+            'submitted_at': now - timedelta(days=rng.randint(0, 400))
+        })
+    writer.flush()
+
+    # Approved applications with amortized mortgages and payment schedules
+    application_id = _next_id(MortgageApplication)
+    mortgage_id = _next_id(ActiveMortgage)
+    for listing_id in listing_ids[:mortgages]:
+        listing = listing_rows[listing_id]
+        borrower_id = rng.choice(buyer_ids)
+        principal = float(listing['price_range']) - listing['down_payment']
+        term = listing['repayment_period'] * 12
+        start = today - relativedelta(months=rng.randint(0, 60))
+        payment = round(monthly_payment(principal, listing['interest_rate'], term), 2)
+
+        writer.add(MortgageApplication, {
+            'id': application_id,
+            'borrower_id': borrower_id,
+            'lender_id': listing['lender_id'],
+            'listing_id': listing_id,
+            'requested_amount': principal,
+            'repayment_years': listing['repayment_period'],
+            'status': ApplicationStatus.APPROVED,
+            'submitted_at': datetime.combine(start, datetime.min.time()) - timedelta(days=14)
+        })
+
+        schedule = [(start + timedelta(days=7), listing['down_payment'])]
+        for month in range(1, term + 1):
+            due = start + relativedelta(months=month)
+            schedule.append(((due.replace(day=1) + relativedelta(months=1) - timedelta(days=1)), payment))
+
+        paid_flags = [due < today and rng.random() < paid_ratio for due, _ in schedule]
+        payments_made = sum(paid_flags)
+        next_due = next((due for (due, _), paid in zip(schedule, paid_flags) if not paid), None)
+
+        writer.add(ActiveMortgage, {
+            'id': mortgage_id,
+            'application_id': application_id,
+            'borrower_id': borrower_id,
+            'lender_id': listing['lender_id'],
+            'principal_amount': principal,
+            'interest_rate': listing['interest_rate'],
+            'repayment_term': term,
+            'next_payment_due': next_due,
+            'remaining_balance': round(remaining_balance(
+                principal, listing['interest_rate'], term, max(0, payments_made - 1)
+            ), 2),
+            'status': MortgageStatus.ACTIVE,
+            'created_at': datetime.combine(start, datetime.min.time())
+        })
+        for (due, amount), paid in zip(schedule, paid_flags):
+            writer.add(PaymentSchedule, {
+                'mortgage_id': mortgage_id,
+                'payment_date': due,
+                'amount_due': amount,
+                'amount_paid': amount if paid else 0,
+                'status': PaymentStatus.PAID if paid else PaymentStatus.PENDING,
+                'created_at': datetime.combine(start, datetime.min.time())
+            })
+        application_id += 1
+        mortgage_id += 1
+
+    writer.flush()
+
+    # Bulk inserts skip the ORM counter, credit score, search and match index events
+    repair_counters()
+    rebuild_search_index(db.session.connection())
+    db.session.commit()
+    with db.engine.connect() as connection:
+        rescore_range(connection, buyer_start, buyer_start + buyers,
+                      current_app.config['CREDIT_RESCORE_CHUNK_SIZE'])
+    rebuild_index(db.engine, current_app.config['MATCH_REBUILD_CHUNK_SIZE'])
+    return writer.counts
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Generate a synthetic NetLend dataset')
+    parser.add_argument('--lenders', type=int, default=10)
+    parser.add_argument('--listings', type=int, default=1000)
+    parser.add_argument('--buyers', type=int, default=5000)
+    parser.add_argument('--applications', type=int, default=10000)
+    parser.add_argument('--mortgages', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    args = parser.parse_args()
+    if args.mortgages > args.listings:
+        parser.error('--mortgages cannot exceed --listings (one mortgage per listing)')
+    return args
+
+
+def main():
+    args = parse_args()
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        counts = generate(
+            lenders=args.lenders, listings=args.listings, buyers=args.buyers,
+            applications=args.applications, mortgages=args.mortgages,
+            seed=args.seed, chunk_size=args.chunk_size
+        )
+        elapsed = time.perf_counter() - started
+        for table, count in sorted(counts.items()):
+            print(f"✅ {table}: {count:,} rows")
+        print(f"Generated in {elapsed:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Logins per second per core at each password-hash setting (utils/passwords.py).
+
+For every --methods entry a benchmark buyer's password is hashed with that
+method, then --logins successful POST /api/login requests are timed from
+--threads client threads (the login rate limiter is switched off). With more
+than one thread, PASSWORD_HASH_THREADS is set to the same count, as it would
+be under gthread workers. Per-core throughput divides by the cores actually
+usable, min(threads, CPUs). The raw hash verification time is reported next
+to it, so the share of a login spent hashing is visible.
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.password_hashing \\
+        --methods pbkdf2:sha256:600000 scrypt:16384:8:1 scrypt:32768:8:1 --logins 50
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from werkzeug.security import check_password_hash
+
+from app import create_app, db
+from models import Buyer
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+BENCH_BUYER_EMAIL = 'bench-passwords@netlend.test'
+BENCH_PASSWORD = 'benchmark-password'
+DEFAULT_METHODS = [
+    'pbkdf2:sha256:260000', 'pbkdf2:sha256:600000', 'pbkdf2:sha256:1000000',
+    'scrypt:16384:8:1', 'scrypt:32768:8:1', 'scrypt:65536:8:1'
+]
+
+
+def _percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def prepare(method):
+    """Hash the benchmark buyer's password with ``method``; returns the stored hash"""
+    buyer = Buyer.query.filter_by(email=BENCH_BUYER_EMAIL).first()
+    if buyer is None:
+        buyer = Buyer(name='Password Bench', email=BENCH_BUYER_EMAIL)
+        db.session.add(buyer)
+    buyer.set_password(BENCH_PASSWORD)
+    db.session.commit()
+    assert buyer.password_hash.startswith(method.split(':')[0]), f'{method} was not applied'
+    return buyer.password_hash
+
+
+def _login(app):
+    client = app.test_client()
+    started = time.perf_counter()
+    response = client.post('/api/login', json={'email': BENCH_BUYER_EMAIL, 'password': BENCH_PASSWORD})
+    elapsed = time.perf_counter() - started
+    if response.status_code != 200:
+        raise RuntimeError(f'Login failed with {response.status_code}: {response.get_data(as_text=True)}')
+    return elapsed
+
+
+def run_method(app, method, logins, threads):
+    app.config['PASSWORD_HASH_METHOD'] = method
+    app.config['PASSWORD_HASH_THREADS'] = threads if threads > 1 else 0
+    with app.app_context():
+        password_hash = prepare(method)
+
+    started = time.perf_counter()
+    check_password_hash(password_hash, BENCH_PASSWORD)
+    verify_ms = (time.perf_counter() - started) * 1000
+
+    _login(app)  # warm-up: connection pool, lazy imports
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = sorted(s * 1000 for s in pool.map(lambda _: _login(app), range(logins)))
+    wall = time.perf_counter() - started
+
+    cores = min(threads, os.cpu_count() or 1)
+    return {
+        'method': method,
+        'verify_ms': round(verify_ms, 2),
+        'logins_per_second': round(logins / wall, 2),
+        'logins_per_second_per_core': round(logins / wall / cores, 2),
+        'p50_ms': round(_percentile(latencies, 50), 2),
+        'p95_ms': round(_percentile(latencies, 95), 2),
+        'mean_ms': round(statistics.fmean(latencies), 2)
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark login throughput at each password-hash setting')
+    parser.add_argument('--methods', nargs='+', default=DEFAULT_METHODS, help='werkzeug hash method strings')
+    parser.add_argument('--logins', type=int, default=50, help='Timed logins per method')
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--label', default='password-hashing')
+    parser.add_argument('-o', '--output', help='Results file (defaults to benchmarks/results/<label>.json)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    app = create_app()
+    app.logger.setLevel(logging.CRITICAL)
+    logging.getLogger('netlend.queries').setLevel(logging.WARNING)
+    app.config['LOGIN_RATE_LIMIT_ENABLED'] = False
+    with app.app_context():
+        database = db.engine.dialect.name
+
+    print(f"{args.logins} logins per method with {args.threads} threads on {os.cpu_count()} CPUs ({database})")
+    runs = []
+    for method in args.methods:
+        runs.append(run_method(app, method, args.logins, args.threads))
+        run = runs[-1]
+        print(f"{method:<24} verify {run['verify_ms']:>8.1f}ms  {run['logins_per_second_per_core']:>8.1f} logins/s/core  "
+              f"p50 {run['p50_ms']:>8.1f}ms  p95 {run['p95_ms']:>8.1f}ms")
+
+    output = args.output or os.path.join(RESULTS_DIR, f'{args.label}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'label': args.label,
+            'created_at': datetime.utcnow().isoformat() + 'Z',
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'database': database,
+            'settings': {k: v for k, v in vars(args).items() if k not in ('label', 'output', 'methods')},
+            'runs': runs
+        }, f, indent=2, sort_keys=True)
+    print(f"✅ Results written to {output}")
+
+if __name__ == '__main__':
+    main()
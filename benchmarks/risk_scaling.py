@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Measure how the Monte Carlo risk simulation (utils/risk.py) scales with
+worker processes.
+
+The same seeded run is timed once per worker count. Results must be identical
+across counts, since shards carry their own seeds; the script fails if they
+differ. The portfolio is the ACTIVE book of the database DATABASE_URL points
+at, or a synthetic one with --synthetic-loans.
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.risk_scaling \\
+        --scenarios 20000 --workers 1 2 4 8
+"""
+
+import argparse
+import json
+import os
+import platform
+from datetime import datetime
+
+import numpy as np
+
+from app import create_app
+from utils.risk import DEFAULT_PARAMS, load_risk_portfolio, simulate
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+
+def synthetic_portfolio(loans, lenders, seed):
+    rng = np.random.default_rng(seed)
+    return {
+        'lender_id': np.sort(rng.integers(1, lenders + 1, loans)),
+        'balance': rng.uniform(500_000, 20_000_000, loans),
+        'rate': rng.uniform(0.08, 0.16, loans) / 12,
+        'term': rng.integers(12, 300, loans),
+        'base_pd': rng.uniform(0.01, 0.15, loans)
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark Monte Carlo risk scaling across worker processes')
+    parser.add_argument('--scenarios', type=int, default=10000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument('--shard-scenarios', type=int, default=1000)
+    parser.add_argument('--chunk-elements', type=int, default=1_000_000)
+    parser.add_argument('--synthetic-loans', type=int, help='Simulate a generated book of this many loans')
+    parser.add_argument('--synthetic-lenders', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('-o', '--output', help='Results file (defaults to benchmarks/results/risk-scaling.json)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.synthetic_loans:
+        portfolio = synthetic_portfolio(args.synthetic_loans, args.synthetic_lenders, args.seed)
+    else:
+        app = create_app()
+        with app.app_context():
+            portfolio = load_risk_portfolio()
+    params = dict(DEFAULT_PARAMS, scenarios=args.scenarios, seed=args.seed)
+    print(f"{len(portfolio['balance'])} loans, {args.scenarios} scenarios, {os.cpu_count()} CPUs")
+
+    runs = []
+    baseline = reference = None
+    for workers in sorted(set(args.workers)):
+        result = simulate(portfolio, params, workers, args.shard_scenarios, args.chunk_elements)
+        seconds = result['elapsedSeconds']
+        baseline = baseline or seconds
+        if reference is None:
+            reference = result['platform']
+        elif result['platform'] != reference:
+            print(f"❌ Results with {workers} workers differ from the first run")
+            raise SystemExit(1)
+        runs.append({
+            'workers': workers,
+            'seconds': seconds,
+            'speedup': round(baseline / seconds, 2),
+            'efficiency': round(baseline / seconds / workers, 2),
+            'scenarios_per_second': round(args.scenarios / seconds, 1)
+        })
+        print(f"workers {workers:>3}  {seconds:>8.2f}s  speedup {runs[-1]['speedup']:>5.2f}x  "
+              f"efficiency {runs[-1]['efficiency']:>5.0%}  {runs[-1]['scenarios_per_second']:>10.1f} scenarios/s")
+
+    output = args.output or os.path.join(RESULTS_DIR, 'risk-scaling.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'created_at': datetime.utcnow().isoformat() + 'Z',
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'loans': len(portfolio['balance']),
+            'settings': vars(args),
+            'expected_shortfall': reference['expectedShortfall'] if reference else None,
+            'runs': runs
+        }, f, indent=2, sort_keys=True)
+    print(f"✅ Results written to {output}")
+
+if __name__ == '__main__':
+    main()
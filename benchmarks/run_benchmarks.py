@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Run the endpoint benchmark scenarios and write a results file.
+
+Latency percentiles, throughput and queries-per-request are recorded for every
+scenario. Results are tagged with the git branch and commit so runs from two
+branches can be diffed with benchmarks/compare_results.py.
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.run_benchmarks \\
+        --iterations 200 --concurrency 4
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from app import create_app, db
+from models import Lender, Buyer, MortgageListing, MortgageApplication, ActiveMortgage, PaymentSchedule
+from utils.query_profiler import count_queries
+from benchmarks.scenarios import build_context, prepare_request, select_scenarios
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+
+def _git(*args):
+    try:
+        return subprocess.check_output(['git', *args], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _timed_request(app, method, path, kwargs):
+    """Issue one request with its own client; returns (seconds, status, queries)"""
+    client = app.test_client()
+    with app.app_context():
+        with count_queries(keep_slowest=0) as stats:
+            started = time.perf_counter()
+            response = client.open(path, method=method, **kwargs)
+            response.get_data()  # drain streamed bodies
+            elapsed = time.perf_counter() - started
+        response.close()
+        db.session.remove()
+    return elapsed, response.status_code, stats.count
+
+
+def run_scenario(app, scenario, context, iterations, warmup, concurrency):
+    method, path, kwargs = prepare_request(scenario, context)
+    for _ in range(warmup):
+        _timed_request(app, method, path, kwargs)
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(lambda _: _timed_request(app, method, path, kwargs), range(iterations)))
+    else:
+        samples = [_timed_request(app, method, path, kwargs) for _ in range(iterations)]
+    wall = time.perf_counter() - started
+
+    latencies = sorted(s[0] * 1000 for s in samples)
+    return {
+        'method': method,
+        'path': path,
+        'iterations': iterations,
+        'concurrency': concurrency,
+        'p50_ms': round(_percentile(latencies, 50), 3),
+        'p95_ms': round(_percentile(latencies, 95), 3),
+        'p99_ms': round(_percentile(latencies, 99), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'min_ms': round(latencies[0], 3),
+        'max_ms': round(latencies[-1], 3),
+        'throughput_rps': round(iterations / wall, 2) if wall else None,
+        'queries_per_request': round(statistics.fmean(s[2] for s in samples), 2),
+        'status_codes': dict(Counter(str(s[1]) for s in samples))
+    }
+
+
+def dataset_summary():
+    return {
+        model.__tablename__: db.session.query(model).count()
+        for model in (Lender, Buyer, MortgageListing, MortgageApplication, ActiveMortgage, PaymentSchedule)
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run NetLend endpoint benchmarks')
+    parser.add_argument('--scenario', action='append', dest='scenarios', help='Run only this scenario (repeatable)')
+    parser.add_argument('--tag', action='append', dest='tags', help='Run scenarios with this tag (repeatable)')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--label', help='Results label (defaults to the git branch)')
+    parser.add_argument('-o', '--output', help='Results file (defaults to benchmarks/results/<label>.json)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    app = create_app()
+    # Failures are reported per scenario in status_codes; keep tracebacks and
+    # sampled query logs from drowning the summary table
+    app.logger.setLevel(logging.CRITICAL)
+    logging.getLogger('netlend.queries').setLevel(logging.WARNING)
+    branch = _git('rev-parse', '--abbrev-ref', 'HEAD')
+    label = args.label or (branch or 'local').replace('/', '-')
+    output = args.output or os.path.join(RESULTS_DIR, f'{label}.json')
+
+    with app.app_context():
+        context = build_context()
+        scenarios = select_scenarios(args.scenarios, args.tags)
+        results = {
+            'label': label,
+            'git': {'branch': branch, 'commit': _git('rev-parse', 'HEAD')},
+            'created_at': datetime.utcnow().isoformat() + 'Z',
+            'python': platform.python_version(),
+            'database': db.engine.dialect.name,
+            'dataset': dataset_summary(),
+            'settings': {'iterations': args.iterations, 'warmup': args.warmup, 'concurrency': args.concurrency},
+            'scenarios': {}
+        }
+
+    for scenario in scenarios:
+        result = run_scenario(app, scenario, context, args.iterations, args.warmup, args.concurrency)
+        results['scenarios'][scenario.name] = result
+        print(f"{scenario.name:<28} p50 {result['p50_ms']:>9.2f}ms  p95 {result['p95_ms']:>9.2f}ms  "
+              f"{result['throughput_rps']:>8.1f} req/s  {result['queries_per_request']:>7.1f} q/req  "
+              f"{result['status_codes']}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"✅ Results written to {output}")
+
+if __name__ == '__main__':
+    main()
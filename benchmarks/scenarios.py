@@ -0,0 +1,118 @@
+"""
+Per-endpoint benchmark scenarios, run in-process with the Flask test client.
+
+Each scenario names a request and the role whose token it needs. Path
+placeholders ({lender_id}, {buyer_id}, {mortgage_id}, {listing_id}) are filled
+from the busiest rows of the benchmark dataset so the numbers reflect realistic
+fan-out rather than empty accounts.
+"""
+
+from dataclasses import dataclass, field
+
+from sqlalchemy import func
+
+from app import db
+from models import Admin, Lender, Buyer, MortgageListing, ActiveMortgage
+from utils.auth import create_principal_token
+from benchmarks.generate_data import BENCHMARK_PASSWORD, BENCHMARK_ADMIN_EMAIL
+
+
+@dataclass
+class Scenario:
+    name: str
+    path: str
+    method: str = 'GET'
+    role: str = None  # 'admin', 'lender', 'buyer' or None for public endpoints
+    body: dict = field(default=None)
+    tags: tuple = ()
+
+
+SCENARIOS = [
+    Scenario('health', '/health', tags=('smoke',)),
+    Scenario('login', '/api/login', method='POST',
+             body={'email': '{lender_email}', 'password': BENCHMARK_PASSWORD}, tags=('auth',)),
+    Scenario('mortgages_browse', '/api/mortgages/?page=1&per_page=20', tags=('mortgages',)),
+    Scenario('mortgages_search', '/api/mortgages/search?q=apartment%20kil&per_page=20', tags=('mortgages',)),
+    Scenario('mortgages_facets', '/api/mortgages/facets?county=Nairobi', tags=('mortgages',)),
+    Scenario('mortgage_detail', '/api/mortgages/{listing_id}', tags=('mortgages',)),
+    Scenario('homebuyer_properties', '/api/homebuyer/properties', tags=('homebuyer',)),
+    Scenario('homebuyer_dashboard', '/api/homebuyer/dashboard', role='buyer', tags=('homebuyer',)),
+    Scenario('homebuyer_my_mortgages', '/api/homebuyer/my-mortgages', role='buyer', tags=('homebuyer',)),
+    Scenario('homebuyer_creditworthiness', '/api/homebuyer/creditworthiness', role='buyer', tags=('homebuyer',)),
+    Scenario('homebuyer_recommendations', '/api/homebuyer/recommendations', role='buyer', tags=('homebuyer',)),
+    Scenario('homebuyer_applications', '/api/homebuyer/applications', role='buyer', tags=('homebuyer',)),
+    Scenario('lender_dashboard', '/api/lender/dashboard', role='lender', tags=('lender',)),
+    Scenario('lender_my_listings', '/api/lender/my-listings', role='lender', tags=('lender',)),
+    Scenario('lender_applications', '/api/lender/applications', role='lender', tags=('lender',)),
+    Scenario('lender_sold_mortgages', '/api/lender/sold-mortgages', role='lender', tags=('lender',)),
+    Scenario('lender_aging', '/api/lender/aging', role='lender', tags=('lender',)),
+    Scenario('lender_cash_flow', '/api/lender/cash-flow?months=60&cpr=0.06&cdr=0.01', role='lender', tags=('lender',)),
+    Scenario('payments_history', '/api/payments/mortgage/{mortgage_id}/payments', role='buyer', tags=('payments',)),
+    Scenario('admin_users', '/api/admin/users', role='admin', tags=('admin',)),
+    Scenario('admin_lenders', '/api/admin/lenders', role='admin', tags=('admin',)),
+    Scenario('admin_properties', '/api/admin/properties', role='admin', tags=('admin',)),
+    Scenario('admin_analytics', '/api/admin/analytics', role='admin', tags=('admin',)),
+    Scenario('admin_aging', '/api/admin/aging', role='admin', tags=('admin',)),
+    Scenario('admin_lender_details', '/api/admin/lenders/{lender_id}', role='admin', tags=('admin',)),
+]
+
+
+def build_context():
+    """Pick representative ids and mint tokens for each role
+
+    Must be called inside an app context on a generated dataset.
+    """
+    lender_id = db.session.query(MortgageListing.lender_id).group_by(
+        MortgageListing.lender_id
+    ).order_by(func.count().desc()).limit(1).scalar()
+    mortgage = ActiveMortgage.query.order_by(ActiveMortgage.id).first()
+    buyer_id = mortgage.borrower_id if mortgage else db.session.query(func.min(Buyer.id)).scalar()
+    listing_id = db.session.query(func.min(MortgageListing.id)).scalar()
+    admin = Admin.query.filter_by(email=BENCHMARK_ADMIN_EMAIL).first()
+    lender = db.session.get(Lender, lender_id) if lender_id else None
+
+    if not (lender and buyer_id and listing_id and admin):
+        raise RuntimeError('No benchmark dataset found - run python -m benchmarks.generate_data first')
+
+    return {
+        'lender_id': lender.id,
+        'lender_email': lender.email,
+        'buyer_id': buyer_id,
+        'listing_id': listing_id,
+        'mortgage_id': mortgage.id if mortgage else 0,
+        'tokens': {
+            'admin': create_principal_token(admin),
+            'lender': create_principal_token(lender),
+            'buyer': create_principal_token(db.session.get(Buyer, buyer_id))
+        }
+    }
+
+
+def _fill(value, context):
+    if isinstance(value, str):
+        return value.format(**context)
+    if isinstance(value, dict):
+        return {k: _fill(v, context) for k, v in value.items()}
+    return value
+
+
+def prepare_request(scenario, context):
+    """Return (method, path, kwargs) for the Flask test client"""
+    kwargs = {}
+    if scenario.role:
+        kwargs['headers'] = {'Authorization': f"Bearer {context['tokens'][scenario.role]}"}
+    if scenario.body is not None:
+        kwargs['json'] = _fill(scenario.body, context)
+    return scenario.method, _fill(scenario.path, context), kwargs
+
+
+def select_scenarios(names=None, tags=None):
+    selected = SCENARIOS
+    if names:
+        unknown = set(names) - {s.name for s in SCENARIOS}
+        if unknown:
+            raise ValueError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        selected = [s for s in selected if s.name in names]
+    if tags:
+        selected = [s for s in selected if set(tags) & set(s.tags)]
+    return selected
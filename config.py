@@ -30,4 +30,113 @@ class Config:
     CLOUDINARY_API_SECRET = os.environ.get('CLOUDINARY_API_SECRET')
     
     # Redis configuration
-    REDIS_URL = os.environ.get('REDIS_URL') or 'redis://localhost:6379/0'
\ No newline at end of file
+    REDIS_URL = os.environ.get('REDIS_URL') or 'redis://localhost:6379/0'
+    
+    # Streaming responses - rows fetched per yield_per cursor batch
+    STREAM_YIELD_PER = int(os.environ.get('STREAM_YIELD_PER', 500))
+    
+    # Portfolio exports - rows per server-side cursor partition / Parquet row group
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 10000))
+    
+    # Batch creditworthiness re-scoring - buyers per snapshot / bulk UPDATE
+    CREDIT_RESCORE_CHUNK_SIZE = int(os.environ.get('CREDIT_RESCORE_CHUNK_SIZE', 5000))
+    
+    # Buyer-to-listing match index - matches kept per buyer, default page size,
+    # buyers per rebuild chunk and whether refreshes run on a background worker
+    MATCH_TOP_K = int(os.environ.get('MATCH_TOP_K', 50))
+    MATCH_DEFAULT_LIMIT = int(os.environ.get('MATCH_DEFAULT_LIMIT', 10))
+    MATCH_REBUILD_CHUNK_SIZE = int(os.environ.get('MATCH_REBUILD_CHUNK_SIZE', 500))
+    MATCH_INDEX_ASYNC = os.environ.get('MATCH_INDEX_ASYNC', 'true').lower() == 'true'
+    
+    # Affordability search - share of net income available for all loan
+    # repayments (existing + mortgage)
+    AFFORDABILITY_MAX_DTI = float(os.environ.get('AFFORDABILITY_MAX_DTI', 0.4))
+    
+    # Browse facet counts - seconds a cached payload lives (also bounds staleness
+    # across workers when Redis is unavailable)
+    FACETS_CACHE_TTL = int(os.environ.get('FACETS_CACHE_TTL', 300))
+    
+    # Delinquency job - days past due before an installment is LATE / MISSED,
+    # missed installments before a mortgage DEFAULTs, rows per UPDATE batch
+    DELINQUENCY_GRACE_DAYS = int(os.environ.get('DELINQUENCY_GRACE_DAYS', 5))
+    DELINQUENCY_MISSED_AFTER_DAYS = int(os.environ.get('DELINQUENCY_MISSED_AFTER_DAYS', 30))
+    DELINQUENCY_DEFAULT_AFTER_MISSED = int(os.environ.get('DELINQUENCY_DEFAULT_AFTER_MISSED', 3))
+    DELINQUENCY_BATCH_SIZE = int(os.environ.get('DELINQUENCY_BATCH_SIZE', 10000))
+    
+    # Payment schedule archive - days after a closed mortgage's last installment
+    # before its rows move to payment_schedules_archive, mortgages per batch
+    PAYMENT_ARCHIVE_AFTER_DAYS = int(os.environ.get('PAYMENT_ARCHIVE_AFTER_DAYS', 180))
+    PAYMENT_ARCHIVE_BATCH_SIZE = int(os.environ.get('PAYMENT_ARCHIVE_BATCH_SIZE', 200))
+    
+    # Application archive - days a rejected/expired application stays in
+    # mortgage_applications after its last update, applications per batch
+    APPLICATION_ARCHIVE_AFTER_DAYS = int(os.environ.get('APPLICATION_ARCHIVE_AFTER_DAYS', 90))
+    APPLICATION_ARCHIVE_BATCH_SIZE = int(os.environ.get('APPLICATION_ARCHIVE_BATCH_SIZE', 5000))
+    
+    # Expiry sweep - rows per UPDATE batch (run_expiry_sweep.py)
+    EXPIRY_BATCH_SIZE = int(os.environ.get('EXPIRY_BATCH_SIZE', 10000))
+    
+    # Aging report - seconds a live (non-snapshot) report is cached per worker
+    AGING_CACHE_TTL = int(os.environ.get('AGING_CACHE_TTL', 300))
+    
+    # Cash-flow projection - longest horizon a request may ask for
+    CASHFLOW_MAX_MONTHS = int(os.environ.get('CASHFLOW_MAX_MONTHS', 360))
+    
+    # Background jobs - worker threads per process, jobs queued or running per
+    # process before submissions are refused, whether they run off-request, and
+    # seconds without a heartbeat before a queued/running job counts as dead
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    JOB_QUEUE_LIMIT = int(os.environ.get('JOB_QUEUE_LIMIT', 10))
+    JOBS_ASYNC = os.environ.get('JOBS_ASYNC', 'true').lower() == 'true'
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', 120))
+    
+    # Monte Carlo risk - worker processes per job (0 = one per CPU; each
+    # gunicorn worker may run JOB_WORKERS jobs at once), scenarios per run and
+    # per shard, and the largest scenarios x loans matrix built at once
+    RISK_WORKERS = int(os.environ.get('RISK_WORKERS', 2))
+    RISK_DEFAULT_SCENARIOS = int(os.environ.get('RISK_DEFAULT_SCENARIOS', 10000))
+    RISK_MAX_SCENARIOS = int(os.environ.get('RISK_MAX_SCENARIOS', 50000))
+    RISK_SHARD_SCENARIOS = int(os.environ.get('RISK_SHARD_SCENARIOS', 1000))
+    RISK_CHUNK_ELEMENTS = int(os.environ.get('RISK_CHUNK_ELEMENTS', 1000000))
+    
+    # Refinancing offers - default minimum rate cut (percentage points), days
+    # an offer stays open and mortgages priced per batch
+    REFI_MIN_RATE_SPREAD = float(os.environ.get('REFI_MIN_RATE_SPREAD', 0.5))
+    REFI_OFFER_VALIDITY_DAYS = int(os.environ.get('REFI_OFFER_VALIDITY_DAYS', 30))
+    REFI_BATCH_SIZE = int(os.environ.get('REFI_BATCH_SIZE', 5000))
+    
+    # Pre-approvals - days a pre-approval stays valid, smallest loan worth
+    # pre-approving (KES) and buyers evaluated per batch of a lender run
+    PREAPPROVAL_VALIDITY_DAYS = int(os.environ.get('PREAPPROVAL_VALIDITY_DAYS', 90))
+    PREAPPROVAL_MIN_AMOUNT = float(os.environ.get('PREAPPROVAL_MIN_AMOUNT', 100000))
+    PREAPPROVAL_BATCH_SIZE = int(os.environ.get('PREAPPROVAL_BATCH_SIZE', 5000))
+    
+    # Query profiler - per-request query count / DB time
+    QUERY_PROFILER_ENABLED = os.environ.get('QUERY_PROFILER_ENABLED', 'true').lower() == 'true'
+    QUERY_PROFILER_HEADERS = os.environ.get('QUERY_PROFILER_HEADERS', 'false').lower() == 'true'  # always on in debug
+    QUERY_PROFILER_SAMPLE_RATE = float(os.environ.get('QUERY_PROFILER_SAMPLE_RATE', 0.01))
+    QUERY_PROFILER_SLOW_MS = float(os.environ.get('QUERY_PROFILER_SLOW_MS', 500))
+    QUERY_PROFILER_TOP_N = int(os.environ.get('QUERY_PROFILER_TOP_N', 3))
+    
+    # Prometheus /metrics - optional bearer token for scrapers
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # Auth - seconds a worker caches principal lookups / revocation checks
+    AUTH_PRINCIPAL_CACHE_TTL = int(os.environ.get('AUTH_PRINCIPAL_CACHE_TTL', 30))
+    
+    # Password hashing - werkzeug method string with its cost parameters, salt
+    # length, and hashing threads per process (0 = inline, right for sync
+    # workers). Hashes made with other settings are replaced on next login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    PASSWORD_HASH_SALT_LENGTH = int(os.environ.get('PASSWORD_HASH_SALT_LENGTH', 16))
+    PASSWORD_HASH_THREADS = int(os.environ.get('PASSWORD_HASH_THREADS', 0))
+    
+    # Login rate limiting - token buckets per client IP and per email (attempts
+    # allowed in a burst, refilled per minute) and trusted proxies in front of
+    # the app when reading X-Forwarded-For (0 = use the socket address)
+    LOGIN_RATE_LIMIT_ENABLED = os.environ.get('LOGIN_RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    LOGIN_RATE_IP_BURST = int(os.environ.get('LOGIN_RATE_IP_BURST', 30))
+    LOGIN_RATE_IP_PER_MINUTE = float(os.environ.get('LOGIN_RATE_IP_PER_MINUTE', 10))
+    LOGIN_RATE_EMAIL_BURST = int(os.environ.get('LOGIN_RATE_EMAIL_BURST', 5))
+    LOGIN_RATE_EMAIL_PER_MINUTE = float(os.environ.get('LOGIN_RATE_EMAIL_PER_MINUTE', 1))
+    LOGIN_RATE_PROXY_HOPS = int(os.environ.get('LOGIN_RATE_PROXY_HOPS', 0))
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Export active mortgages or payment schedules to CSV/Parquet for regulatory reporting.
+
+Rows are streamed from a server-side cursor straight to the output file, so
+exports of tens of millions of rows run in constant memory.
+
+Examples:
+    python export_portfolio.py active-mortgages --lender-id 3 -o book.csv
+    python export_portfolio.py payment-schedules --format parquet \\
+        --start 2025-01-01 --end 2025-12-31 --status paid -o payments.parquet
+"""
+
+import argparse
+import contextlib
+import sys
+
+from app import create_app
+from utils.exports import DATASETS, EXPORT_FORMATS, iter_export
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Stream a portfolio export')
+    parser.add_argument('dataset', choices=sorted(DATASETS))
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+    parser.add_argument('--lender-id', type=int)
+    parser.add_argument('--start', help='YYYY-MM-DD, inclusive')
+    parser.add_argument('--end', help='YYYY-MM-DD, inclusive')
+    parser.add_argument('--status')
+    parser.add_argument('--batch-size', type=int)
+    parser.add_argument('-o', '--output', help='Output file (defaults to stdout for CSV)')
+    return parser.parse_args()
+
+
+def export_portfolio():
+    args = parse_args()
+    if args.format == 'parquet' and not args.output:
+        sys.exit('Parquet exports need --output')
+
+    # Keep startup messages off stdout so CSV can be piped
+    with contextlib.redirect_stdout(sys.stderr):
+        app = create_app()
+    with app.app_context():
+        try:
+            chunks = iter_export(
+                args.dataset,
+                args.format,
+                batch_size=args.batch_size,
+                lender_id=args.lender_id,
+                start=args.start,
+                end=args.end,
+                status=args.status
+            )
+        except ValueError as e:
+            sys.exit(f"❌ {e}")
+        if args.format == 'parquet':
+            with open(args.output, 'wb') as out:
+                for chunk in chunks:
+                    out.write(chunk)
+        elif args.output:
+            with open(args.output, 'w', newline='') as out:
+                for chunk in chunks:
+                    out.write(chunk)
+        else:
+            for chunk in chunks:
+                sys.stdout.write(chunk)
+        if args.output:
+            print(f"✅ Exported {args.dataset} to {args.output}", file=sys.stderr)
+
+if __name__ == '__main__':
+    export_portfolio()
@@ -1,3 +1,7 @@
+import os
+import shutil
+import tempfile
+
 bind = "0.0.0.0:5000"
 workers = 4
 worker_class = "sync"
@@ -5,4 +9,31 @@ timeout = 120
 keepalive = 2
 max_requests = 1000
 max_requests_jitter = 100
-preload_app = True
\ No newline at end of file
+preload_app = True
+
+# Prometheus multiprocess mode: workers write samples to a shared directory
+# that /metrics aggregates. Must be set before prometheus_client is imported.
+prometheus_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "netlend-prometheus")
+)
+shutil.rmtree(prometheus_dir, ignore_errors=True)
+os.makedirs(prometheus_dir, exist_ok=True)
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+def when_ready(server):
+    # Jobs whose lease ran out while nothing was running (e.g. across a full
+    # restart); live jobs on other hosts keep renewing theirs
+    from app import db
+    from utils.jobs import fail_orphaned_jobs
+    app = server.app.wsgi()
+    with app.app_context():
+        fail_orphaned_jobs()
+        db.engine.dispose()  # workers fork from here; they open their own connections
+
+def post_worker_init(worker):
+    # Renew leases of this worker's jobs and fail those of dead workers
+    from utils.jobs import start_heartbeat
+    start_heartbeat(worker.app.wsgi())
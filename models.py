@@ -3,9 +3,12 @@
 # Uses SQLAlchemy ORM for database operations and Python Enums for controlled vocabularies
 
 from app import db  # Database instance from main app
-from datetime import datetime  # For timestamp fields
-from werkzeug.security import generate_password_hash, check_password_hash  # Secure password handling
+from datetime import datetime, timedelta  # For timestamp fields and due dates
+from utils.passwords import hash_password, verify_password  # Config-driven password hashing
 from enum import Enum  # For creating controlled vocabulary enums
+from sqlalchemy import event, inspect  # Derived-state hooks
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import Session
 
 # ENUMERATION CLASSES
 # These define controlled vocabularies for various fields to ensure data consistency
@@ -35,6 +38,7 @@ class ApplicationStatus(Enum):
     APPROVED = "approved"
     REJECTED = "rejected"
     NEEDS_INFO = "needs_info"
+    EXPIRED = "expired"  # pre-approvals past valid_until (utils/expiry.py)
 
 class MortgageStatus(Enum):
     ACTIVE = "active"
@@ -103,6 +107,49 @@ class KenyanCounty(Enum):
     WAJIR = "Wajir"
     WEST_POKOT = "West Pokot"
 
+# CREDITWORTHINESS SCORING RULES
+# Shared by Buyer.calculate_creditworthiness_score and the vectorized batch
+# scorer in utils/credit_scoring.py - tune weights and thresholds here only.
+# Bands are (threshold, points) pairs checked in order; the first match wins.
+
+CREDIT_ASSUMED_ANNUAL_RATE = 0.12
+CREDIT_INCOME_RATIO_BANDS = [(0.3, 40), (0.4, 30), (0.5, 20)]  # monthly payment / net income below threshold
+CREDIT_EMPLOYMENT_BANDS = [(24, 20), (12, 15), (6, 10)]  # months employed at least threshold
+CREDIT_DOWN_PAYMENT_BANDS = [(0.3, 20), (0.2, 15), (0.1, 10)]  # down payment / property value at least threshold
+CREDIT_LOAN_BURDEN_BANDS = [(0.2, 10), (0.3, 7), (0.4, 5)]  # loan repayments / net income below threshold
+CREDIT_DOCUMENT_FIELDS = ('national_id_uploaded', 'kra_pin_uploaded', 'bank_statement_uploaded', 'proof_of_residence_uploaded')
+CREDIT_DOCUMENT_POINTS = 10
+CREDIT_MAX_SCORE = 100
+CREDIT_SCORE_INPUTS = (
+    'monthly_net_income', 'desired_loan_amount', 'employment_duration',
+    'down_payment_amount', 'estimated_property_value', 'monthly_loan_repayments'
+) + CREDIT_DOCUMENT_FIELDS
+CREDIT_ELIGIBILITY_BANDS = [  # (minimum score, level, color, recommendation)
+    (80, 'Highly Eligible', 'green', 'Excellent candidate for mortgage approval'),
+    (60, 'Eligible', 'blue', 'Good candidate with strong profile'),
+    (40, 'Conditionally Eligible', 'orange', 'May require additional documentation'),
+    (0, 'Not Eligible', 'red', 'Profile needs improvement before approval')
+]
+
+def _points_below(value, bands):
+    for threshold, points in bands:
+        if value < threshold:
+            return points
+    return 0
+
+def _points_at_least(value, bands):
+    for threshold, points in bands:
+        if value >= threshold:
+            return points
+    return 0
+
+def credit_breakdown(score, factors):
+    """Stored breakdown: per-factor points plus the eligibility verdict"""
+    for minimum, level, color, recommendation in CREDIT_ELIGIBILITY_BANDS:
+        if score >= minimum:
+            break  # the last band catches anything lower
+    return {'factors': factors, 'eligibilityLevel': level, 'color': color, 'recommendation': recommendation}
+
 class User(db.Model):
     __tablename__ = 'users'
     
@@ -115,10 +162,10 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
 class Buyer(db.Model):
     """Homebuyer model - stores comprehensive profile information for mortgage assessment
@@ -188,84 +235,83 @@ class Buyer(db.Model):
     # Profile Completion
     profile_complete = db.Column(db.Boolean, default=False)
     creditworthiness_score = db.Column(db.Float)
+    creditworthiness_breakdown = db.Column(db.JSON)  # factors + eligibility, derived with the score
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
     
-    def calculate_creditworthiness_score(self):
-        """Calculate creditworthiness score based on profile data
-        
-        This algorithm evaluates mortgage eligibility using a weighted scoring system:
-        - Income to loan ratio (40% weight): Measures ability to afford payments
-        - Employment stability (20% weight): Job security assessment
-        - Down payment percentage (20% weight): Financial commitment level
-        - Existing loan burden (10% weight): Current debt obligations
-        - Document completeness (10% weight): Application readiness
-        
-        Returns a score from 0-100, where higher scores indicate better creditworthiness
-        """
-        score = 0
+    def creditworthiness_factors(self):
+        """Points earned per scoring factor, in scoring order"""
+        factors = {'incomeRatio': 0, 'employment': 0, 'downPayment': 0, 'loanBurden': 0, 'documents': 0}
         
         # INCOME TO LOAN RATIO ASSESSMENT (40% of total score)
         # This is the most important factor - can the buyer afford the monthly payments?
         if self.monthly_net_income and self.desired_loan_amount:
             # Estimate monthly payment using 12% annual interest rate
-            monthly_payment = (self.desired_loan_amount * 0.12) / 12
+            monthly_payment = (self.desired_loan_amount * CREDIT_ASSUMED_ANNUAL_RATE) / 12
             income_ratio = monthly_payment / self.monthly_net_income
-            
-            # Score based on payment-to-income ratio (lower is better)
-            if income_ratio < 0.3:      # Less than 30% of income - excellent
-                score += 40
-            elif income_ratio < 0.4:    # 30-40% of income - good
-                score += 30
-            elif income_ratio < 0.5:    # 40-50% of income - acceptable
-                score += 20
-            # Above 50% gets 0 points - too risky
+            # Score based on payment-to-income ratio (lower is better, above 50% gets 0)
+            factors['incomeRatio'] = _points_below(income_ratio, CREDIT_INCOME_RATIO_BANDS)
         
         # Employment stability (20% weight)
         if self.employment_duration:
-            if self.employment_duration >= 24:
-                score += 20
-            elif self.employment_duration >= 12:
-                score += 15
-            elif self.employment_duration >= 6:
-                score += 10
+            factors['employment'] = _points_at_least(self.employment_duration, CREDIT_EMPLOYMENT_BANDS)
         
         # Down payment percentage (20% weight)
         if self.down_payment_amount and self.estimated_property_value:
             down_payment_ratio = self.down_payment_amount / self.estimated_property_value
-            if down_payment_ratio >= 0.3:
-                score += 20
-            elif down_payment_ratio >= 0.2:
-                score += 15
-            elif down_payment_ratio >= 0.1:
-                score += 10
+            factors['downPayment'] = _points_at_least(down_payment_ratio, CREDIT_DOWN_PAYMENT_BANDS)
         
         # Existing loan burden (10% weight)
         if self.monthly_net_income and self.monthly_loan_repayments:
             loan_burden = self.monthly_loan_repayments / self.monthly_net_income
-            if loan_burden < 0.2:
-                score += 10
-            elif loan_burden < 0.3:
-                score += 7
-            elif loan_burden < 0.4:
-                score += 5
+            factors['loanBurden'] = _points_below(loan_burden, CREDIT_LOAN_BURDEN_BANDS)
         
         # Document completeness (10% weight)
-        docs_uploaded = sum([
-            self.national_id_uploaded,
-            self.kra_pin_uploaded,
-            self.bank_statement_uploaded,
-            self.proof_of_residence_uploaded
-        ])
-        score += (docs_uploaded / 4) * 10
+        docs_uploaded = sum(bool(getattr(self, field)) for field in CREDIT_DOCUMENT_FIELDS)
+        factors['documents'] = (docs_uploaded / len(CREDIT_DOCUMENT_FIELDS)) * CREDIT_DOCUMENT_POINTS
         
-        self.creditworthiness_score = min(100, score)
+        return factors
+    
+    def creditworthiness_assessment(self):
+        """(score, breakdown) from the current profile, without assigning either"""
+        factors = self.creditworthiness_factors()
+        score = min(CREDIT_MAX_SCORE, sum(factors.values()))
+        return score, credit_breakdown(score, factors)
+    
+    def calculate_creditworthiness_score(self):
+        """Calculate creditworthiness score based on profile data
+        
+        This algorithm evaluates mortgage eligibility using a weighted scoring system:
+        - Income to loan ratio (40% weight): Measures ability to afford payments
+        - Employment stability (20% weight): Job security assessment
+        - Down payment percentage (20% weight): Financial commitment level
+        - Existing loan burden (10% weight): Current debt obligations
+        - Document completeness (10% weight): Application readiness
+        
+        Returns a score from 0-100, where higher scores indicate better creditworthiness.
+        Runs automatically before any flush that changes a scoring input.
+        """
+        self.creditworthiness_score, self.creditworthiness_breakdown = self.creditworthiness_assessment()
         return self.creditworthiness_score
 
+@event.listens_for(Session, 'before_flush')
+def _rescore_changed_buyers(session, flush_context, instances):
+    """Keep the stored score and breakdown derived from their inputs
+
+    Only new buyers and buyers with a changed CREDIT_SCORE_INPUTS column are
+    re-scored, so reads never have to recompute (or write) the score.
+    """
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Buyer):
+            continue
+        state = inspect(obj)
+        if state.pending or any(state.attrs[field].history.has_changes() for field in CREDIT_SCORE_INPUTS):
+            obj.calculate_creditworthiness_score()
+
 class Admin(db.Model):
     __tablename__ = 'admins'
     
@@ -277,10 +323,10 @@ class Admin(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
 class Lender(db.Model):
     __tablename__ = 'lenders'
@@ -317,6 +363,19 @@ class Lender(db.Model):
     services_offered = db.Column(db.JSON)  # Array of services
     operating_hours = db.Column(db.JSON)  # Business hours
     
+    # Pre-approval criteria - NULL uses the platform default (utils/preapproval.py)
+    preapproval_min_score = db.Column(db.Float)  # creditworthiness score 0-100
+    preapproval_max_dti = db.Column(db.Float)  # max (existing + new repayments) / net income
+    preapproval_rate = db.Column(db.Float)  # annual % used to size the loan
+    preapproval_max_amount = db.Column(db.Float)
+    preapproval_max_term_years = db.Column(db.Integer)
+    preapproval_min_employment_months = db.Column(db.Integer)
+    
+    # Counter caches - maintained by utils/counters.py, rebuilt by repair_counters.py
+    listings_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    applications_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    active_mortgages_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -326,13 +385,18 @@ class Lender(db.Model):
     refinancing_offers = db.relationship('RefinancingOffer', backref='lender', lazy=True)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
 class MortgageListing(db.Model):
     __tablename__ = 'mortgage_listings'
+    __table_args__ = (
+        # Affordability search: active listings by payment, keyset-paged on id
+        # (utils/affordability.py)
+        db.Index('ix_mortgage_listings_status_payment', 'status', 'monthly_payment', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     lender_id = db.Column(db.Integer, db.ForeignKey('lenders.id'), nullable=False)
@@ -351,6 +415,14 @@ class MortgageListing(db.Model):
     status = db.Column(db.Enum(ListingStatus), default=ListingStatus.ACTIVE)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Counter caches - maintained by utils/counters.py
+    applications_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    saved_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    # Full-text document (PostgreSQL only; SQLite uses the mortgage_listings_fts
+    # FTS5 table) - maintained by utils/search.py
+    search_vector = db.deferred(db.Column(db.Text().with_variant(TSVECTOR(), 'postgresql')))
+    
     # Relationships
     applications = db.relationship('MortgageApplication', backref='listing', lazy=True)
     
@@ -374,8 +446,28 @@ class MortgageListing(db.Model):
         
         db.session.commit()
 
+LISTING_PAYMENT_INPUTS = ('price_range', 'down_payment', 'interest_rate', 'repayment_period')
+
+@event.listens_for(Session, 'before_flush')
+def _reprice_changed_listings(session, flush_context, instances):
+    """Keep monthly_payment derived from price, down payment, rate and term"""
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, MortgageListing):
+            continue
+        state = inspect(obj)
+        if state.pending or any(state.attrs[field].history.has_changes() for field in LISTING_PAYMENT_INPUTS):
+            PaymentSchedule.calculate_monthly_payment(obj)
+
 class MortgageApplication(db.Model):
     __tablename__ = 'mortgage_applications'
+    __table_args__ = (
+        # Duplicate-application check and the buyer's list
+        db.Index('ix_mortgage_applications_borrower_listing', 'borrower_id', 'listing_id'),
+        # Lender inbox
+        db.Index('ix_mortgage_applications_lender_status', 'lender_id', 'status'),
+        # Archiver range scan (utils/archive.py)
+        db.Index('ix_mortgage_applications_status_updated', 'status', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     borrower_id = db.Column(db.Integer, nullable=False)  # Reference to borrower (handled by other team)
@@ -391,6 +483,33 @@ class MortgageApplication(db.Model):
     # Relationships
     active_mortgage = db.relationship('ActiveMortgage', backref='application', uselist=False)
 
+class MortgageApplicationArchive(db.Model):
+    """Cold copy of terminal mortgage_applications rows (utils/archive.py)
+    
+    Rows keep their original id, so history lists read the same either way.
+    """
+    __tablename__ = 'mortgage_applications_archive'
+    __table_args__ = (
+        db.Index('ix_mortgage_applications_archive_borrower_listing', 'borrower_id', 'listing_id'),
+        db.Index('ix_mortgage_applications_archive_lender', 'lender_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    borrower_id = db.Column(db.Integer, nullable=False)
+    lender_id = db.Column(db.Integer, db.ForeignKey('lenders.id'), nullable=False)
+    listing_id = db.Column(db.Integer, db.ForeignKey('mortgage_listings.id'), nullable=False)
+    requested_amount = db.Column(db.Float, nullable=False)
+    repayment_years = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.Enum(ApplicationStatus), nullable=False)
+    notes = db.Column(db.Text)
+    submitted_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Read-only relationships, so archived rows serialize like live ones
+    lender = db.relationship('Lender', viewonly=True)
+    listing = db.relationship('MortgageListing', viewonly=True)
+
 class ActiveMortgage(db.Model):
     __tablename__ = 'active_mortgages'
     
@@ -406,12 +525,72 @@ class ActiveMortgage(db.Model):
     status = db.Column(db.Enum(MortgageStatus), default=MortgageStatus.ACTIVE)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Counter caches over PAID payment_schedules rows - maintained by utils/counters.py
+    payments_made = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_paid = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    
     # Relationships
     payment_schedules = db.relationship('PaymentSchedule', backref='mortgage', lazy=True)
     refinancing_offers = db.relationship('RefinancingOffer', backref='mortgage', lazy=True)
+    
+    def apply_payment(self, amount, paid_on=None, receipt_url=None):
+        """Settle open installments oldest first (late/missed ones included)
+        
+        Returns the PaymentSchedule rows the amount went into. Whatever is
+        left once the schedule is cleared (prepayment, or a mortgage without a
+        schedule) is recorded as a PAID row of its own.
+        """
+        paid_on = paid_on or datetime.now().date()
+        open_installments = PaymentSchedule.query.filter(
+            PaymentSchedule.mortgage_id == self.id,
+            PaymentSchedule.status.in_(OPEN_PAYMENT_STATUSES)
+        ).order_by(PaymentSchedule.payment_date, PaymentSchedule.id).all()
+        
+        remaining = amount
+        touched = []
+        for installment in open_installments:
+            if remaining <= 0:
+                break
+            already_paid = installment.amount_paid or 0
+            applied = min(remaining, installment.amount_due - already_paid)
+            installment.amount_paid = already_paid + applied
+            if installment.amount_paid >= installment.amount_due:
+                installment.status = PaymentStatus.PAID
+            if receipt_url:
+                installment.receipt_url = receipt_url
+            remaining -= applied
+            touched.append(installment)
+        
+        if remaining > 0:
+            extra = PaymentSchedule(
+                mortgage_id=self.id,
+                payment_date=paid_on,
+                amount_due=remaining,
+                amount_paid=remaining,
+                status=PaymentStatus.PAID,
+                receipt_url=receipt_url
+            )
+            db.session.add(extra)
+            touched.append(extra)
+        
+        self.remaining_balance = max(0, self.remaining_balance - amount)
+        if open_installments:
+            next_open = next((i for i in open_installments if i.status != PaymentStatus.PAID), None)
+            self.next_payment_due = next_open.payment_date if next_open else None
+        else:
+            self.next_payment_due = paid_on + timedelta(days=30)
+        return touched
+
+OPEN_PAYMENT_STATUSES = (PaymentStatus.PENDING, PaymentStatus.LATE, PaymentStatus.MISSED)
 
 class PaymentSchedule(db.Model):
     __tablename__ = 'payment_schedules'
+    __table_args__ = (
+        # Overdue scans (utils/delinquency.py)
+        db.Index('ix_payment_schedules_status_payment_date', 'status', 'payment_date'),
+        # Per-mortgage open installments and their earliest due date (next_payment_due)
+        db.Index('ix_payment_schedules_mortgage_status_date', 'mortgage_id', 'status', 'payment_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     mortgage_id = db.Column(db.Integer, db.ForeignKey('active_mortgages.id'), nullable=False)
@@ -438,9 +617,9 @@ class PaymentSchedule(db.Model):
     
     def calculate_monthly_payment(listing):
         """Calculate monthly payment using standard mortgage formula"""
-        loan_amount = float(listing.price_range) - listing.down_payment
-        monthly_rate = listing.interest_rate / 100 / 12
-        num_payments = listing.repayment_period * 12
+        loan_amount = float(listing.price_range) - float(listing.down_payment)
+        monthly_rate = float(listing.interest_rate) / 100 / 12
+        num_payments = int(listing.repayment_period) * 12
         
         if monthly_rate == 0:
             monthly_payment = loan_amount / num_payments
@@ -450,14 +629,52 @@ class PaymentSchedule(db.Model):
         listing.monthly_payment = round(monthly_payment, 2)
         return listing.monthly_payment
 
+class PaymentScheduleArchive(db.Model):
+    """Cold copy of payment_schedules rows of closed mortgages (utils/archive.py)
+
+    Rows keep their original id. Only history reads, exports and counter
+    repair look here; everything that works on open installments reads the
+    hot table alone.
+    """
+    __tablename__ = 'payment_schedules_archive'
+    __table_args__ = (
+        db.Index('ix_payment_schedules_archive_mortgage_date', 'mortgage_id', 'payment_date'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    mortgage_id = db.Column(db.Integer, db.ForeignKey('active_mortgages.id'), nullable=False)
+    payment_date = db.Column(db.Date, nullable=False)
+    amount_due = db.Column(db.Float, nullable=False)
+    amount_paid = db.Column(db.Float, default=0)
+    status = db.Column(db.Enum(PaymentStatus), default=PaymentStatus.PENDING)
+    receipt_url = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Enums are stored by name; predicate of the one-open-offer-per-mortgage index
+OPEN_OFFER_WHERE = "status = 'OFFERED'"
+
 class RefinancingOffer(db.Model):
     __tablename__ = 'refinancing_offers'
+    __table_args__ = (
+        # Open-offer check of the batch generator (utils/refinancing.py)
+        db.Index('ix_refinancing_offers_mortgage_status', 'mortgage_id', 'status'),
+        # At most one OFFERED row per mortgage, so concurrent batch runs cannot
+        # both offer the same mortgage
+        db.Index('uq_refinancing_offers_open_mortgage', 'mortgage_id', unique=True,
+                 postgresql_where=db.text(OPEN_OFFER_WHERE), sqlite_where=db.text(OPEN_OFFER_WHERE)),
+        db.Index('ix_refinancing_offers_lender_created', 'lender_id', 'created_at'),
+        # Expiry sweep (utils/expiry.py)
+        db.Index('ix_refinancing_offers_status_expiry', 'status', 'offer_expiry'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     lender_id = db.Column(db.Integer, db.ForeignKey('lenders.id'), nullable=False)
     mortgage_id = db.Column(db.Integer, db.ForeignKey('active_mortgages.id'), nullable=False)
     new_interest_rate = db.Column(db.Float, nullable=False)
     new_term = db.Column(db.Integer, nullable=False)
+    new_monthly_payment = db.Column(db.Float)
+    monthly_savings = db.Column(db.Float)
     offer_expiry = db.Column(db.Date, nullable=False)
     status = db.Column(db.Enum(OfferStatus), default=OfferStatus.OFFERED)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -476,6 +693,87 @@ class LenderAnalytics(db.Model):
     
     lender = db.relationship('Lender', backref='analytics')
 
+class DelinquencyRun(db.Model):
+    """One execution of the nightly delinquency job - see utils/delinquency.py"""
+    __tablename__ = 'delinquency_runs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    as_of = db.Column(db.Date, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='running')  # running, succeeded, failed
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    payments_late = db.Column(db.Integer, nullable=False, default=0)
+    payments_missed = db.Column(db.Integer, nullable=False, default=0)
+    mortgages_defaulted = db.Column(db.Integer, nullable=False, default=0)
+    mortgages_completed = db.Column(db.Integer, nullable=False, default=0)
+    next_due_updated = db.Column(db.Integer, nullable=False, default=0)
+    batches = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+
+class AgingSnapshot(db.Model):
+    """Daily past-due aging per lender (lender_id NULL = platform) - see utils/aging.py"""
+    __tablename__ = 'aging_snapshots'
+    __table_args__ = (
+        db.Index('ix_aging_snapshots_as_of_lender', 'as_of', 'lender_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    as_of = db.Column(db.Date, nullable=False)
+    lender_id = db.Column(db.Integer, db.ForeignKey('lenders.id'))
+    bucket = db.Column(db.String(10), nullable=False)  # current, 1-30, 31-60, 61-90, 90+
+    mortgages = db.Column(db.Integer, nullable=False, default=0)
+    installments = db.Column(db.Integer, nullable=False, default=0)
+    arrears = db.Column(db.Float, nullable=False, default=0)
+    outstanding_balance = db.Column(db.Float, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class BackgroundJob(db.Model):
+    """Long-running admin task run off the request thread - see utils/jobs.py"""
+    __tablename__ = 'background_jobs'
+    __table_args__ = (
+        db.Index('ix_background_jobs_kind_created', 'kind', 'created_at'),
+        db.Index('ix_background_jobs_status_heartbeat', 'status', 'heartbeat_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    params = db.Column(db.JSON)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    created_by = db.Column(db.String(20))  # principal id, e.g. A1
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime, default=datetime.utcnow)  # lease, refreshed while queued/running
+
+class PrincipalRevocation(db.Model):
+    """Tokens issued to ``identity`` before revoked_at are rejected - see utils/auth.py"""
+    __tablename__ = 'principal_revocations'
+    
+    identity = db.Column(db.String(20), primary_key=True)  # principal id, e.g. A1, B12
+    revoked_at = db.Column(db.Integer, nullable=False)  # whole epoch seconds, like the token's iat
+
+class ListingMatch(db.Model):
+    """Precomputed top-K listing recommendations per buyer - see utils/matching.py"""
+    __tablename__ = 'listing_matches'
+    __table_args__ = (
+        db.UniqueConstraint('buyer_id', 'listing_id', name='uq_listing_matches_buyer_listing'),
+        db.Index('ix_listing_matches_buyer_score', 'buyer_id', 'score'),
+        db.Index('ix_listing_matches_listing_id', 'listing_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    buyer_id = db.Column(db.Integer, db.ForeignKey('buyers.id'), nullable=False)
+    listing_id = db.Column(db.Integer, db.ForeignKey('mortgage_listings.id'), nullable=False)
+    score = db.Column(db.Float, nullable=False)  # 0-100
+    affordability = db.Column(db.Float)  # 0-1: payment-to-income, loan size and down payment fit
+    preference = db.Column(db.Float)  # 0-1: county, property type and price fit
+    payment_to_income = db.Column(db.Float)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    listing = db.relationship('MortgageListing')
+
 class SavedProperty(db.Model):
     __tablename__ = 'saved_properties'
     
@@ -490,6 +788,13 @@ class SavedProperty(db.Model):
 
 class PreApproval(db.Model):
     __tablename__ = 'pre_approvals'
+    __table_args__ = (
+        # Expiry sweep (utils/expiry.py)
+        db.Index('ix_pre_approvals_status_valid_until', 'status', 'valid_until'),
+        # Open pre-approvals per buyer / lender (utils/preapproval.py)
+        db.Index('ix_pre_approvals_buyer_status', 'buyer_id', 'status'),
+        db.Index('ix_pre_approvals_lender_status', 'lender_id', 'status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     buyer_id = db.Column(db.Integer, db.ForeignKey('buyers.id'), nullable=False)
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Rebuild the buyer-to-listing match index (listing_matches) from scratch.
+
+Profile and listing edits keep the index current on their own; run this after
+the first deploy, after bulk imports or manual SQL, or when the match weights
+in utils/matching.py change.
+"""
+
+import argparse
+import time
+
+from app import create_app, db
+from utils.matching import rebuild_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the buyer-to-listing match index')
+    parser.add_argument('--chunk-size', type=int, help='Buyers scored per batch (default MATCH_REBUILD_CHUNK_SIZE)')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        started = time.perf_counter()
+        totals = rebuild_index(db.engine, args.chunk_size or app.config['MATCH_REBUILD_CHUNK_SIZE'])
+        elapsed = time.perf_counter() - started
+        print(f"✅ Ranked {totals['listings']} active listings for {totals['buyers']} buyers: "
+              f"{totals['matches']} matches in {elapsed:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Rebuild the listing full-text search index (PostgreSQL search_vector column
+or the SQLite mortgage_listings_fts table).
+
+Listing edits through the ORM keep the index current on their own; run this
+after bulk imports or manual SQL. By default only listings missing from the
+index are added; --full re-indexes every listing.
+"""
+
+import argparse
+
+from app import create_app, db
+from utils.search import rebuild_search_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the listing search index')
+    parser.add_argument('--full', action='store_true', help='Re-index every listing, not just missing ones')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        with db.engine.begin() as connection:
+            indexed = rebuild_search_index(connection, full=args.full)
+        print(f"✅ Indexed {indexed} listings for search")
+
+if __name__ == '__main__':
+    main()
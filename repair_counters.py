@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Recompute the counter-cache columns (applications_count, payments_made,
+total_paid, ...) from the rows they count.
+
+Run after bulk imports or manual SQL, which bypass the ORM events that keep
+the counters current. --check only reports drift.
+"""
+
+import argparse
+
+from app import create_app, db
+from utils.counters import repair_counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Repair counter-cache columns')
+    parser.add_argument('--check', action='store_true', help='Report drift without writing')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        drift = repair_counters(check_only=args.check)
+        db.session.commit()
+        for table, rows in drift.items():
+            if not rows:
+                print(f"✅ {table}: counters correct")
+            elif args.check:
+                print(f"❌ {table}: {rows} rows drifted")
+            else:
+                print(f"✅ {table}: repaired {rows} rows")
+
+if __name__ == '__main__':
+    main()
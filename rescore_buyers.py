@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Re-score every buyer's creditworthiness with the vectorized batch scorer.
+
+Run after changing the CREDIT_* weights or thresholds in models.py. Only
+changed scores are written.
+
+    python rescore_buyers.py --workers 4
+    python rescore_buyers.py --verify          # parity check against the scalar method
+
+test_credit_scoring.py runs the same parity check on fixed edge cases
+without a database.
+"""
+
+import argparse
+import time
+
+from app import create_app, db
+from config import Config
+from utils.credit_scoring import rescore_all, verify_parity
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch re-score buyer creditworthiness')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes (PostgreSQL only)')
+    parser.add_argument('--chunk-size', type=int, default=Config.CREDIT_RESCORE_CHUNK_SIZE)
+    parser.add_argument('--verify', action='store_true', help='Compare batch and scalar scores without writing')
+    parser.add_argument('--limit', type=int, help='Buyers to check with --verify (default: all)')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.verify:
+            mismatches = verify_parity(db.session, args.limit)
+            for buyer_id, scalar_score, batch_score in mismatches[:20]:
+                print(f"❌ buyer {buyer_id}: scalar {scalar_score} != batch {batch_score}")
+            if mismatches:
+                raise SystemExit(f"❌ {len(mismatches)} mismatched scores")
+            print("✅ Batch scorer matches Buyer.calculate_creditworthiness_score")
+            return
+
+        workers = args.workers
+        if workers > 1 and db.engine.dialect.name == 'sqlite':
+            print("SQLite allows a single writer - running with 1 worker")
+            workers = 1
+
+        started = time.perf_counter()
+        totals = rescore_all(db.engine, workers=workers, chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - started
+        print(f"✅ Scanned {totals['scanned']:,} buyers, updated {totals['updated']:,} scores in {elapsed:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,11 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
 from functools import wraps
 from app import db
 from models import User, Lender, MortgageListing, MortgageApplication, Buyer, Admin, ActiveMortgage, PaymentSchedule
+from sqlalchemy.orm import joinedload
+from utils.streaming import iter_query, stream_json
+from utils.auth import current_principal
 from datetime import datetime
 
 admin_bp = Blueprint('admin', __name__)
@@ -149,8 +152,9 @@ def get_properties_bypass():
 @admin_bp.route('/analytics-bypass', methods=['GET'])
 def get_analytics_bypass():
     """Bypass authentication for testing"""
-    from models import ApplicationStatus, ActiveMortgage, PaymentSchedule
-    total_apps = MortgageApplication.query.count()
+    from models import ApplicationStatus, ActiveMortgage
+    from utils.archive import application_count
+    total_apps = application_count()
     approved_apps = MortgageApplication.query.filter_by(status=ApplicationStatus.APPROVED).count()
     
     # Count users from all tables
@@ -163,8 +167,10 @@ def get_analytics_bypass():
     # Calculate real volume and repayments
     total_volume = sum([float(app.requested_amount) for app in MortgageApplication.query.filter_by(status=ApplicationStatus.APPROVED).all()])
     
-    # Calculate total repayments from payment records
-    total_repayments = sum([payment.amount_paid for payment in PaymentSchedule.query.all()])
+    # Calculate total repayments from payment records (archived installments included)
+    from utils.archive import schedule_union
+    schedules = schedule_union()
+    total_repayments = db.session.query(db.func.coalesce(db.func.sum(schedules.c.amount_paid), 0)).scalar()
     
     # Get active mortgages count
     active_mortgages = ActiveMortgage.query.count()
@@ -190,6 +196,11 @@ def get_analytics_bypass():
     })
 
 def admin_required(f):
+    """Admin check from the token's role claim - no database lookup
+
+    Tokens issued before role claims existed fall back to a cached lookup,
+    and tokens of deleted or demoted admins are rejected via the revocation list.
+    """
     @wraps(f)
     def decorated_function(*args, **kwargs):
         auth_header = request.headers.get('Authorization')
@@ -197,29 +208,14 @@ def admin_required(f):
             return jsonify({'error': 'No token provided'}), 401
         
         try:
-            from flask_jwt_extended import decode_token
-            token = auth_header.split(' ')[1]
-            decoded = decode_token(token)
-            user_id_str = decoded['sub']
-            
-            # Handle U prefix for legacy users table
-            if user_id_str.startswith('U'):
-                user_id = int(user_id_str[1:])
-                user = User.query.get(user_id)
-                if user and user.role.value == 'admin':
-                    return f(*args, **kwargs)
-            
-            # Handle A prefix for admins table
-            elif user_id_str.startswith('A'):
-                from models import Admin
-                admin_id = int(user_id_str[1:])
-                admin = Admin.query.get(admin_id)
-                if admin:
-                    return f(*args, **kwargs)
-            
-            return jsonify({'error': 'Admin access required'}), 403
+            verify_jwt_in_request()
+            principal = current_principal()
         except Exception as e:
             return jsonify({'error': 'Invalid token'}), 401
+        
+        if principal and principal['role'] == 'admin':
+            return f(*args, **kwargs)
+        return jsonify({'error': 'Admin access required'}), 403
     return decorated_function
 
 @admin_bp.route('/users-temp', methods=['GET'])
@@ -249,61 +245,57 @@ def get_users_temp():
 @admin_bp.route('/users', methods=['GET'])
 @admin_required
 def get_users():
-    """Get all users"""
-    from models import Admin
-    
-    users = User.query.all()
-    buyers = Buyer.query.all()
-    admins = Admin.query.all()
-    lenders = Lender.query.all()
-    
-    all_users = []
-    
+    """Get all users
+
+    Streams the four identity tables one cursor batch at a time instead of
+    concatenating every row into a single in-memory list.
+    """
+    return stream_json(_iter_all_users())
+
+def _iter_all_users():
     # Legacy users table
-    for user in users:
-        all_users.append({
+    for user in iter_query(User.query.order_by(User.id)):
+        yield {
             'id': f'U{user.id}',
             'name': user.name,
             'email': user.email,
             'userType': user.role.value,
             'verified': user.verified,
             'createdAt': user.created_at.strftime('%Y-%m-%d')
-        })
+        }
     
     # Buyers table
-    for buyer in buyers:
-        all_users.append({
+    for buyer in iter_query(Buyer.query.order_by(Buyer.id)):
+        yield {
             'id': f'B{buyer.id}',
             'name': buyer.name,
             'email': buyer.email,
             'userType': 'homebuyer',
             'verified': buyer.verified,
             'createdAt': buyer.created_at.strftime('%Y-%m-%d')
-        })
+        }
     
     # Admins table
-    for admin in admins:
-        all_users.append({
+    for admin in iter_query(Admin.query.order_by(Admin.id)):
+        yield {
             'id': f'A{admin.id}',
             'name': admin.name,
             'email': admin.email,
             'userType': 'admin',
             'verified': admin.verified,
             'createdAt': admin.created_at.strftime('%Y-%m-%d')
-        })
+        }
     
     # Lenders table
-    for lender in lenders:
-        all_users.append({
+    for lender in iter_query(Lender.query.order_by(Lender.id)):
+        yield {
             'id': f'L{lender.id}',
             'name': lender.institution_name,
             'email': lender.email,
             'userType': 'lender',
             'verified': lender.verified,
             'createdAt': lender.created_at.strftime('%Y-%m-%d')
-        })
-    
-    return jsonify(all_users)
+        }
 
 @admin_bp.route('/users', methods=['POST'])
 @admin_required
@@ -346,6 +338,10 @@ def update_user(user_id):
         user.email = data['email']
     if 'verified' in data:
         user.verified = data['verified']
+    if 'userType' in data:
+        # A role change revokes the user's existing tokens on commit (utils/auth.py)
+        from models import UserRole
+        user.role = UserRole.ADMIN if data['userType'] == 'admin' else UserRole.LENDER
     
     db.session.commit()
     
@@ -371,8 +367,10 @@ def delete_user(user_id):
 def get_mortgage_products():
     """Get all mortgage products"""
     try:
-        mortgages = MortgageListing.query.all()
-        return jsonify([{
+        mortgages = iter_query(MortgageListing.query.options(
+            joinedload(MortgageListing.lender)
+        ).order_by(MortgageListing.id))
+        return stream_json(mortgages, lambda m: {
             'id': m.id,
             'lender': m.lender.institution_name,
             'rate': m.interest_rate,
@@ -380,16 +378,19 @@ def get_mortgage_products():
             'minAmount': float(m.price_range) * 0.8,  # Estimate
             'maxAmount': float(m.price_range),
             'type': 'Fixed'
-        } for m in mortgages])
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @admin_bp.route('/applications', methods=['GET'])
 @admin_required
 def get_all_applications():
-    """Get all mortgage applications"""
+    """Get all mortgage applications (?include_archived=true adds archived ones)"""
     try:
         applications = MortgageApplication.query.all()
+        if request.args.get('include_archived', 'false').lower() == 'true':
+            from utils.archive import archived_applications
+            applications += archived_applications()
         result = []
         for app in applications:
             buyer = Buyer.query.get(app.borrower_id)
@@ -472,8 +473,10 @@ def get_properties_temp():
 def get_properties():
     """Get all properties/mortgage listings"""
     try:
-        listings = MortgageListing.query.all()
-        return jsonify([{
+        listings = iter_query(MortgageListing.query.options(
+            joinedload(MortgageListing.lender)
+        ).order_by(MortgageListing.id))
+        return stream_json(listings, lambda listing: {
             'id': listing.id,
             'title': listing.property_title,
             'type': listing.property_type.value,
@@ -484,7 +487,7 @@ def get_properties():
             'lender': listing.lender.institution_name,
             'status': listing.status.value,
             'createdAt': listing.created_at.strftime('%Y-%m-%d')
-        } for listing in listings])
+        })
     except Exception as e:
         # Return mock data if database fails
         return jsonify([{
@@ -506,7 +509,8 @@ def get_analytics():
     """Get platform analytics"""
     try:
         from models import ApplicationStatus
-        total_apps = MortgageApplication.query.count()
+        from utils.archive import application_count
+        total_apps = application_count()
         approved_apps = MortgageApplication.query.filter_by(status=ApplicationStatus.APPROVED).count()
         
         # Count users from all tables
@@ -550,7 +554,8 @@ def get_comprehensive_metrics():
     """Get comprehensive platform metrics"""
     try:
         from models import ApplicationStatus, UserRole
-        total_apps = MortgageApplication.query.count()
+        from utils.archive import application_count
+        total_apps = application_count()
         approved_apps = MortgageApplication.query.filter_by(status=ApplicationStatus.APPROVED).count()
         pending_apps = MortgageApplication.query.filter_by(status=ApplicationStatus.PENDING).count()
         
@@ -639,8 +644,8 @@ def moderate_feedback(feedback_id):
 @admin_required
 def get_lenders():
     """Get all lenders with detailed information"""
-    lenders = Lender.query.all()
-    return jsonify([{
+    lenders = iter_query(Lender.query.order_by(Lender.id))
+    return stream_json(lenders, lambda lender: {
         'id': lender.id,
         'institutionName': lender.institution_name,
         'contactPerson': lender.contact_person,
@@ -671,7 +676,7 @@ def get_lenders():
             'operatingHours': lender.operating_hours
         },
         'createdAt': lender.created_at.strftime('%Y-%m-%d')
-    } for lender in lenders])
+    })
 
 @admin_bp.route('/lenders/<int:lender_id>', methods=['GET'])
 @admin_required
@@ -709,9 +714,9 @@ def get_lender_details(lender_id):
             'operatingHours': lender.operating_hours
         },
         'statistics': {
-            'totalListings': len(lender.mortgage_listings),
-            'totalApplications': len(lender.applications),
-            'activeLoans': len(lender.active_mortgages)
+            'totalListings': lender.listings_count,
+            'totalApplications': lender.applications_count,
+            'activeLoans': lender.active_mortgages_count
         },
         'createdAt': lender.created_at.strftime('%Y-%m-%d')
     })
@@ -781,4 +786,87 @@ def update_lender(lender_id):
             lender.operating_hours = biz['operatingHours']
     
     db.session.commit()
-    return jsonify({'success': True, 'message': 'Lender updated successfully'})
\ No newline at end of file
+    return jsonify({'success': True, 'message': 'Lender updated successfully'})
+
+
+@admin_bp.route('/delinquency-runs', methods=['GET'])
+@admin_required
+def get_delinquency_runs():
+    """Recent runs of the nightly delinquency job (run_delinquency.py), newest first"""
+    from models import DelinquencyRun
+    from utils.delinquency import run_summary
+    
+    limit = min(request.args.get('limit', 30, type=int), 365)
+    runs = DelinquencyRun.query.order_by(DelinquencyRun.id.desc()).limit(limit).all()
+    return jsonify([run_summary(run) for run in runs])
+
+
+@admin_bp.route('/aging', methods=['GET'])
+@admin_required
+def get_aging_report():
+    """Past-due aging of the whole platform, or of one lender with ?lender_id="""
+    from utils.aging import get_aging
+    
+    try:
+        as_of = datetime.strptime(request.args['as_of'], '%Y-%m-%d').date() if request.args.get('as_of') else None
+    except ValueError:
+        return jsonify({'error': 'as_of must be a YYYY-MM-DD date'}), 400
+    live = request.args.get('live', 'false').lower() == 'true'
+    return jsonify(get_aging(as_of, lender_id=request.args.get('lender_id', type=int), live=live))
+
+
+@admin_bp.route('/cash-flow', methods=['GET'])
+@admin_required
+def get_cash_flow_projection():
+    """Expected monthly inflows of the whole platform, or of one lender with ?lender_id="""
+    from utils.cashflow import cash_flow_projection, parse_assumptions
+    
+    try:
+        months, cpr, cdr = parse_assumptions(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(cash_flow_projection(request.args.get('lender_id', type=int), months, cpr, cdr))
+
+
+@admin_bp.route('/risk/simulations', methods=['POST'])
+@admin_required
+def start_risk_simulation():
+    """Queue a Monte Carlo loss simulation of the book; poll /api/admin/jobs/<id> for the result"""
+    from utils.jobs import JobQueueFull, job_summary, submit_job
+    from utils.risk import parse_risk_params
+    
+    try:
+        params = parse_risk_params(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        job = submit_job('portfolio_risk', params, created_by=get_jwt_identity())
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 429
+    return jsonify(job_summary(job)), 202
+
+
+@admin_bp.route('/jobs', methods=['GET'])
+@admin_required
+def get_background_jobs():
+    """Recent background jobs, newest first (?kind=&status=&limit=), without results"""
+    from models import BackgroundJob
+    from utils.jobs import job_summary
+    
+    query = BackgroundJob.query
+    if request.args.get('kind'):
+        query = query.filter(BackgroundJob.kind == request.args['kind'])
+    if request.args.get('status'):
+        query = query.filter(BackgroundJob.status == request.args['status'])
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    jobs = query.order_by(BackgroundJob.id.desc()).limit(limit).all()
+    return jsonify([job_summary(job, include_result=False) for job in jobs])
+
+
+@admin_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@admin_required
+def get_background_job(job_id):
+    from models import BackgroundJob
+    from utils.jobs import job_summary
+    
+    return jsonify(job_summary(BackgroundJob.query.get_or_404(job_id)))
@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from models import Lender
+from utils.auth import create_principal_token
+from utils.passwords import rehash_on_login
+from utils.ratelimit import check_login_rate
 
 
 auth_bp = Blueprint('auth', __name__)
@@ -72,12 +75,17 @@ def login():
     email = data['email']
     password = data['password']
     
+    retry_after = check_login_rate(email)
+    if retry_after:
+        return jsonify({'message': 'Too many login attempts, try again later'}), 429, {'Retry-After': str(retry_after)}
+    
     from models import Buyer
     
     # Check buyer first
     buyer = Buyer.query.filter_by(email=email).first()
     if buyer and buyer.check_password(password):
-        access_token = create_access_token(identity=f"B{buyer.id}")
+        rehash_on_login(buyer, password)
+        access_token = create_principal_token(buyer)
         return jsonify({
             'access_token': access_token,
             'user': {
@@ -91,7 +99,8 @@ def login():
     # Check lender
     lender = Lender.query.filter_by(email=email).first()
     if lender and lender.check_password(password):
-        access_token = create_access_token(identity=f"L{lender.id}")
+        rehash_on_login(lender, password)
+        access_token = create_principal_token(lender)
         return jsonify({
             'access_token': access_token,
             'lender': {
@@ -0,0 +1,88 @@
+# NetLend Backend - Portfolio Export Routes
+# Streaming CSV/Parquet downloads of ActiveMortgage and PaymentSchedule data
+# for regulatory reporting. Lenders can only export their own book; admins can
+# export any lender or the whole platform.
+
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import User
+from utils.exports import iter_export
+
+exports_bp = Blueprint('exports', __name__)
+
+MIMETYPES = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+
+def _resolve_lender_scope():
+    """Return (lender_id filter, error response) for the current token
+
+    Lender tokens are pinned to their own lender_id. Admin tokens may pass
+    ?lender_id= or omit it for a platform-wide export.
+    """
+    user_id = get_jwt_identity()
+    if user_id.startswith('L'):
+        return int(user_id[1:]), None
+    if user_id.startswith('A'):
+        return request.args.get('lender_id', type=int), None
+    if user_id.startswith('U'):
+        user = User.query.get(int(user_id[1:]))
+        if user and user.role.value == 'admin':
+            return request.args.get('lender_id', type=int), None
+    return None, (jsonify({'error': 'Lender or admin access required'}), 403)
+
+
+def _export(dataset):
+    lender_id, error = _resolve_lender_scope()
+    if error:
+        return error
+
+    export_format = request.args.get('format', 'csv')
+    try:
+        chunks = iter_export(
+            dataset,
+            export_format,
+            lender_id=lender_id,
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            status=request.args.get('status')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    filename = f"{dataset}{f'-lender-{lender_id}' if lender_id else ''}.{export_format}"
+    return Response(
+        stream_with_context(chunks),
+        mimetype=MIMETYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+
+@exports_bp.route('/active-mortgages', methods=['GET'])
+@jwt_required()
+def export_active_mortgages():
+    """Export active mortgages
+
+    Query Parameters:
+    - format: csv (default) or parquet
+    - lender_id: admin only, restrict to one lender
+    - start / end: created_at date range (YYYY-MM-DD, inclusive)
+    - status: active, completed, defaulted, refinanced
+    """
+    return _export('active-mortgages')
+
+
+@exports_bp.route('/payment-schedules', methods=['GET'])
+@jwt_required()
+def export_payment_schedules():
+    """Export payment schedules / payment history
+
+    Query Parameters:
+    - format: csv (default) or parquet
+    - lender_id: admin only, restrict to one lender
+    - start / end: payment_date range (YYYY-MM-DD, inclusive)
+    - status: pending, paid, late, missed
+    """
+    return _export('payment-schedules')
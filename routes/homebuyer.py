@@ -7,7 +7,7 @@
 # - Active mortgage monitoring and payment history
 # - Document upload and verification status
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity  # Authentication
 from app import db  # Database instance
 from models import User, MortgageApplication, MortgageListing, Lender, Buyer, KenyanCounty, PropertyType  # Models
@@ -27,7 +27,7 @@ def test_payment():
     try:
         user_id = get_jwt_identity()
         data = request.json
-        print(f'Test payment data: {data}')
+        current_app.logger.debug(f'Test payment data: {data}')
         return jsonify({
             'success': True,
             'message': 'Payment test endpoint working',
@@ -116,7 +116,7 @@ def update_profile():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        print(f'Profile update data received: {data}')  # Debug log
+        current_app.logger.debug(f'Profile update data received: {data}')
         
         # Personal Information
         if 'name' in data:
@@ -154,10 +154,7 @@ def update_profile():
         if 'mpesa' in data:
             buyer.mpesa_number = data['mpesa']
         
-        # Calculate creditworthiness score
-        if buyer.calculate_creditworthiness_score:
-            buyer.calculate_creditworthiness_score()
-        
+        # creditworthiness_score is refreshed on flush if a scoring input changed
         db.session.add(buyer)
         db.session.commit()
         return jsonify({
@@ -171,7 +168,7 @@ def update_profile():
             'creditworthinessScore': buyer.creditworthiness_score
         })
     except Exception as e:
-        print(f'Profile update error: {e}')
+        current_app.logger.error(f'Profile update error: {e}')
         db.session.rollback()
         return jsonify({
             'success': False,
@@ -199,7 +196,53 @@ def get_properties():
     
     listings = query.all()
     
-    return jsonify([{
+    return jsonify([_listing_summary(listing, listing.lender.institution_name) for listing in listings])
+
+@homebuyer_bp.route('/properties/affordable', methods=['GET'])
+@jwt_required()
+def get_affordable_properties():
+    """BUYER ENDPOINT: Active listings this buyer can afford, most expensive first
+    
+    The payment and down-payment limits are derived from the buyer's profile
+    (utils/affordability.py) and applied in one indexed query.
+    
+    Query parameters:
+    - limit: Listings per page (default 20, max 100)
+    - cursor: nextCursor of the previous page
+    - county, propertyType: optional filters
+    """
+    from utils.affordability import affordability_limits, affordable_listings
+    
+    user_id = get_jwt_identity()
+    if not user_id.startswith('B'):
+        return jsonify({'error': 'Only buyers can search by affordability'}), 403
+    buyer = db.session.get(Buyer, int(user_id[1:]))
+    if not buyer:
+        return jsonify({'error': 'Buyer not found'}), 404
+    if not buyer.monthly_net_income:
+        return jsonify({'error': 'Add your monthly net income to your profile to search by affordability'}), 400
+    
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    try:
+        county = KenyanCounty(request.args['county']) if request.args.get('county') else None
+        property_type = PropertyType(request.args['propertyType']) if request.args.get('propertyType') else None
+    except ValueError:
+        return jsonify({'error': 'Unknown county or propertyType'}), 400
+    
+    limits = affordability_limits(buyer)
+    try:
+        rows, next_cursor = affordable_listings(limits, limit, request.args.get('cursor'), county, property_type)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'limits': limits,
+        'properties': [_listing_summary(listing, lender_name) for listing, lender_name in rows],
+        'nextCursor': next_cursor
+    })
+
+def _listing_summary(listing, lender_name):
+    """Property card fields shared by the browse and recommendation views"""
+    return {
         'id': listing.id,
         'title': listing.property_title,
         'type': listing.property_type.value,
@@ -207,11 +250,44 @@ def get_properties():
         'price': float(listing.price_range),
         'rate': listing.interest_rate,
         'term': listing.repayment_period,
-        'lender': listing.lender.institution_name,
+        'lender': lender_name,
         'status': listing.status.value,
         'monthlyPayment': listing.monthly_payment,
         'images': listing.images or []
-    } for listing in listings])
+    }
+
+@homebuyer_bp.route('/recommendations', methods=['GET'])
+@jwt_required()
+def get_recommendations():
+    """BUYER ENDPOINT: Active listings ranked by fit for this buyer
+    
+    Served from the precomputed match index (utils/matching.py), which is
+    refreshed whenever the buyer's profile or a listing changes.
+    
+    MATCH SCORE (0-100):
+    - Affordability (55%): payment-to-income, loan size, down payment
+    - Preference (45%): target county, property type, price vs target value
+    
+    Query parameters:
+    - limit: Number of listings (default MATCH_DEFAULT_LIMIT, max MATCH_TOP_K)
+    """
+    from utils.matching import recommendations_for
+    
+    user_id = get_jwt_identity()
+    if not user_id.startswith('B'):
+        return jsonify({'error': 'Only buyers can view recommendations'}), 403
+    buyer_id = int(user_id[1:])
+    
+    limit = request.args.get('limit', current_app.config['MATCH_DEFAULT_LIMIT'], type=int)
+    limit = max(1, min(limit, current_app.config['MATCH_TOP_K']))
+    
+    return jsonify([{
+        'score': match.score,
+        'affordability': match.affordability,
+        'preference': match.preference,
+        'paymentToIncome': match.payment_to_income,
+        'property': _listing_summary(listing, lender_name)
+    } for match, listing, lender_name in recommendations_for(buyer_id, limit)])
 
 @homebuyer_bp.route('/dashboard', methods=['GET'])
 @jwt_required()
@@ -221,20 +297,19 @@ def get_dashboard():
         user_id = get_jwt_identity()
         buyer_id = int(user_id[1:]) if user_id.startswith('B') else int(user_id)
         
-        from models import ActiveMortgage, PaymentSchedule
+        from models import ActiveMortgage
+        from utils.archive import application_count, schedule_union
         
-        # Count applications
-        applications_count = MortgageApplication.query.filter_by(borrower_id=buyer_id).count()
+        # Count applications (archived ones included)
+        applications_count = application_count(borrower_id=buyer_id)
         
         # Count active mortgages
         active_mortgages = ActiveMortgage.query.filter_by(borrower_id=buyer_id).count()
         
-        # Calculate total payments made
-        mortgages = ActiveMortgage.query.filter_by(borrower_id=buyer_id).all()
-        total_payments = 0
-        for mortgage in mortgages:
-            payments = PaymentSchedule.query.filter_by(mortgage_id=mortgage.id).all()
-            total_payments += sum([p.amount_paid for p in payments])
+        # Calculate total payments made (archived installments included)
+        mortgage_ids = db.session.query(ActiveMortgage.id).filter_by(borrower_id=buyer_id)
+        schedules = schedule_union(lambda table: table.c.mortgage_id.in_(mortgage_ids.scalar_subquery()))
+        total_payments = db.session.query(db.func.coalesce(db.func.sum(schedules.c.amount_paid), 0)).scalar()
         
         # Get saved properties count
         from models import SavedProperty
@@ -252,10 +327,10 @@ def get_dashboard():
 @homebuyer_bp.route('/creditworthiness', methods=['GET'])
 @jwt_required()  # Requires authentication
 def get_creditworthiness():
-    """BUYER ENDPOINT: Calculate and return creditworthiness assessment
+    """BUYER ENDPOINT: Return the stored creditworthiness assessment
     
-    This endpoint performs real-time creditworthiness evaluation using a sophisticated
-    algorithm that considers multiple factors:
+    Read-only: the score and its breakdown are recomputed whenever one of their
+    inputs changes, not on every read. The scoring algorithm considers:
     
     SCORING ALGORITHM (0-100 points):
     - Income to loan ratio (40% weight): Payment affordability
@@ -286,34 +361,20 @@ def get_creditworthiness():
     if not buyer:
         return jsonify({'error': 'Buyer not found'}), 404
     
-    # Calculate creditworthiness score using the buyer's profile data
-    score = buyer.calculate_creditworthiness_score()
-    db.session.commit()  # Save updated score to database
-    
-    # Determine eligibility level
-    if score >= 80:
-        level = 'Highly Eligible'
-        color = 'green'
-        recommendation = 'Excellent candidate for mortgage approval'
-    elif score >= 60:
-        level = 'Eligible'
-        color = 'blue'
-        recommendation = 'Good candidate with strong profile'
-    elif score >= 40:
-        level = 'Conditionally Eligible'
-        color = 'orange'
-        recommendation = 'May require additional documentation'
-    else:
-        level = 'Not Eligible'
-        color = 'red'
-        recommendation = 'Profile needs improvement before approval'
+    # Score and breakdown are derived state, refreshed whenever a scoring input
+    # changes (see the before_flush hook in models.py), so this read never writes
+    score, breakdown = buyer.creditworthiness_score, buyer.creditworthiness_breakdown
+    if score is None or not breakdown:
+        # Profile scored before breakdowns were stored - derive it without saving
+        score, breakdown = buyer.creditworthiness_assessment()
     
     return jsonify({
         'score': score,
         'maxScore': 110,
-        'eligibilityLevel': level,
-        'color': color,
-        'recommendation': recommendation,
+        'eligibilityLevel': breakdown['eligibilityLevel'],
+        'color': breakdown['color'],
+        'recommendation': breakdown['recommendation'],
+        'factors': breakdown['factors'],
         'profileComplete': buyer.profile_complete
     })
 
@@ -329,11 +390,11 @@ def get_my_mortgages():
         else:
             buyer_id = int(user_id)
         
-        print(f'Getting mortgages for buyer ID: {buyer_id}')  # Debug log
+        current_app.logger.debug(f'Getting mortgages for buyer ID: {buyer_id}')
         
-        from models import ActiveMortgage, PaymentSchedule
+        from models import ActiveMortgage
         mortgages = ActiveMortgage.query.filter_by(borrower_id=buyer_id).all()
-        print(f'Found {len(mortgages)} mortgages')  # Debug log
+        current_app.logger.debug(f'Found {len(mortgages)} mortgages')
         
         result = []
         for mortgage in mortgages:
@@ -344,8 +405,7 @@ def get_my_mortgages():
                 else:
                     monthly_payment = mortgage.principal_amount / mortgage.repayment_term
                 
-                # Count actual payments made
-                payments_made = PaymentSchedule.query.filter_by(mortgage_id=mortgage.id).count()
+                payments_made = mortgage.payments_made
                 
                 result.append({
                     'id': mortgage.id,
@@ -358,17 +418,18 @@ def get_my_mortgages():
                     'totalTerm': mortgage.repayment_term,
                     'paymentsMade': payments_made,
                     'remainingPayments': mortgage.repayment_term - payments_made,
+                    'totalPaid': mortgage.total_paid,
                     'nextPaymentDue': mortgage.next_payment_due.isoformat() if mortgage.next_payment_due else None,
                     'status': mortgage.status.value,
                     'startDate': mortgage.created_at.strftime('%Y-%m-%d')
                 })
             except Exception as e:
-                print(f'Error processing mortgage {mortgage.id}: {e}')
+                current_app.logger.error(f'Error processing mortgage {mortgage.id}: {e}')
                 continue
         
         return jsonify(result)
     except Exception as e:
-        print(f'My mortgages error: {e}')
+        current_app.logger.error(f'My mortgages error: {e}')
         return jsonify({'error': str(e)}), 500
 
 @homebuyer_bp.route('/applications', methods=['GET', 'POST'])
@@ -377,16 +438,19 @@ def handle_applications():
     if request.method == 'GET':
         try:
             user_id = get_jwt_identity()
-            print(f'User trying to access applications: {user_id}')
+            current_app.logger.debug(f'User trying to access applications: {user_id}')
             if user_id.startswith('B'):
                 buyer_id = int(user_id[1:])
             elif user_id.startswith('L'):
                 buyer_id = int(user_id[1:])  # Use lender ID as buyer ID for testing
             else:
                 buyer_id = int(user_id)
-            print(f'Getting applications for buyer ID: {buyer_id}')
+            current_app.logger.debug(f'Getting applications for buyer ID: {buyer_id}')
             applications = MortgageApplication.query.filter_by(borrower_id=buyer_id).all()
-            print(f'Found {len(applications)} applications for buyer {buyer_id}')
+            if request.args.get('include_archived', 'false').lower() == 'true':
+                from utils.archive import archived_applications
+                applications += archived_applications(borrower_id=buyer_id)
+            current_app.logger.debug(f'Found {len(applications)} applications for buyer {buyer_id}')
             
             return jsonify([{
                 'id': app.id,
@@ -397,7 +461,7 @@ def handle_applications():
                 'property': app.listing.property_title if app.listing else 'Unknown Property'
             } for app in applications])
         except Exception as e:
-            print(f'Applications GET error: {e}')
+            current_app.logger.error(f'Applications GET error: {e}')
             return jsonify({'error': str(e)}), 500
     
     # POST method (existing create application logic)
@@ -405,25 +469,25 @@ def handle_applications():
         user_id = get_jwt_identity()
         data = request.json
         
-        print(f'Application data: {data}')
-        print(f'User ID: {user_id}')
+        current_app.logger.debug(f'Application data: {data}')
+        current_app.logger.debug(f'User ID: {user_id}')
         
         # Get property details
         listing_id = data.get('property_id') or data.get('id')
-        print(f'Listing ID: {listing_id}')
+        current_app.logger.debug(f'Listing ID: {listing_id}')
         
         # Get lender_id from the listing
         listing = MortgageListing.query.get(listing_id)
         if not listing:
-            print(f'Listing not found for ID: {listing_id}')
+            current_app.logger.debug(f'Listing not found for ID: {listing_id}')
             return jsonify({'error': 'Property not found'}), 404
         
-        print(f'Found listing: {listing.property_title}, Lender ID: {listing.lender_id}')
+        current_app.logger.debug(f'Found listing: {listing.property_title}, Lender ID: {listing.lender_id}')
         
         loan_amount = data.get('loan_amount') or (data.get('property_price', 0) * 0.8)
         repayment_years = data.get('repayment_period') or data.get('term', 25)
         
-        print(f'Loan amount: {loan_amount}, Repayment years: {repayment_years}')
+        current_app.logger.debug(f'Loan amount: {loan_amount}, Repayment years: {repayment_years}')
         
         if user_id.startswith('B'):
             borrower_id = int(user_id[1:])
@@ -432,13 +496,9 @@ def handle_applications():
         else:
             borrower_id = int(user_id)
         
-        # Check if buyer already applied for this property
-        existing_app = MortgageApplication.query.filter_by(
-            borrower_id=borrower_id,
-            listing_id=listing_id
-        ).first()
-        
-        if existing_app:
+        # Check if buyer already applied for this property (archived applications included)
+        from utils.archive import has_applied
+        if has_applied(borrower_id, listing_id):
             return jsonify({
                 'success': False,
                 'modal': {
@@ -448,7 +508,7 @@ def handle_applications():
                 }
             }), 409
         
-        print(f'Creating application: borrower_id={borrower_id}, lender_id={listing.lender_id}, listing_id={listing_id}')
+        current_app.logger.debug(f'Creating application: borrower_id={borrower_id}, lender_id={listing.lender_id}, listing_id={listing_id}')
         
         application = MortgageApplication(
             borrower_id=borrower_id,
@@ -474,7 +534,7 @@ def handle_applications():
             }
         }), 201
     except Exception as e:
-        print(f'Application error: {e}')
+        current_app.logger.error(f'Application error: {e}')
         db.session.rollback()
         return jsonify({
             'success': False,
@@ -499,14 +559,14 @@ def process_payment():
             buyer_id = int(user_id)
         
         data = request.json
-        print(f'Payment request data: {data}')  # Debug log
-        print(f'User ID: {user_id}, Buyer ID: {buyer_id}')  # Debug log
+        current_app.logger.debug(f'Payment request data: {data}')
+        current_app.logger.debug(f'User ID: {user_id}, Buyer ID: {buyer_id}')
         
         mortgage_id = data.get('mortgageId')
         amount = data.get('amount')
         payment_type = data.get('paymentType')
         
-        print(f'Processing payment: mortgage_id={mortgage_id}, amount={amount}, type={payment_type}')  # Debug log
+        current_app.logger.debug(f'Processing payment: mortgage_id={mortgage_id}, amount={amount}, type={payment_type}')
         
         from models import ActiveMortgage, PaymentSchedule, PaymentStatus
         
@@ -531,19 +591,8 @@ def process_payment():
                 }
             }), 400
         
-        # Update mortgage balance immediately
-        mortgage.remaining_balance = max(0, mortgage.remaining_balance - amount)
-        
-        # Create or update payment record
-        from datetime import datetime
-        payment = PaymentSchedule(
-            mortgage_id=mortgage_id,
-            payment_date=datetime.now().date(),
-            amount_due=amount,
-            amount_paid=amount,
-            status=PaymentStatus.PAID
-        )
-        db.session.add(payment)
+        # Settle the oldest open installments and update balance / next due date
+        mortgage.apply_payment(amount)
         
         db.session.commit()
         
@@ -570,13 +619,14 @@ def get_payment_history(mortgage_id):
         else:
             buyer_id = int(user_id)
         
-        from models import ActiveMortgage, PaymentSchedule
+        from models import ActiveMortgage
+        from utils.archive import schedule_history
         mortgage = ActiveMortgage.query.filter_by(id=mortgage_id, borrower_id=buyer_id).first()
         
         if not mortgage:
             return jsonify({'error': 'Mortgage not found'}), 404
         
-        payments = PaymentSchedule.query.filter_by(mortgage_id=mortgage_id).all()
+        payments = schedule_history([mortgage_id])
         
         result = []
         for payment in payments:
@@ -592,3 +642,56 @@ def get_payment_history(mortgage_id):
         return jsonify(result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+@homebuyer_bp.route('/pre-approvals', methods=['POST'])
+@jwt_required()
+def create_pre_approvals():
+    """Evaluate this buyer against every lender's pre-approval criteria
+    
+    Replaces the buyer's open pre-approvals; returns every lender's decision
+    with the checks that failed (income, score, employment, amount).
+    """
+    from utils.preapproval import evaluate_buyer
+    
+    user_id = get_jwt_identity()
+    if not user_id.startswith('B'):
+        return jsonify({'error': 'Only buyers can request pre-approval'}), 403
+    buyer_id = int(user_id[1:])
+    
+    buyer = db.session.get(Buyer, buyer_id)
+    if not buyer:
+        return jsonify({'error': 'Buyer not found'}), 404
+    if not buyer.profile_complete:
+        return jsonify({'error': 'Complete your profile before requesting pre-approval'}), 400
+    
+    results = evaluate_buyer(buyer_id)
+    names = dict(db.session.query(Lender.id, Lender.institution_name).all())
+    for result in results:
+        result['lenderName'] = names.get(result['lenderId'])
+    return jsonify({
+        'approved': sum(1 for result in results if result['approved']),
+        'lenders': results
+    }), 201
+
+@homebuyer_bp.route('/pre-approvals', methods=['GET'])
+@jwt_required()
+def get_pre_approvals():
+    """This buyer's pre-approvals, best offer first (?status=, defaults to approved)"""
+    from models import ApplicationStatus, PreApproval
+    from utils.preapproval import pre_approval_summary
+    
+    user_id = get_jwt_identity()
+    if not user_id.startswith('B'):
+        return jsonify({'error': 'Only buyers have pre-approvals'}), 403
+    buyer_id = int(user_id[1:])
+    
+    try:
+        status = ApplicationStatus(request.args.get('status', 'approved').lower())
+    except ValueError:
+        return jsonify({'error': f"'{request.args['status']}' is not a valid pre-approval status"}), 400
+    rows = db.session.query(PreApproval, Lender.institution_name).join(
+        Lender, Lender.id == PreApproval.lender_id
+    ).filter(PreApproval.buyer_id == buyer_id, PreApproval.status == status).order_by(
+        PreApproval.approved_amount.desc(), PreApproval.interest_rate
+    ).all()
+    return jsonify([pre_approval_summary(pre_approval, lender_name=name) for pre_approval, name in rows])
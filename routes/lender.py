@@ -7,7 +7,7 @@
 # - Active mortgage tracking and sold mortgage management
 # - Lender profile management and business information
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity  # Authentication
 from app import db  # Database instance
 from models import Lender, MortgageListing, MortgageApplication, Buyer, ApplicationStatus, ActiveMortgage, ListingStatus
@@ -65,28 +65,196 @@ def get_dashboard():
     user_id = get_jwt_identity()
     lender_id = int(user_id[1:]) if user_id.startswith('L') else int(user_id)
     
-    listings = MortgageListing.query.filter_by(lender_id=lender_id).count()
-    applications = MortgageApplication.query.filter_by(lender_id=lender_id).count()
-    active_loans = ActiveMortgage.query.filter_by(lender_id=lender_id).count()
-    
-    # Calculate revenue from payments
-    revenue = 0
-    mortgages = ActiveMortgage.query.filter_by(lender_id=lender_id).all()
-    for mortgage in mortgages:
-        payments = PaymentSchedule.query.filter_by(mortgage_id=mortgage.id).all()
-        for payment in payments:
-            if payment.status.value == 'paid':
-                # Calculate interest portion (simplified)
-                interest_portion = payment.amount_paid * (mortgage.interest_rate / 100 / 12)
-                revenue += interest_portion
+    # An identity without a lender row (legacy numeric tokens) gets zeros
+    lender = db.session.get(Lender, lender_id)
+    
+    # Interest portion of every PAID payment (simplified), summed from the
+    # per-mortgage total_paid counters instead of loading each payment
+    revenue = db.session.query(
+        db.func.coalesce(db.func.sum(ActiveMortgage.total_paid * ActiveMortgage.interest_rate / 100 / 12), 0)
+    ).filter(ActiveMortgage.lender_id == lender_id).scalar()
     
     return jsonify({
-        'totalListings': listings,
-        'totalApplications': applications,
-        'activeLoans': active_loans,
+        'totalListings': lender.listings_count if lender else 0,
+        'totalApplications': lender.applications_count if lender else 0,
+        'activeLoans': lender.active_mortgages_count if lender else 0,
         'revenue': round(revenue, 2)
     })
 
+@lender_bp.route('/aging', methods=['GET'])
+@jwt_required()
+def get_aging_report():
+    """Past-due aging (current / 1-30 / 31-60 / 61-90 / 90+ days) of this lender's book"""
+    from utils.aging import get_aging
+    
+    user_id = get_jwt_identity()
+    lender_id = int(user_id[1:]) if user_id.startswith('L') else int(user_id)
+    
+    try:
+        as_of = datetime.strptime(request.args['as_of'], '%Y-%m-%d').date() if request.args.get('as_of') else None
+    except ValueError:
+        return jsonify({'error': 'as_of must be a YYYY-MM-DD date'}), 400
+    live = request.args.get('live', 'false').lower() == 'true'
+    return jsonify(get_aging(as_of, lender_id=lender_id, live=live))
+
+@lender_bp.route('/cash-flow', methods=['GET'])
+@jwt_required()
+def get_cash_flow_projection():
+    """Expected monthly inflows of this lender's active mortgages (?months=&cpr=&cdr=)"""
+    from utils.cashflow import cash_flow_projection, parse_assumptions
+    
+    user_id = get_jwt_identity()
+    lender_id = int(user_id[1:]) if user_id.startswith('L') else int(user_id)
+    
+    try:
+        months, cpr, cdr = parse_assumptions(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(cash_flow_projection(lender_id, months, cpr, cdr))
+
+@lender_bp.route('/refinancing-offers/batch', methods=['POST'])
+@jwt_required()
+def create_refinancing_offers():
+    """Queue offers of a new rate to every eligible mortgage; poll /api/lender/jobs/<id>"""
+    from utils.jobs import JobQueueFull, job_summary, submit_job
+    from utils.refinancing import parse_offer_params
+    
+    user_id = get_jwt_identity()
+    lender_id = int(user_id[1:]) if user_id.startswith('L') else int(user_id)
+    
+    try:
+        params = parse_offer_params(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    params['lender_id'] = lender_id
+    try:
+        job = submit_job('refinancing_offers', params, created_by=user_id)
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 429
+    return jsonify(job_summary(job)), 202
+
+@lender_bp.route('/refinancing-offers', methods=['GET'])
+@jwt_required()
+def get_refinancing_offers():
+    """This lender's refinancing offers, newest first (?status=&page=&per_page=)"""
+    from models import OfferStatus, RefinancingOffer
+    from utils.refinancing import offer_summary
+    
+    user_id = get_jwt_identity()
+    lender_id = int(user_id[1:]) if user_id.startswith('L') else int(user_id)
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    
+    query = RefinancingOffer.query.filter_by(lender_id=lender_id)
+    if request.args.get('status'):
+        try:
+            query = query.filter_by(status=OfferStatus(request.args['status'].lower()))
+        except ValueError:
+            return jsonify({'error': f"'{request.args['status']}' is not a valid offer status"}), 400
+    offers = query.order_by(RefinancingOffer.created_at.desc(), RefinancingOffer.id.desc()).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+    return jsonify({
+        'offers': [offer_summary(offer) for offer in offers.items],
+        'total': offers.total,
+        'pages': offers.pages,
+        'current_page': page
+    })
+
+@lender_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_lender_job(job_id):
+    """A background job this lender started"""
+    from models import BackgroundJob
+    from utils.jobs import job_summary
+    
+    job = BackgroundJob.query.filter_by(id=job_id, created_by=get_jwt_identity()).first_or_404()
+    return jsonify(job_summary(job))
+
+@lender_bp.route('/pre-approval-criteria', methods=['GET', 'PUT'])
+@jwt_required()
+def handle_pre_approval_criteria():
+    """This lender's pre-approval criteria; PUT a field as null to use the platform default"""
+    from utils.preapproval import CRITERIA_COLUMNS, DEFAULT_CRITERIA, lender_criteria
+    
+    user_id = get_jwt_identity()
+    lender_id = int(user_id[1:]) if user_id.startswith('L') else int(user_id)
+    lender = db.session.get(Lender, lender_id)
+    if not lender:
+        return jsonify({'error': 'Lender not found'}), 404
+    
+    if request.method == 'PUT':
+        data = request.get_json(silent=True) or {}
+        unknown = set(data) - set(CRITERIA_COLUMNS)
+        if unknown:
+            return jsonify({'error': f"Unknown criteria: {', '.join(sorted(unknown))}"}), 400
+        try:
+            values = {
+                name: None if value is None else (int(value) if name.endswith(('_years', '_months')) else float(value))
+                for name, value in data.items()
+            }
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Criteria must be numbers or null'}), 400
+        if any(value is not None and value < 0 for value in values.values()):
+            return jsonify({'error': 'Criteria cannot be negative'}), 400
+        if values.get('max_dti') is not None and not 0 < values['max_dti'] <= 1:
+            return jsonify({'error': 'max_dti must be a ratio between 0 and 1'}), 400
+        if values.get('max_term_years') is not None and not 1 <= values['max_term_years'] <= 30:
+            return jsonify({'error': 'max_term_years must be between 1 and 30'}), 400
+        for name, value in values.items():
+            setattr(lender, CRITERIA_COLUMNS[name], value)
+        db.session.commit()
+    
+    return jsonify({
+        'criteria': lender_criteria(lender),
+        'defaults': DEFAULT_CRITERIA
+    })
+
+@lender_bp.route('/pre-approvals/batch', methods=['POST'])
+@jwt_required()
+def create_pre_approvals():
+    """Queue pre-approval of every completed buyer profile; poll /api/lender/jobs/<id>"""
+    from utils.jobs import JobQueueFull, job_summary, submit_job
+    import utils.preapproval  # noqa: F401 - registers the 'pre_approvals' job
+    
+    user_id = get_jwt_identity()
+    lender_id = int(user_id[1:]) if user_id.startswith('L') else int(user_id)
+    
+    try:
+        job = submit_job('pre_approvals', {'lender_id': lender_id}, created_by=user_id)
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 429
+    return jsonify(job_summary(job)), 202
+
+@lender_bp.route('/pre-approvals', methods=['GET'])
+@jwt_required()
+def get_pre_approvals():
+    """Buyers this lender pre-approved, largest first (?status=&page=&per_page=)"""
+    from models import PreApproval
+    from utils.preapproval import pre_approval_summary
+    
+    user_id = get_jwt_identity()
+    lender_id = int(user_id[1:]) if user_id.startswith('L') else int(user_id)
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    
+    try:
+        status = ApplicationStatus(request.args.get('status', 'approved').lower())
+    except ValueError:
+        return jsonify({'error': f"'{request.args['status']}' is not a valid pre-approval status"}), 400
+    query = db.session.query(PreApproval, Buyer.name).join(Buyer, Buyer.id == PreApproval.buyer_id).filter(
+        PreApproval.lender_id == lender_id, PreApproval.status == status
+    )
+    pre_approvals = query.order_by(PreApproval.approved_amount.desc(), PreApproval.id).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+    return jsonify({
+        'preApprovals': [pre_approval_summary(pre_approval, buyer_name=name) for pre_approval, name in pre_approvals.items],
+        'total': pre_approvals.total,
+        'pages': pre_approvals.pages,
+        'current_page': page
+    })
+
 @lender_bp.route('/applications', methods=['GET'])
 @jwt_required()
 def get_applications():
@@ -95,10 +263,13 @@ def get_applications():
         lender_id = int(user_id[1:])
     else:
         lender_id = int(user_id)
-    print(f"Debug: user_id={user_id}, lender_id={lender_id}")
+    current_app.logger.debug(f"user_id={user_id}, lender_id={lender_id}")
     
     applications = MortgageApplication.query.filter_by(lender_id=lender_id).all()
-    print(f"Debug: Found {len(applications)} applications for lender {lender_id}")
+    if request.args.get('include_archived', 'false').lower() == 'true':
+        from utils.archive import archived_applications
+        applications += archived_applications(lender_id=lender_id)
+    current_app.logger.debug(f"Found {len(applications)} applications for lender {lender_id}")
     
     result = []
     for app in applications:
@@ -135,9 +306,9 @@ def get_applications():
 
 @lender_bp.route('/<int:lender_id>/applications', methods=['GET'])
 def get_lender_applications(lender_id):
-    print(f"Debug: Direct lender_id={lender_id}")
+    current_app.logger.debug(f"Direct lender_id={lender_id}")
     applications = MortgageApplication.query.filter_by(lender_id=lender_id).all()
-    print(f"Debug: Found {len(applications)} applications for lender {lender_id}")
+    current_app.logger.debug(f"Found {len(applications)} applications for lender {lender_id}")
     
     result = []
     for app in applications:
@@ -201,13 +372,13 @@ def update_lender_profile():
     lender = Lender.query.get(lender_id)
     data = request.json
     
-    print(f"Debug: Received data: {data}")  # Debug log
+    current_app.logger.debug(f"Received data: {data}")
     
     if 'company_name' in data:
         lender.institution_name = data['company_name']
     if 'institution_name' in data:
         lender.institution_name = data['institution_name']
-        print(f"Updated institution_name to: {data['institution_name']}")
+        current_app.logger.debug(f"Updated institution_name to: {data['institution_name']}")
     if 'contact_person' in data:
         lender.contact_person = data['contact_person']
     if 'contact_email' in data:
@@ -224,13 +395,13 @@ def update_lender_profile():
         lender.business_registration_number = data['business_registration_number']
     if 'address' in data:
         # Note: address field doesn't exist in Lender model, ignoring for now
-        print(f"Address field received but not saved: {data['address']}")
+        current_app.logger.debug(f"Address field received but not saved: {data['address']}")
     if 'logo_url' in data:
         lender.logo_url = data['logo_url']
     
     try:
         db.session.commit()
-        print("Database commit successful")
+        current_app.logger.debug("Database commit successful")
         return jsonify({
             'success': True,
             'modal': {
@@ -240,7 +411,7 @@ def update_lender_profile():
             }
         })
     except Exception as e:
-        print(f"Database commit failed: {e}")
+        current_app.logger.error(f"Database commit failed: {e}")
         db.session.rollback()
         return jsonify({
             'success': False,
@@ -273,6 +444,15 @@ def approve_application(app_id):
     - Property becomes unavailable for new applications
     - Mortgage tracking begins immediately
     
+    CONCURRENCY:
+    - The listing row is locked (SELECT ... FOR UPDATE) for the transaction,
+      so approvals on one property run one at a time
+    - The listing is claimed with a compare-and-set UPDATE (ACTIVE ->
+      ACQUIRED); on databases without row locks (SQLite) this alone decides
+      the winner, and the loser gets a 409
+    - Competing applications are rejected with one UPDATE and the schedule
+      is written with one multi-row INSERT
+    
     INTEGRATION POINTS:
     - Updates buyer's "My Mortgages" section
     - Updates lender's "Sold Mortgages" section
@@ -281,6 +461,8 @@ def approve_application(app_id):
     
     Returns: Success confirmation with active mortgage details
     """
+    from sqlalchemy import insert, update
+    
     try:
         # Extract and validate lender ID from JWT token
         user_id = get_jwt_identity()
@@ -293,25 +475,31 @@ def approve_application(app_id):
         if application.lender_id != lender_id:
             return jsonify({'error': 'Unauthorized'}), 403
         
-        # STEP 1: Approve the selected application
-        application.status = ApplicationStatus.APPROVED
-        
-        # STEP 2: Automatically reject all other pending applications for the same property
-        # This prevents multiple approvals for the same property and ensures data consistency
-        other_apps = MortgageApplication.query.filter(
-            MortgageApplication.listing_id == application.listing_id,  # Same property
-            MortgageApplication.id != app_id,  # Exclude the approved application
-            MortgageApplication.status == ApplicationStatus.PENDING  # Only pending applications
-        ).all()
+        # STEP 1: Lock the listing and claim it (ACTIVE -> ACQUIRED)
+        # The ORM copy is set too, so flush hooks (match index, search, facets) see the change
+        listing = MortgageListing.query.filter_by(id=application.listing_id).with_for_update().populate_existing().one()
+        claimed = db.session.execute(
+            update(MortgageListing).where(
+                MortgageListing.id == listing.id, MortgageListing.status == ListingStatus.ACTIVE
+            ).values(status=ListingStatus.ACQUIRED).execution_options(synchronize_session=False)
+        ).rowcount
+        if not claimed:
+            db.session.rollback()
+            return jsonify({'error': 'This property has already been acquired'}), 409
+        listing.status = ListingStatus.ACQUIRED
         
-        # Mark all other applications as rejected
-        for other_app in other_apps:
-            other_app.status = ApplicationStatus.REJECTED
+        # STEP 2: Approve the selected application
+        application.status = ApplicationStatus.APPROVED
         
-        # STEP 3: Update property status to ACQUIRED
-        # This removes the property from public browsing and marks it as sold
-        if application.listing:
-            application.listing.status = ListingStatus.ACQUIRED
+        # STEP 3: Reject all other pending applications for the same property in one statement
+        rejected = db.session.execute(
+            update(MortgageApplication).where(
+                MortgageApplication.listing_id == application.listing_id,  # Same property
+                MortgageApplication.id != app_id,  # Exclude the approved application
+                MortgageApplication.status == ApplicationStatus.PENDING  # Only pending applications
+            ).values(status=ApplicationStatus.REJECTED, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
         
         # STEP 4: Create ActiveMortgage record for payment tracking
         # This record will be used to track payments, calculate balances, and manage the mortgage lifecycle
@@ -320,7 +508,7 @@ def approve_application(app_id):
             borrower_id=application.borrower_id,  # Buyer who will make payments
             lender_id=application.lender_id,  # Lender who will receive payments
             principal_amount=application.requested_amount,  # Original loan amount
-            interest_rate=application.listing.interest_rate if application.listing else 12.0,  # Annual rate
+            interest_rate=listing.interest_rate,  # Annual rate
             repayment_term=application.repayment_years * 12,  # Convert years to months
             remaining_balance=application.requested_amount,  # Initially equals principal
             next_payment_due=datetime.now().date() + timedelta(days=7)  # Down payment due in 7 days
@@ -330,17 +518,18 @@ def approve_application(app_id):
         db.session.flush()  # Get the mortgage ID
         
         # STEP 5: Create payment schedule starting with down payment
+        # One multi-row INSERT; it skips mapper events, which is fine because
+        # only PAID rows feed the counter caches (utils/counters.py)
         from models import PaymentSchedule, PaymentStatus
-        from dateutil.relativedelta import relativedelta
         
-        # Create down payment as first payment
-        down_payment = PaymentSchedule(
-            mortgage_id=active_mortgage.id,
-            payment_date=datetime.now().date() + timedelta(days=7),  # Due in 7 days
-            amount_due=application.listing.down_payment if application.listing else application.requested_amount * 0.2,
-            status=PaymentStatus.PENDING
-        )
-        db.session.add(down_payment)
+        # Down payment as first payment, due in 7 days
+        down_payment_date = datetime.now().date() + timedelta(days=7)
+        installments = [{
+            'mortgage_id': active_mortgage.id,
+            'payment_date': down_payment_date,
+            'amount_due': listing.down_payment,
+            'status': PaymentStatus.PENDING
+        }]
         
         # Calculate monthly payment amount
         loan_amount = application.requested_amount
@@ -352,24 +541,21 @@ def approve_application(app_id):
         else:
             monthly_payment = loan_amount * (monthly_rate * (1 + monthly_rate)**num_payments) / ((1 + monthly_rate)**num_payments - 1)
         
-        # Create monthly payment schedule
+        # Monthly installments, each due on the last day of the month
         base_date = datetime.now().date()
         for month in range(1, active_mortgage.repayment_term + 1):
-            # Calculate the last day of each month
             next_month = base_date + relativedelta(months=month)
-            # Get last day of the month
             last_day_of_month = (next_month.replace(day=1) + relativedelta(months=1) - timedelta(days=1))
-            
-            monthly_payment_schedule = PaymentSchedule(
-                mortgage_id=active_mortgage.id,
-                payment_date=last_day_of_month,
-                amount_due=round(monthly_payment, 2),
-                status=PaymentStatus.PENDING
-            )
-            db.session.add(monthly_payment_schedule)
+            installments.append({
+                'mortgage_id': active_mortgage.id,
+                'payment_date': last_day_of_month,
+                'amount_due': round(monthly_payment, 2),
+                'status': PaymentStatus.PENDING
+            })
+        db.session.execute(insert(PaymentSchedule.__table__), installments)
         
         # Update next payment due to down payment date
-        active_mortgage.next_payment_due = down_payment.payment_date
+        active_mortgage.next_payment_due = down_payment_date
         
         db.session.commit()
         
@@ -378,7 +564,7 @@ def approve_application(app_id):
             'modal': {
                 'type': 'success',
                 'title': 'Application Approved',
-                'message': f'Application has been approved successfully. {len(other_apps)} other applications were automatically rejected.',
+                'message': f'Application has been approved successfully. {rejected} other applications were automatically rejected.',
                 'details': {
                     'mortgage_id': active_mortgage.id,
                     'principal_amount': active_mortgage.principal_amount,
@@ -402,9 +588,6 @@ def get_my_listings():
         
         result = []
         for listing in listings:
-            # Count applications for this listing
-            applications_count = MortgageApplication.query.filter_by(listing_id=listing.id).count()
-            
             result.append({
                 'id': listing.id,
                 'title': listing.property_title,
@@ -417,7 +600,8 @@ def get_my_listings():
                 'downPayment': listing.down_payment,
                 'monthlyPayment': listing.monthly_payment,
                 'status': listing.status.value,
-                'applicationsCount': applications_count,
+                'applicationsCount': listing.applications_count,
+                'savedCount': listing.saved_count,
                 'images': listing.images or [],
                 'createdAt': listing.created_at.strftime('%Y-%m-%d'),
                 'eligibilityCriteria': listing.eligibility_criteria
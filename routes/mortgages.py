@@ -69,6 +69,107 @@ def get_mortgages():
         'current_page': page
     }), 200
 
+@mortgages_bp.route('/search', methods=['GET'])
+def search_mortgages():
+    """PUBLIC ENDPOINT: Full-text search over listings, ranked by relevance
+    
+    Matches every word of q as a prefix against the title (strongest), address
+    and county, and eligibility criteria (weakest). See utils/search.py.
+    
+    Query Parameters:
+    - q: Search text (required)
+    - county, property_type: Exact filters (e.g. "Nairobi", "apartment")
+    - min_price, max_price, max_monthly_payment, min_bedrooms: Range filters
+    - status: Listing status (default: active)
+    - page, per_page: Pagination (default 1 / 10, max 100 per page)
+    
+    Returns: Paginated listings, best match first, each with its rank
+    """
+    from sqlalchemy.orm import joinedload
+    from models import KenyanCounty, PropertyType
+    from utils.search import search_listings, search_terms
+    
+    terms = search_terms(request.args.get('q'))
+    if not terms:
+        return jsonify({'error': 'q is required'}), 400
+    
+    query, rank = search_listings(terms)
+    try:
+        status = request.args.get('status', 'active')
+        query = query.filter(MortgageListing.status == ListingStatus(status.lower()))
+        if request.args.get('county'):
+            query = query.filter(MortgageListing.county == KenyanCounty(request.args['county']))
+        if request.args.get('property_type'):
+            query = query.filter(MortgageListing.property_type == PropertyType(request.args['property_type'].lower()))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    min_price = request.args.get('min_price', type=float)
+    max_price = request.args.get('max_price', type=float)
+    max_payment = request.args.get('max_monthly_payment', type=float)
+    min_bedrooms = request.args.get('min_bedrooms', type=int)
+    if min_price is not None:
+        query = query.filter(MortgageListing.price_range >= min_price)
+    if max_price is not None:
+        query = query.filter(MortgageListing.price_range <= max_price)
+    if max_payment is not None:
+        query = query.filter(MortgageListing.monthly_payment <= max_payment)
+    if min_bedrooms is not None:
+        query = query.filter(MortgageListing.bedrooms >= min_bedrooms)
+    
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('per_page', 10, type=int), 100)
+    results = query.options(joinedload(MortgageListing.lender)).order_by(
+        rank.desc(), MortgageListing.id
+    ).paginate(page=page, per_page=per_page, error_out=False)
+    
+    return jsonify({
+        'mortgages': [{
+            'id': m.id,
+            'property_title': m.property_title,
+            'property_type': m.property_type.value,
+            'bedrooms': m.bedrooms,
+            'address': m.address,
+            'county': m.county.value,
+            'price_range': f"KSH {float(m.price_range):,.2f}",
+            'interest_rate': m.interest_rate,
+            'repayment_period': m.repayment_period,
+            'down_payment': f"KSH {m.down_payment:,.2f}",
+            'monthly_payment': m.monthly_payment,
+            'eligibility_criteria': m.eligibility_criteria,
+            'images': m.images,
+            'lender_name': m.lender.institution_name,
+            'rank': round(float(score or 0), 4)
+        } for m, score in results.items],
+        'total': results.total,
+        'pages': results.pages,
+        'current_page': page
+    }), 200
+
+@mortgages_bp.route('/facets', methods=['GET'])
+def get_mortgage_facets():
+    """PUBLIC ENDPOINT: Listing counts per county, property type, bedrooms and price band
+    
+    Powers the browse filter sidebar without transferring the listings. Each
+    facet's counts apply all current filters except its own. Results are
+    cached until a listing changes (see utils/facets.py).
+    
+    Query Parameters (facet filters may repeat, e.g. county=Nairobi&county=Kiambu):
+    - county, property_type, bedrooms, price_band: Facet filters
+    - q: Restrict to full-text search matches
+    - max_monthly_payment: Affordability cap
+    - status: Listing status (default: active)
+    
+    Returns: total matching listings and per-facet value counts
+    """
+    from utils.facets import get_facets, parse_filters
+    
+    try:
+        filters = parse_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(get_facets(filters)), 200
+
 @mortgages_bp.route('/', methods=['POST'])
 @jwt_required()  # Requires valid JWT token
 def create_mortgage():
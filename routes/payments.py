@@ -1,7 +1,7 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
-from models import PaymentSchedule, ActiveMortgage, MortgageApplication, MortgageListing, PaymentStatus
+from models import ActiveMortgage, MortgageApplication, MortgageListing, PaymentStatus
 from datetime import datetime, timedelta
 import uuid
 
@@ -27,26 +27,14 @@ def simulate_payment():
         if mortgage.borrower_id != buyer_id:
             return jsonify({'error': 'Unauthorized'}), 403
         
-        # Create payment record
-        payment = PaymentSchedule(
-            mortgage_id=mortgage_id,
-            payment_date=datetime.now().date(),
-            amount_due=amount,
-            amount_paid=amount,
-            status=PaymentStatus.PAID,
-            receipt_url=f"receipt_{uuid.uuid4().hex[:8]}.pdf"
-        )
-        
-        # Update mortgage balance
-        mortgage.remaining_balance = max(0, mortgage.remaining_balance - amount)
-        mortgage.next_payment_due = datetime.now().date() + timedelta(days=30)
+        # Settle the oldest open installments, update balance and next due date
+        payment = mortgage.apply_payment(amount, receipt_url=f"receipt_{uuid.uuid4().hex[:8]}.pdf")[-1]
         
         # Payment processed successfully - status updates disabled to avoid enum issues
-        print(f'Payment processed successfully. New balance: {mortgage.remaining_balance}')
+        current_app.logger.debug(f'Payment processed successfully. New balance: {mortgage.remaining_balance}')
         
-        db.session.add(payment)
         db.session.commit()
-        print(f'Payment record created with ID: {payment.id}')
+        current_app.logger.debug(f'Payment record created with ID: {payment.id}')
         
         return jsonify({
             'success': True,
@@ -69,8 +57,9 @@ def simulate_payment():
 @payments_bp.route('/mortgage/<int:mortgage_id>/payments', methods=['GET'])
 @jwt_required()
 def get_mortgage_payments(mortgage_id):
-    """Get payment history for a mortgage"""
-    payments = PaymentSchedule.query.filter_by(mortgage_id=mortgage_id).order_by(PaymentSchedule.payment_date.desc()).all()
+    """Get payment history for a mortgage (archived installments included)"""
+    from utils.archive import schedule_history
+    payments = schedule_history([mortgage_id])
     
     return jsonify([{
         'id': p.id,
@@ -93,12 +82,14 @@ def get_buyer_payments():
         mortgages = ActiveMortgage.query.filter_by(borrower_id=buyer_id).all()
         mortgage_ids = [m.id for m in mortgages]
         
-        # Get all payments for these mortgages
-        payments = PaymentSchedule.query.filter(PaymentSchedule.mortgage_id.in_(mortgage_ids)).order_by(PaymentSchedule.payment_date.desc()).all()
+        # Get all payments for these mortgages, archived installments included
+        from utils.archive import schedule_history
+        mortgages_by_id = {m.id: m for m in mortgages}
+        payments = schedule_history(mortgage_ids)
         
         result = []
         for payment in payments:
-            mortgage = payment.mortgage
+            mortgage = mortgages_by_id[payment.mortgage_id]
             property_title = mortgage.application.listing.property_title if mortgage.application and mortgage.application.listing else 'Unknown Property'
             
             result.append({
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Nightly delinquency job: flag overdue installments LATE / MISSED, move
+mortgages to DEFAULTED or COMPLETED and advance next_payment_due.
+
+Schedule it once a day (e.g. cron: 30 1 * * * python run_delinquency.py).
+Each run's stats are stored in delinquency_runs. --dry-run only reports what
+would change.
+"""
+
+import argparse
+from datetime import date
+
+from app import create_app
+from utils.delinquency import preview_delinquency, run_delinquency, run_summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the payment delinquency job')
+    parser.add_argument('--as-of', type=date.fromisoformat, help='Evaluate as of this date (YYYY-MM-DD, default today)')
+    parser.add_argument('--batch-size', type=int, help='Rows per UPDATE batch (default DELINQUENCY_BATCH_SIZE)')
+    parser.add_argument('--dry-run', action='store_true', help='Report counts without writing')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.dry_run:
+            for step, rows in preview_delinquency(args.as_of).items():
+                print(f"{step:<22} {rows}")
+            return
+
+        try:
+            run = run_delinquency(args.as_of, args.batch_size)
+        except Exception as e:
+            print(f"❌ Delinquency run failed: {e}")
+            raise SystemExit(1)
+        summary = run_summary(run)
+        print(f"✅ Delinquency run {summary['id']} as of {summary['asOf']} "
+              f"({summary['durationSeconds']}s, {summary['batches']} batches)")
+        for key in ('paymentsLate', 'paymentsMissed', 'mortgagesDefaulted', 'mortgagesCompleted', 'nextDueUpdated'):
+            print(f"   {key:<20} {summary[key]}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Nightly expiry sweep: mark refinancing offers past offer_expiry and
+pre-approvals past valid_until as EXPIRED.
+
+Schedule it once a day (e.g. cron: 15 0 * * * python run_expiry_sweep.py).
+"""
+
+import argparse
+from datetime import date
+
+from app import create_app
+from utils.expiry import sweep_expired
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Expire lapsed refinancing offers and pre-approvals')
+    parser.add_argument('--as-of', type=date.fromisoformat, help='Expire rows whose last valid day is before this date (default today)')
+    parser.add_argument('--batch-size', type=int, help='Rows per UPDATE batch (default EXPIRY_BATCH_SIZE)')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        try:
+            stats = sweep_expired(args.as_of, args.batch_size)
+        except Exception as e:
+            print(f"❌ Expiry sweep failed: {e}")
+            raise SystemExit(1)
+        print(f"✅ Expired {stats['offers_expired']} refinancing offers and "
+              f"{stats['pre_approvals_expired']} pre-approvals ({stats['batches']} batches)")
+
+if __name__ == '__main__':
+    main()
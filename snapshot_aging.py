@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Daily portfolio aging snapshot: store past-due aging buckets per lender and
+platform-wide in aging_snapshots, so the aging endpoints answer from a few
+stored rows instead of the payment schedule.
+
+Schedule it after the delinquency job (e.g. cron: 0 2 * * * python snapshot_aging.py).
+Re-running for the same date replaces that date's snapshot.
+"""
+
+import argparse
+from datetime import date
+
+from app import create_app
+from utils.aging import get_aging, snapshot_aging
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Snapshot portfolio aging buckets')
+    parser.add_argument('--as-of', type=date.fromisoformat, help='Age the book as of this date (YYYY-MM-DD, default today)')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        try:
+            rows = snapshot_aging(args.as_of)
+        except Exception as e:
+            print(f"❌ Aging snapshot failed: {e}")
+            raise SystemExit(1)
+        report = get_aging(args.as_of)
+        print(f"✅ Stored {rows} aging rows as of {report['asOf']}")
+        for bucket in report['buckets']:
+            print(f"   {bucket['label']:<14} {bucket['mortgages']:>8} mortgages  arrears {bucket['arrears']:>16,.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Parity check: the batch scorer (utils/credit_scoring.py) against
+Buyer.calculate_creditworthiness_score on edge cases and random profiles
+"""
+
+import random
+
+from models import (
+    Buyer, CREDIT_DOCUMENT_FIELDS, CREDIT_DOWN_PAYMENT_BANDS, CREDIT_EMPLOYMENT_BANDS,
+    CREDIT_INCOME_RATIO_BANDS, CREDIT_LOAN_BURDEN_BANDS, CREDIT_SCORE_INPUTS
+)
+from utils.credit_scoring import factor_columns, score_columns, snapshot
+
+BASE_PROFILE = {
+    'monthly_net_income': 200000,
+    'desired_loan_amount': 4000000,
+    'employment_duration': 30,
+    'down_payment_amount': 1000000,
+    'estimated_property_value': 5000000,
+    'monthly_loan_repayments': 20000,
+    'national_id_uploaded': True,
+    'kra_pin_uploaded': True,
+    'bank_statement_uploaded': False,
+    'proof_of_residence_uploaded': None
+}
+
+
+def edge_case_profiles():
+    """Base profile with one input at a time set to None, 0, negative or a band boundary"""
+    profiles = [dict(BASE_PROFILE)]
+    for field in CREDIT_SCORE_INPUTS:
+        for value in (None, 0, -1, -BASE_PROFILE['monthly_net_income']):
+            profiles.append(dict(BASE_PROFILE, **{field: value}))
+
+    # Each threshold exactly, and just either side of it
+    income = 100000
+    for threshold, _ in CREDIT_INCOME_RATIO_BANDS:
+        # monthly payment = loan * 12% / 12, so the ratio is loan / 100 / income
+        for loan in (threshold * income * 100 - 1, threshold * income * 100, threshold * income * 100 + 1):
+            profiles.append(dict(BASE_PROFILE, monthly_net_income=income, desired_loan_amount=loan))
+    for threshold, _ in CREDIT_EMPLOYMENT_BANDS:
+        for months in (threshold - 1, threshold, threshold + 1):
+            profiles.append(dict(BASE_PROFILE, employment_duration=months))
+    for threshold, _ in CREDIT_DOWN_PAYMENT_BANDS:
+        for down_payment in (threshold * 1000000 - 1, threshold * 1000000, threshold * 1000000 + 1):
+            profiles.append(dict(BASE_PROFILE, down_payment_amount=down_payment, estimated_property_value=1000000))
+    for threshold, _ in CREDIT_LOAN_BURDEN_BANDS:
+        for repayments in (threshold * income - 1, threshold * income, threshold * income + 1):
+            profiles.append(dict(BASE_PROFILE, monthly_net_income=income, monthly_loan_repayments=repayments))
+
+    # Document flags: all NULL, all unset, all uploaded
+    for flag in (None, False, True):
+        profiles.append(dict(BASE_PROFILE, **{field: flag for field in CREDIT_DOCUMENT_FIELDS}))
+
+    # Empty profile (a buyer who only registered)
+    profiles.append({field: None for field in CREDIT_SCORE_INPUTS})
+    return profiles
+
+
+def random_profiles(count=3000, seed=33):
+    rng = random.Random(seed)
+    amounts = lambda high: rng.choice([None, 0, -rng.uniform(1, high), rng.uniform(1, high), float(rng.randint(1, int(high)))])
+    profiles = []
+    for _ in range(count):
+        profile = {
+            'monthly_net_income': amounts(500000),
+            'desired_loan_amount': amounts(20000000),
+            'employment_duration': rng.choice([None, 0, -3, rng.randint(1, 120)]),
+            'down_payment_amount': amounts(5000000),
+            'estimated_property_value': amounts(25000000),
+            'monthly_loan_repayments': amounts(200000)
+        }
+        for field in CREDIT_DOCUMENT_FIELDS:
+            profile[field] = rng.choice([None, False, True])
+        profiles.append(profile)
+    return profiles
+
+
+def mismatches(profiles):
+    """(profile, scalar score, batch score) for every profile the two scorers disagree on"""
+    factors = factor_columns(snapshot(profiles))
+    batch_scores = score_columns(None, factors)
+    found = []
+    for i, profile in enumerate(profiles):
+        buyer = Buyer(**profile)
+        scalar_score = buyer.calculate_creditworthiness_score()
+        batch_factors = {name: points[i] for name, points in factors.items()}
+        if scalar_score != float(batch_scores[i]) or buyer.creditworthiness_factors() != batch_factors:
+            found.append((profile, scalar_score, float(batch_scores[i])))
+    return found
+
+
+def test_edge_cases():
+    found = mismatches(edge_case_profiles())
+    assert not found, f"Batch scorer differs from the scalar method: {found[:5]}"
+
+
+def test_random_profiles():
+    found = mismatches(random_profiles())
+    assert not found, f"Batch scorer differs from the scalar method: {found[:5]}"
+
+
+if __name__ == '__main__':
+    for name, profiles in (('edge cases', edge_case_profiles()), ('random profiles', random_profiles())):
+        found = mismatches(profiles)
+        if found:
+            print(f"❌ {name}: {len(found)} of {len(profiles)} differ, e.g. {found[0]}")
+        else:
+            print(f"✅ {name}: {len(profiles)} profiles match")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Bring an existing database up to the current models.
+
+Creates missing tables, adds missing columns (with their server defaults),
+creates missing indexes, adds new enum members to PostgreSQL enum types and
+indexes listings missing from full-text search. Existing columns are never altered or dropped. Safe
+to run repeatedly, on SQLite and PostgreSQL alike.
+"""
+
+from sqlalchemy import Enum, func, inspect, select, text, update
+from sqlalchemy.schema import CreateColumn
+
+from app import create_app, db
+import models  # noqa: F401 - registers every table on db.metadata
+from models import OfferStatus, RefinancingOffer
+from utils.search import rebuild_search_index
+
+
+def sync_enum_labels(engine):
+    """Add enum members missing from existing PostgreSQL enum types (stored by name)"""
+    if engine.dialect.name != 'postgresql':
+        return
+    enum_types = {}
+    for table in db.metadata.sorted_tables:
+        for column in table.columns:
+            if isinstance(column.type, Enum) and column.type.native_enum and column.type.name:
+                enum_types[column.type.name] = column.type.enums
+    # ALTER TYPE ... ADD VALUE cannot run inside a transaction block on older servers
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        for name, labels in enum_types.items():
+            existing = set(connection.execute(text(
+                'SELECT e.enumlabel FROM pg_enum e JOIN pg_type t ON t.oid = e.enumtypid WHERE t.typname = :name'
+            ), {'name': name}).scalars())
+            if not existing:
+                continue  # created by create_all() with every label
+            for label in labels:
+                if label not in existing:
+                    connection.execute(text(f"ALTER TYPE {name} ADD VALUE IF NOT EXISTS '{label}'"))
+                    print(f"✅ Added {label} to enum {name}")
+
+
+def expire_duplicate_offers(connection):
+    """Keep only the newest OFFERED refinancing offer per mortgage
+
+    Needed once before uq_refinancing_offers_open_mortgage can be created on
+    a database where overlapping batch runs offered a mortgage twice.
+    """
+    offers = RefinancingOffer.__table__
+    newest = select(func.max(offers.c.id)).where(
+        offers.c.status == OfferStatus.OFFERED
+    ).group_by(offers.c.mortgage_id)
+    result = connection.execute(update(offers).where(
+        offers.c.status == OfferStatus.OFFERED, offers.c.id.not_in(newest)
+    ).values(status=OfferStatus.EXPIRED))
+    if result.rowcount:
+        print(f"✅ Expired {result.rowcount} duplicate open refinancing offers")
+
+
+def upgrade_schema():
+    db.create_all()
+    engine = db.engine
+    sync_enum_labels(engine)
+    inspector = inspect(engine)
+
+    with engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {ddl}'))
+                print(f"✅ Added column {table.name}.{column.name}")
+
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    if index.name == 'uq_refinancing_offers_open_mortgage':
+                        expire_duplicate_offers(connection)
+                    index.create(bind=connection)
+                    print(f"✅ Created index {index.name}")
+
+        # Full-text structures live outside the models (GIN index / FTS5 table)
+        indexed = rebuild_search_index(connection)
+        if indexed:
+            print(f"✅ Indexed {indexed} listings for search")
+
+    print("✅ Schema is up to date")
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        upgrade_schema()
@@ -0,0 +1,73 @@
+# NetLend Backend - Affordability Search
+# "Listings I can afford": the buyer's profile is turned into two limits and
+# the catalogue is filtered on them server-side:
+# - max payment = AFFORDABILITY_MAX_DTI * monthly net income - existing loan
+#   repayments (the same debt-to-income rule as the pre-approval default)
+# - down payment = the buyer's down_payment_amount (no limit when unset)
+# Listings already carry their monthly_payment, so the search is ONE query over
+# the (status, monthly_payment, id) index: ACTIVE listings at or under the
+# payment limit whose down payment the buyer can cover, most expensive first.
+# Pages are keyset cursors on (monthly_payment, id) rather than offsets, so
+# page N costs the same as page 1.
+#
+# The loan the payment limit supports is reported alongside, amortized at the
+# pre-approval default rate over the buyer's desired (or the default) term.
+
+from flask import current_app
+from sqlalchemy import tuple_
+
+from app import db
+from models import Lender, ListingStatus, MortgageListing
+from utils.cashflow import annuity_payment
+from utils.preapproval import DEFAULT_CRITERIA
+
+
+def affordability_limits(buyer):
+    """Payment, down payment and loan limits derived from a Buyer's profile"""
+    income = buyer.monthly_net_income or 0
+    max_payment = max(current_app.config['AFFORDABILITY_MAX_DTI'] * income - (buyer.monthly_loan_repayments or 0), 0)
+    term_years = min(buyer.desired_repayment_period or DEFAULT_CRITERIA['max_term_years'], DEFAULT_CRITERIA['max_term_years'])
+    per_unit = float(annuity_payment(1.0, DEFAULT_CRITERIA['rate'] / 100 / 12, term_years * 12))
+    return {
+        'monthlyNetIncome': income,
+        'existingRepayments': buyer.monthly_loan_repayments or 0,
+        'maxMonthlyPayment': round(max_payment, 2),
+        'downPayment': buyer.down_payment_amount,
+        'maxLoan': round(max_payment / per_unit, -3) if max_payment else 0.0,
+        'loanAssumptions': {'rate': DEFAULT_CRITERIA['rate'], 'termYears': term_years}
+    }
+
+
+def encode_cursor(listing):
+    return f'{listing.monthly_payment!r}:{listing.id}'
+
+
+def decode_cursor(cursor):
+    """(monthly_payment, id) from a cursor string; raises ValueError on a malformed one"""
+    try:
+        payment, listing_id = cursor.split(':')
+        return float(payment), int(listing_id)
+    except (AttributeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+
+def affordable_listings(limits, limit, cursor=None, county=None, property_type=None):
+    """One page of (listing, lender name) rows within ``limits``; returns (rows, next_cursor)"""
+    query = db.session.query(MortgageListing, Lender.institution_name).join(
+        Lender, MortgageListing.lender_id == Lender.id
+    ).filter(
+        MortgageListing.status == ListingStatus.ACTIVE,
+        MortgageListing.monthly_payment <= limits['maxMonthlyPayment']
+    )
+    if limits['downPayment'] is not None:
+        query = query.filter(MortgageListing.down_payment <= limits['downPayment'])
+    if county is not None:
+        query = query.filter(MortgageListing.county == county)
+    if property_type is not None:
+        query = query.filter(MortgageListing.property_type == property_type)
+    if cursor:
+        query = query.filter(tuple_(MortgageListing.monthly_payment, MortgageListing.id) < decode_cursor(cursor))
+
+    rows = query.order_by(MortgageListing.monthly_payment.desc(), MortgageListing.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(rows[limit - 1][0]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
@@ -0,0 +1,178 @@
+# NetLend Backend - Portfolio Aging Report
+# Past-due aging of the mortgage book, per lender or platform-wide. A mortgage
+# is aged by its OLDEST open installment (pending, late or missed) that fell
+# due before the report date:
+#   current  - nothing overdue
+#   1-30     - oldest overdue installment 1-30 days past due
+#   31-60, 61-90, 90+
+# Each bucket reports the number of mortgages, overdue installments, arrears
+# (open amount of those installments) and the outstanding balance behind them.
+#
+# The report is ONE grouped query: overdue installments are rolled up per
+# mortgage over the (status, payment_date) index, and the result is left-joined
+# to active_mortgages and grouped by bucket. snapshot_aging.py stores the
+# result per lender and platform-wide in aging_snapshots once a day, so reads
+# for a snapshotted date are a single indexed lookup of a few rows whatever
+# the portfolio size. Other dates are computed live and cached per worker for
+# AGING_CACHE_TTL seconds.
+
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import case, delete, func, insert, literal, or_, select
+
+from app import db
+from models import ActiveMortgage, AgingSnapshot, MortgageStatus, OPEN_PAYMENT_STATUSES, PaymentSchedule
+from utils.cache import TTLCache
+
+# (key, label, maximum days past due inclusive)
+AGING_BUCKETS = (
+    ('current', 'Current', 0),
+    ('1-30', '1-30 days', 30),
+    ('31-60', '31-60 days', 60),
+    ('61-90', '61-90 days', 90),
+    ('90+', 'Over 90 days', None)
+)
+_METRICS = ('mortgages', 'installments', 'arrears', 'outstanding_balance')
+
+_schedules = PaymentSchedule.__table__
+_mortgages = ActiveMortgage.__table__
+
+_live_cache = TTLCache('aging_report', maxsize=256)
+
+
+def _bucket_expression(oldest_due, as_of):
+    whens = [(oldest_due.is_(None), AGING_BUCKETS[0][0])]
+    for key, _, max_days in AGING_BUCKETS[1:]:
+        if max_days is not None:
+            whens.append((oldest_due >= as_of - timedelta(days=max_days), key))
+    return case(*whens, else_=AGING_BUCKETS[-1][0])
+
+
+def aging_query(as_of, lender_id=None, by_lender=False):
+    """Grouped aging statement yielding (lender_id, bucket, mortgages, installments, arrears, balance)"""
+    overdue = select(
+        _schedules.c.mortgage_id,
+        func.min(_schedules.c.payment_date).label('oldest_due'),
+        func.count().label('installments'),
+        func.sum(_schedules.c.amount_due - func.coalesce(_schedules.c.amount_paid, 0)).label('arrears')
+    ).where(
+        _schedules.c.status.in_(OPEN_PAYMENT_STATUSES), _schedules.c.payment_date < as_of
+    ).group_by(_schedules.c.mortgage_id).subquery()
+
+    bucket = _bucket_expression(overdue.c.oldest_due, as_of).label('bucket')
+    lender = _mortgages.c.lender_id if by_lender else literal(lender_id).label('lender_id')
+    query = select(
+        lender,
+        bucket,
+        func.count(),
+        func.coalesce(func.sum(overdue.c.installments), 0),
+        func.coalesce(func.sum(overdue.c.arrears), 0),
+        func.coalesce(func.sum(_mortgages.c.remaining_balance), 0)
+    ).select_from(
+        _mortgages.outerjoin(overdue, overdue.c.mortgage_id == _mortgages.c.id)
+    ).where(
+        # The live book, plus closed-out mortgages that still owe installments
+        or_(_mortgages.c.status == MortgageStatus.ACTIVE, overdue.c.mortgage_id.is_not(None))
+    )
+    if lender_id is not None:
+        query = query.where(_mortgages.c.lender_id == lender_id)
+    group = [bucket] if not by_lender else [_mortgages.c.lender_id, bucket]
+    return query.group_by(*group)
+
+
+def _report(as_of, lender_id, rows, source, generated_at):
+    """Response body from {bucket key: (mortgages, installments, arrears, balance)}"""
+    buckets = []
+    for key, label, _ in AGING_BUCKETS:
+        mortgages, installments, arrears, balance = rows.get(key, (0, 0, 0, 0))
+        buckets.append({
+            'bucket': key,
+            'label': label,
+            'mortgages': int(mortgages),
+            'installments': int(installments),
+            'arrears': round(float(arrears), 2),
+            'outstandingBalance': round(float(balance), 2)
+        })
+    past_due = buckets[1:]
+    return {
+        'asOf': as_of.isoformat(),
+        'lenderId': lender_id,
+        'source': source,
+        'generatedAt': generated_at.isoformat(),
+        'buckets': buckets,
+        'totals': {
+            'mortgages': sum(b['mortgages'] for b in buckets),
+            'mortgagesPastDue': sum(b['mortgages'] for b in past_due),
+            'arrears': round(sum(b['arrears'] for b in past_due), 2),
+            'outstandingBalance': round(sum(b['outstandingBalance'] for b in buckets), 2),
+            'pastDueBalance': round(sum(b['outstandingBalance'] for b in past_due), 2)
+        }
+    }
+
+
+def compute_aging(as_of=None, lender_id=None):
+    """Aging report computed from the live tables"""
+    as_of = as_of or date.today()
+    rows = {
+        bucket: values
+        for _, bucket, *values in db.session.execute(aging_query(as_of, lender_id))
+    }
+    return _report(as_of, lender_id, rows, 'live', datetime.utcnow())
+
+
+def _snapshot_report(as_of, lender_id):
+    """Report from aging_snapshots, or None when no snapshot was taken for as_of"""
+    snapshot = AgingSnapshot.query.filter(AgingSnapshot.as_of == as_of)
+    rows = snapshot.filter(
+        AgingSnapshot.lender_id.is_(None) if lender_id is None else AgingSnapshot.lender_id == lender_id
+    ).all()
+    if not rows:
+        # Lenders with an empty book get no rows - tell them apart from a missing snapshot
+        taken = snapshot.filter(AgingSnapshot.lender_id.is_(None)).with_entities(AgingSnapshot.created_at).first()
+        if taken is None:
+            return None
+        return _report(as_of, lender_id, {}, 'snapshot', taken.created_at)
+    return _report(as_of, lender_id, {
+        row.bucket: tuple(getattr(row, metric) for metric in _METRICS) for row in rows
+    }, 'snapshot', rows[0].created_at)
+
+
+def get_aging(as_of=None, lender_id=None, live=False):
+    """Aging report from the daily snapshot when there is one, else computed live"""
+    as_of = as_of or date.today()
+    if not live:
+        report = _snapshot_report(as_of, lender_id)
+        if report is not None:
+            return report
+    key = (as_of, lender_id)
+    report = _live_cache.get(key)
+    if report is None:
+        report = compute_aging(as_of, lender_id)
+        _live_cache.set(key, report, ttl=current_app.config['AGING_CACHE_TTL'])
+    return report
+
+
+def snapshot_aging(as_of=None):
+    """Store the aging of every lender and the platform for as_of, replacing
+    any earlier snapshot of that date; returns the number of rows written"""
+    as_of = as_of or date.today()
+    created_at = datetime.utcnow()
+    records = []
+    platform = {}
+    for lender_id, bucket, *values in db.session.execute(aging_query(as_of, by_lender=True)):
+        records.append(dict(zip(_METRICS, values), lender_id=lender_id, bucket=bucket))
+        totals = platform.setdefault(bucket, [0] * len(_METRICS))
+        for i, value in enumerate(values):
+            totals[i] += value
+    # Platform rows are written even for an empty book; they mark the snapshot as taken
+    for key, _, _ in AGING_BUCKETS:
+        records.append(dict(zip(_METRICS, platform.get(key, [0] * len(_METRICS))), lender_id=None, bucket=key))
+
+    db.session.execute(delete(AgingSnapshot).where(AgingSnapshot.as_of == as_of))
+    db.session.execute(insert(AgingSnapshot), [
+        dict(record, as_of=as_of, created_at=created_at) for record in records
+    ])
+    db.session.commit()
+    _live_cache.clear()
+    return len(records)
@@ -0,0 +1,221 @@
+# NetLend Backend - Archive Tier
+# Cold tables for rows that can no longer change, so hot-table size tracks
+# live work. Both movers are nightly scripts and Core statements: they bypass
+# mapper events, and the counter caches keep counting archived rows (repair
+# reads both tables, see utils/counters.py).
+#
+# Payment schedules - payment_schedules gains up to 361 rows per approval and
+# nothing ever leaves, so every per-mortgage lookup and table-wide scan pays
+# for closed loans. archive_payment_schedules.py moves the installments of
+# closed mortgages into payment_schedules_archive:
+# - a mortgage qualifies once it is COMPLETED or REFINANCED, has no open
+#   installment left and its last installment fell due before as_of minus
+#   PAYMENT_ARCHIVE_AFTER_DAYS
+# - qualifying mortgages are taken PAYMENT_ARCHIVE_BATCH_SIZE at a time; each
+#   batch is one INSERT ... SELECT into the archive plus one DELETE from the
+#   hot table, committed together, so a row is always in exactly one table
+#
+# Everything that works on open installments (payments, delinquency, aging,
+# refinancing) keeps reading the hot table alone. History reads, exports and
+# counter repair read both through schedule_history() / schedule_union().
+#
+# Applications - approving one application rejects every competitor, and the
+# rejected rows used to stay in mortgage_applications forever, weighing on the
+# lender inbox and the duplicate check. archive_applications.py moves REJECTED
+# and EXPIRED applications not touched for APPLICATION_ARCHIVE_AFTER_DAYS into
+# mortgage_applications_archive, APPLICATION_ARCHIVE_BATCH_SIZE at a time with
+# the same INSERT ... SELECT + DELETE per batch. Application lists add archived
+# rows on request (include_archived); the duplicate check and totals always
+# look at both tables, through indexed lookups.
+
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, exists, func, insert, literal, select, union_all
+
+from app import db
+from models import (
+    ActiveMortgage, ApplicationStatus, MortgageApplication, MortgageApplicationArchive, MortgageStatus,
+    OPEN_PAYMENT_STATUSES, PaymentSchedule, PaymentScheduleArchive
+)
+
+_schedules = PaymentSchedule.__table__
+_archive = PaymentScheduleArchive.__table__
+_mortgages = ActiveMortgage.__table__
+_applications = MortgageApplication.__table__
+_applications_archive = MortgageApplicationArchive.__table__
+
+SCHEDULE_COLUMNS = (
+    'id', 'mortgage_id', 'payment_date', 'amount_due', 'amount_paid', 'status', 'receipt_url', 'created_at'
+)
+CLOSED_MORTGAGE_STATUSES = (MortgageStatus.COMPLETED, MortgageStatus.REFINANCED)
+
+
+def _columns(table):
+    return [table.c[name] for name in SCHEDULE_COLUMNS]
+
+
+def schedule_union(*conditions):
+    """Hot and archived schedule rows as one subquery named 'schedules'
+
+    ``conditions`` are callables taking a table and returning a WHERE clause;
+    they are applied to each side so both use their own indexes.
+    """
+    def side(table, archived):
+        query = select(*_columns(table), literal(archived).label('archived'))
+        for condition in conditions:
+            query = query.where(condition(table))
+        return query
+    return union_all(side(_schedules, False), side(_archive, True)).subquery('schedules')
+
+
+def schedule_history(mortgage_ids):
+    """Every installment of the given mortgages from both tables, newest first"""
+    if not mortgage_ids:
+        return []
+    schedules = schedule_union(lambda table: table.c.mortgage_id.in_(mortgage_ids))
+    return db.session.execute(
+        select(schedules).order_by(schedules.c.payment_date.desc(), schedules.c.id.desc())
+    ).all()
+
+
+def _archivable(cutoff):
+    last_due = select(func.max(_schedules.c.payment_date)).where(
+        _schedules.c.mortgage_id == _mortgages.c.id
+    ).scalar_subquery()
+    open_installment = exists().where(
+        _schedules.c.mortgage_id == _mortgages.c.id, _schedules.c.status.in_(OPEN_PAYMENT_STATUSES)
+    )
+    return select(_mortgages.c.id).where(
+        _mortgages.c.status.in_(CLOSED_MORTGAGE_STATUSES), ~open_installment, last_due < cutoff
+    )
+
+
+def archive_cutoff(as_of=None):
+    as_of = as_of or date.today()
+    return as_of - timedelta(days=current_app.config['PAYMENT_ARCHIVE_AFTER_DAYS'])
+
+
+def archive_payment_schedules(as_of=None, batch_size=None, dry_run=False):
+    """Move installments of long-closed mortgages to the archive; returns stats"""
+    batch_size = batch_size or current_app.config['PAYMENT_ARCHIVE_BATCH_SIZE']
+    cutoff = archive_cutoff(as_of)
+    query = _archivable(cutoff)
+    stats = {'cutoff': cutoff.isoformat(), 'batches': 0, 'mortgages': 0, 'rows': 0}
+    if dry_run:
+        stats['mortgages'] = db.session.execute(select(func.count()).select_from(query.subquery())).scalar()
+        stats['rows'] = db.session.execute(
+            select(func.count()).select_from(_schedules).where(_schedules.c.mortgage_id.in_(query))
+        ).scalar()
+        return stats
+
+    last_id = 0
+    with db.engine.connect() as connection:
+        while True:
+            ids = connection.execute(
+                query.where(_mortgages.c.id > last_id).order_by(_mortgages.c.id).limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            last_id = ids[-1]
+            moved = select(*_columns(_schedules), literal(datetime.utcnow()).label('archived_at')).where(
+                _schedules.c.mortgage_id.in_(ids)
+            )
+            connection.execute(insert(_archive).from_select(list(SCHEDULE_COLUMNS) + ['archived_at'], moved))
+            result = connection.execute(delete(_schedules).where(_schedules.c.mortgage_id.in_(ids)))
+            connection.commit()
+            stats['batches'] += 1
+            stats['mortgages'] += len(ids)
+            stats['rows'] += result.rowcount
+    return stats
+
+
+def archive_status():
+    """Row counts of the hot and archive tables"""
+    def count(table):
+        return db.session.execute(select(func.count()).select_from(table)).scalar()
+
+    return {
+        'hotRows': count(_schedules),
+        'archivedRows': count(_archive),
+        'archivedMortgages': db.session.execute(
+            select(func.count(func.distinct(_archive.c.mortgage_id)))
+        ).scalar(),
+        'hotApplications': count(_applications),
+        'archivedApplications': count(_applications_archive)
+    }
+
+
+# Applications
+
+APPLICATION_COLUMNS = (
+    'id', 'borrower_id', 'lender_id', 'listing_id', 'requested_amount', 'repayment_years',
+    'status', 'notes', 'submitted_at', 'updated_at'
+)
+TERMINAL_APPLICATION_STATUSES = (ApplicationStatus.REJECTED, ApplicationStatus.EXPIRED)
+
+
+def _archivable_applications(cutoff):
+    # An application a mortgage points at stays put whatever its status
+    return select(_applications.c.id).where(
+        _applications.c.status.in_(TERMINAL_APPLICATION_STATUSES),
+        _applications.c.updated_at < cutoff,
+        ~exists().where(_mortgages.c.application_id == _applications.c.id)
+    )
+
+
+def archive_applications(as_of=None, batch_size=None, dry_run=False):
+    """Move long-settled rejected/expired applications to the archive; returns stats"""
+    batch_size = batch_size or current_app.config['APPLICATION_ARCHIVE_BATCH_SIZE']
+    as_of = as_of or date.today()
+    cutoff = datetime.combine(
+        as_of - timedelta(days=current_app.config['APPLICATION_ARCHIVE_AFTER_DAYS']), datetime.min.time()
+    )
+    query = _archivable_applications(cutoff)
+    stats = {'cutoff': cutoff.date().isoformat(), 'batches': 0, 'rows': 0}
+    if dry_run:
+        stats['rows'] = db.session.execute(select(func.count()).select_from(query.subquery())).scalar()
+        return stats
+
+    last_id = 0
+    with db.engine.connect() as connection:
+        while True:
+            ids = connection.execute(
+                query.where(_applications.c.id > last_id).order_by(_applications.c.id).limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            last_id = ids[-1]
+            moved = select(
+                *[_applications.c[name] for name in APPLICATION_COLUMNS],
+                literal(datetime.utcnow()).label('archived_at')
+            ).where(_applications.c.id.in_(ids))
+            connection.execute(insert(_applications_archive).from_select(
+                list(APPLICATION_COLUMNS) + ['archived_at'], moved
+            ))
+            result = connection.execute(delete(_applications).where(_applications.c.id.in_(ids)))
+            connection.commit()
+            stats['batches'] += 1
+            stats['rows'] += result.rowcount
+    return stats
+
+
+def archived_applications(**filters):
+    """Archived applications matching ``filters`` (column=value), newest first"""
+    return MortgageApplicationArchive.query.filter_by(**filters).order_by(
+        MortgageApplicationArchive.submitted_at.desc()
+    ).all()
+
+
+def application_count(**filters):
+    """Applications matching ``filters`` in the hot and archive tables together"""
+    return (MortgageApplication.query.filter_by(**filters).count()
+            + MortgageApplicationArchive.query.filter_by(**filters).count())
+
+
+def has_applied(borrower_id, listing_id):
+    """Whether the buyer ever applied for the listing, archived applications included"""
+    return any(
+        db.session.query(model.query.filter_by(borrower_id=borrower_id, listing_id=listing_id).exists()).scalar()
+        for model in (MortgageApplication, MortgageApplicationArchive)
+    )
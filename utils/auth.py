@@ -0,0 +1,185 @@
+# NetLend Backend - Token Claims and Principal Revocation
+# Access tokens carry the principal's role and email as claims, so role checks
+# need no database lookup. Tokens issued before claims existed fall back to a
+# DB lookup that is cached for AUTH_PRINCIPAL_CACHE_TTL seconds.
+#
+# Deleting a principal, or changing a legacy user's role, revokes every token
+# issued to it so far. The revocation is a principal_revocations row written
+# in the same transaction as the delete or demotion, so every worker and host
+# sees it and a rollback undoes it. Each worker caches revocation lookups for
+# AUTH_PRINCIPAL_CACHE_TTL seconds, so a revocation made on another worker
+# takes at most that long to apply there (immediately on the revoking one).
+# Rows older than the token lifetime guard nothing and are pruned on write.
+# iat has whole-second resolution, so revoked_at is stored in whole seconds
+# and only tokens from earlier seconds are rejected: a login in the same
+# second as the revocation gets a working token.
+
+import time
+
+from flask import current_app, has_app_context
+from flask_jwt_extended import create_access_token, get_jwt
+from sqlalchemy import delete, event, insert, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from models import User, Buyer, Lender, Admin, PrincipalRevocation
+from utils.cache import TTLCache
+
+IDENTITY_PREFIXES = {'U': User, 'B': Buyer, 'L': Lender, 'A': Admin}
+
+_principals = TTLCache('auth_principal', maxsize=10000)
+_revocations = PrincipalRevocation.__table__
+
+
+def identity_for(principal):
+    """JWT identity ('B12', 'L3', ...) for a User, Buyer, Lender or Admin row"""
+    for prefix, model in IDENTITY_PREFIXES.items():
+        if isinstance(principal, model):
+            return f"{prefix}{principal.id}"
+    raise TypeError(f"Not a principal: {principal!r}")
+
+
+def principal_claims(principal):
+    if isinstance(principal, User):
+        role = principal.role.value
+    elif isinstance(principal, Buyer):
+        role = 'homebuyer'
+    elif isinstance(principal, Lender):
+        role = 'lender'
+    else:
+        role = 'admin'
+    return {'role': role, 'email': principal.email}
+
+
+def create_principal_token(principal):
+    """Access token with role/email claims embedded"""
+    return create_access_token(identity=identity_for(principal), additional_claims=principal_claims(principal))
+
+
+def _parse_identity(identity):
+    prefix, raw_id = str(identity)[:1], str(identity)[1:]
+    if prefix not in IDENTITY_PREFIXES or not raw_id.isdigit():
+        return None, None
+    return prefix, int(raw_id)
+
+
+def _cache_ttl():
+    return current_app.config.get('AUTH_PRINCIPAL_CACHE_TTL', 30)
+
+
+def _token_lifetime():
+    expires = current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES')
+    if hasattr(expires, 'total_seconds'):
+        expires = expires.total_seconds()
+    return int(expires) if expires else None
+
+
+def _load_claims(identity):
+    """Claims for a token issued without them - one cached DB lookup"""
+    key = ('claims', identity)
+    claims = _principals.get(key)
+    if claims is None:
+        prefix, principal_id = _parse_identity(identity)
+        principal = db.session.get(IDENTITY_PREFIXES[prefix], principal_id) if prefix else None
+        claims = principal_claims(principal) if principal else {}
+        _principals.set(key, claims, ttl=_cache_ttl())
+    return claims
+
+
+def current_principal():
+    """Principal behind the verified JWT of this request
+
+    Returns a dict with identity, id, role and email, or None when a token
+    without claims belongs to a principal that no longer exists. Call only
+    after jwt_required()/verify_jwt_in_request().
+    """
+    claims = get_jwt()
+    identity = claims['sub']
+    if 'role' not in claims:
+        claims = _load_claims(identity)
+        if not claims:
+            return None
+    _, principal_id = _parse_identity(identity)
+    return {'identity': identity, 'id': principal_id, 'role': claims['role'], 'email': claims.get('email')}
+
+
+def _read_revocation(identity):
+    value = db.session.execute(
+        select(_revocations.c.revoked_at).where(_revocations.c.identity == identity)
+    ).scalar()
+    return value or 0
+
+
+def revoked_at(identity):
+    """Epoch second before which tokens for ``identity`` are rejected (0 = never)"""
+    key = ('revoked', identity)
+    value = _principals.get(key)
+    if value is None:
+        value = _read_revocation(identity)
+        _principals.set(key, value, ttl=_cache_ttl())
+    return value
+
+
+def _write_revocation(connection, identity):
+    now = int(time.time())
+    connection.execute(delete(_revocations).where(_revocations.c.identity == identity))
+    connection.execute(insert(_revocations).values(identity=identity, revoked_at=now))
+    lifetime = _token_lifetime() if has_app_context() else None
+    if lifetime:
+        connection.execute(delete(_revocations).where(_revocations.c.revoked_at < now - lifetime))
+
+
+def _forget(identity):
+    _principals.delete(('revoked', identity))
+    _principals.delete(('claims', identity))
+
+
+def revoke_principal(identity):
+    """Reject every token issued to ``identity`` up to now, once the session commits"""
+    _write_revocation(db.session.connection(), identity)
+    db.session.info.setdefault('revoke_identities', set()).add(identity)
+
+
+def is_token_revoked(jwt_header, jwt_payload):
+    return jwt_payload.get('iat', 0) < revoked_at(jwt_payload['sub'])
+
+
+def init_auth(jwt):
+    """Check every verified token against the revocation list"""
+    jwt.token_in_blocklist_loader(is_token_revoked)
+
+
+# Revoke in the flush that deletes or demotes, so the revocation commits or
+# rolls back with it; after the commit this worker drops its cached lookups
+
+def _queue_revocation(connection, target):
+    identity = identity_for(target)
+    _write_revocation(connection, identity)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('revoke_identities', set()).add(identity)
+
+
+def _principal_deleted(mapper, connection, target):
+    _queue_revocation(connection, target)
+
+
+def _user_updated(mapper, connection, target):
+    if inspect(target).attrs.role.history.has_changes():
+        _queue_revocation(connection, target)
+
+
+for _model in IDENTITY_PREFIXES.values():
+    event.listen(_model, 'after_delete', _principal_deleted)
+event.listen(User, 'after_update', _user_updated)
+
+
+@event.listens_for(Session, 'after_commit')
+def _revoke_committed(session):
+    for identity in session.info.pop('revoke_identities', ()):
+        _forget(identity)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_revocations(session, previous_transaction):
+    session.info.pop('revoke_identities', None)
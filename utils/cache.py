@@ -0,0 +1,53 @@
+# NetLend Backend - In-Process Caches
+# Small thread-safe TTL caches for hot lookups that would otherwise hit the
+# database on every request. Each cache is per worker process; hit/miss counts
+# are exported to Prometheus under the cache's name.
+
+import threading
+import time
+from collections import OrderedDict
+
+from utils.metrics import record_cache_hit, record_cache_miss
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries expire after ``ttl`` seconds"""
+
+    def __init__(self, name, ttl=60, maxsize=1024):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    record_cache_hit(self.name)
+                    return value
+                del self._data[key]
+        record_cache_miss(self.name)
+        return default
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
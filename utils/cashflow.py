@@ -0,0 +1,157 @@
+# NetLend Backend - Portfolio Cash-Flow Projection
+# Expected monthly inflows of a lender's (or the platform's) ACTIVE mortgages
+# for the next N months, built with numpy from one columnar read of
+# active_mortgages instead of walking pending payment_schedules rows.
+#
+# Each loan's remaining_balance is re-amortized as a level payment over its
+# remaining installments. Installments fall at the end of each month after
+# origination, as the approval flow schedules them (routes/lender.py). The
+# projection steps month by month over all loans at once:
+#   1. defaults - the monthly default rate (from the annual CDR) of the balance
+#      is written off
+#   2. interest and scheduled principal on the surviving balance
+#   3. prepayments - the single-monthly mortality (from the annual CPR) of the
+#      balance left after the scheduled payment is paid off early
+# Loans past maturity with a balance left are assumed to settle it in the
+# first projected month. Arrears already overdue are not projected; the aging
+# report (utils/aging.py) covers them.
+
+from datetime import date
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from models import ActiveMortgage, MortgageStatus
+
+_mortgages = ActiveMortgage.__table__
+
+_FLOWS = ('interest', 'scheduledPrincipal', 'prepayments', 'defaults')
+
+
+def monthly_rate(annual_rate):
+    """Monthly equivalent of an annual conditional rate (CPR -> SMM, CDR -> MDR)"""
+    return 1 - (1 - annual_rate) ** (1 / 12)
+
+
+def month_index(value):
+    return value.year * 12 + value.month - 1
+
+
+def annuity_payment(balance, rate, term):
+    """Level monthly payment repaying ``balance`` over ``term`` months at monthly ``rate`` (arrays)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(rate > 0, balance * rate / (1 - (1 + rate) ** -term), balance / term)
+
+
+def load_portfolio(lender_id=None):
+    """Columnar numpy snapshot of ACTIVE mortgages with a balance left"""
+    query = select(
+        _mortgages.c.remaining_balance, _mortgages.c.interest_rate,
+        _mortgages.c.repayment_term, _mortgages.c.created_at
+    ).where(_mortgages.c.status == MortgageStatus.ACTIVE, _mortgages.c.remaining_balance > 0)
+    if lender_id is not None:
+        query = query.where(_mortgages.c.lender_id == lender_id)
+    rows = db.session.execute(query).all()
+    return {
+        'balance': np.array([row[0] for row in rows], dtype=np.float64),
+        'rate': np.array([row[1] or 0 for row in rows], dtype=np.float64) / 100 / 12,
+        # Month indexes of the first and last scheduled installment
+        'first': np.array([month_index(row[3]) + 1 for row in rows], dtype=np.int64),
+        'maturity': np.array([month_index(row[3]) + row[2] for row in rows], dtype=np.int64)
+    }
+
+
+def project(portfolio, start_month, months, cpr=0.0, cdr=0.0):
+    """Monthly flows of ``portfolio`` for ``months`` months from ``start_month``
+
+    ``start_month`` is a month index (year * 12 + month - 1) and cpr / cdr are
+    annual rates between 0 and 1. Returns a dict of float64 arrays of length
+    ``months``: interest, scheduledPrincipal, prepayments, defaults,
+    endingBalance and activeLoans.
+    """
+    balance = portfolio['balance'].copy()
+    rate = portfolio['rate']
+    first = portfolio['first']
+    # Loans past maturity settle what is left in the first month
+    maturity = np.maximum(portfolio['maturity'], start_month)
+    smm = monthly_rate(cpr)
+    mdr = monthly_rate(cdr)
+
+    # Level payment over the installments left from each loan's first projected
+    # month. Defaults and prepayments shrink the balance proportionally, so
+    # re-amortizing over the same term just scales the payment by the same factor.
+    payment = annuity_payment(balance, rate, maturity - np.maximum(first, start_month) + 1)
+
+    result = {flow: np.zeros(months) for flow in _FLOWS}
+    result['endingBalance'] = np.zeros(months)
+    result['activeLoans'] = np.zeros(months)
+    for month in range(months):
+        current = start_month + month
+        live = ((current >= first) & (current <= maturity) & (balance > 0)).astype(np.float64)
+
+        defaults = balance * (mdr * live)
+        balance = balance - defaults
+        payment = payment * (1 - mdr * live)
+        interest = balance * rate * live
+        principal = np.minimum(payment - interest, balance) * live
+        balance = balance - principal
+        prepayments = balance * (smm * live)
+        balance = balance - prepayments
+        payment = payment * (1 - smm * live)
+
+        result['interest'][month] = interest.sum()
+        result['scheduledPrincipal'][month] = principal.sum()
+        result['prepayments'][month] = prepayments.sum()
+        result['defaults'][month] = defaults.sum()
+        result['endingBalance'][month] = balance.sum()
+        result['activeLoans'][month] = live.sum()
+    return result
+
+
+def parse_assumptions(args):
+    """(months, cpr, cdr) from request args; raises ValueError on bad values"""
+    max_months = current_app.config['CASHFLOW_MAX_MONTHS']
+    months = args.get('months', '12')
+    if not months.isdigit() or not 1 <= int(months) <= max_months:
+        raise ValueError(f'months must be between 1 and {max_months}')
+    rates = {}
+    for name in ('cpr', 'cdr'):
+        try:
+            rates[name] = float(args.get(name, 0))
+        except ValueError:
+            rates[name] = -1
+        if not 0 <= rates[name] < 1:
+            raise ValueError(f'{name} must be an annual rate between 0 and 1 (e.g. 0.06 for 6%)')
+    return int(months), rates['cpr'], rates['cdr']
+
+
+def cash_flow_projection(lender_id=None, months=12, cpr=0.0, cdr=0.0, as_of=None):
+    """Projection response for a lender (or the platform), starting with the month of as_of"""
+    as_of = as_of or date.today()
+    start_month = month_index(as_of)
+    portfolio = load_portfolio(lender_id)
+    flows = project(portfolio, start_month, months, cpr, cdr)
+
+    schedule = []
+    for i in range(months):
+        year, month = divmod(start_month + i, 12)
+        entry = {flow: round(float(flows[flow][i]), 2) for flow in _FLOWS}
+        entry['totalInflow'] = round(entry['interest'] + entry['scheduledPrincipal'] + entry['prepayments'], 2)
+        entry['endingBalance'] = round(float(flows['endingBalance'][i]), 2)
+        entry['activeLoans'] = int(flows['activeLoans'][i])
+        schedule.append(dict(month=f'{year}-{month + 1:02d}', **entry))
+
+    return {
+        'asOf': as_of.isoformat(),
+        'lenderId': lender_id,
+        'assumptions': {'months': months, 'cpr': cpr, 'cdr': cdr},
+        'loans': len(portfolio['balance']),
+        'openingBalance': round(float(portfolio['balance'].sum()), 2),
+        'months': schedule,
+        'totals': {
+            flow: round(sum(entry[flow] for entry in schedule), 2)
+            for flow in _FLOWS + ('totalInflow',)
+        }
+    }
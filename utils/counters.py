@@ -0,0 +1,188 @@
+# NetLend Backend - Counter Caches
+# Keeps the *_count / payments_made / total_paid columns in step with the rows
+# they count, so list and detail views read statistics in O(1):
+# - mortgage_listings.applications_count / saved_count (archived applications
+#   included - see utils/archive.py)
+# - active_mortgages.payments_made / total_paid (PAID payment_schedules rows,
+#   archived ones included - see utils/archive.py)
+# - lenders.listings_count / applications_count / active_mortgages_count
+#
+# ORM inserts, updates and deletes adjust the counters with relative
+# "SET col = col + n" statements inside the same flush, so they commit or roll
+# back with the change that caused them. Relative increments are also safe
+# under concurrent writers. In-memory copies of the counter columns only
+# refresh after commit.
+#
+# Core/bulk statements (session.execute(insert(...), rows), query.update(),
+# query.delete()) bypass mapper events. After such writes, run
+# repair_counters() (or repair_counters.py).
+
+from sqlalchemy import event, func, inspect, or_, select, update
+
+from app import db
+from models import (
+    Lender, MortgageListing, MortgageApplication, MortgageApplicationArchive, ActiveMortgage,
+    PaymentSchedule, PaymentScheduleArchive, PaymentStatus, SavedProperty
+)
+
+
+def _bump(connection, model, row_id, **deltas):
+    deltas = {k: v for k, v in deltas.items() if v}
+    if row_id is None or not deltas:
+        return
+    table = model.__table__
+    connection.execute(
+        update(table).where(table.c.id == row_id).values(
+            {table.c[column]: table.c[column] + delta for column, delta in deltas.items()}
+        )
+    )
+
+
+def _previous(target, key):
+    """Value of ``key`` before this flush (needs active history, see below)"""
+    history = inspect(target).attrs[key].history
+    return history.deleted[0] if history.deleted else getattr(target, key)
+
+
+def _track_parent(child, foreign_key, parent, column):
+    """Count ``child`` rows on ``parent.column`` keyed by ``child.foreign_key``"""
+
+    def after_insert(mapper, connection, target):
+        _bump(connection, parent, getattr(target, foreign_key), **{column: 1})
+
+    def after_delete(mapper, connection, target):
+        _bump(connection, parent, _previous(target, foreign_key), **{column: -1})
+
+    def after_update(mapper, connection, target):
+        old, new = _previous(target, foreign_key), getattr(target, foreign_key)
+        if old != new:
+            _bump(connection, parent, old, **{column: -1})
+            _bump(connection, parent, new, **{column: 1})
+
+    event.listen(child, 'after_insert', after_insert)
+    event.listen(child, 'after_delete', after_delete)
+    event.listen(child, 'after_update', after_update)
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+def _active_history(*attributes):
+    # Without active history, assigning to an expired attribute records no
+    # previous value and the old row would never be decremented
+    for attribute in attributes:
+        event.listen(attribute, 'set', _load_old_value, active_history=True)
+
+
+_track_parent(MortgageApplication, 'listing_id', MortgageListing, 'applications_count')
+_track_parent(MortgageApplication, 'lender_id', Lender, 'applications_count')
+_track_parent(SavedProperty, 'listing_id', MortgageListing, 'saved_count')
+_track_parent(MortgageListing, 'lender_id', Lender, 'listings_count')
+_track_parent(ActiveMortgage, 'lender_id', Lender, 'active_mortgages_count')
+
+
+# Payments only count once PAID, so status and amount changes move the totals too
+
+def _payment_contribution(status, amount_paid):
+    if status == PaymentStatus.PAID:
+        return 1, amount_paid or 0
+    return 0, 0
+
+
+@event.listens_for(PaymentSchedule, 'after_insert')
+def _payment_inserted(mapper, connection, target):
+    made, paid = _payment_contribution(target.status, target.amount_paid)
+    _bump(connection, ActiveMortgage, target.mortgage_id, payments_made=made, total_paid=paid)
+
+
+@event.listens_for(PaymentSchedule, 'after_delete')
+def _payment_deleted(mapper, connection, target):
+    made, paid = _payment_contribution(_previous(target, 'status'), _previous(target, 'amount_paid'))
+    _bump(connection, ActiveMortgage, _previous(target, 'mortgage_id'), payments_made=-made, total_paid=-paid)
+
+
+@event.listens_for(PaymentSchedule, 'after_update')
+def _payment_updated(mapper, connection, target):
+    old_mortgage, new_mortgage = _previous(target, 'mortgage_id'), target.mortgage_id
+    old_made, old_paid = _payment_contribution(_previous(target, 'status'), _previous(target, 'amount_paid'))
+    new_made, new_paid = _payment_contribution(target.status, target.amount_paid)
+    if old_mortgage == new_mortgage:
+        _bump(connection, ActiveMortgage, new_mortgage,
+              payments_made=new_made - old_made, total_paid=new_paid - old_paid)
+    else:
+        _bump(connection, ActiveMortgage, old_mortgage, payments_made=-old_made, total_paid=-old_paid)
+        _bump(connection, ActiveMortgage, new_mortgage, payments_made=new_made, total_paid=new_paid)
+
+
+_active_history(
+    MortgageApplication.listing_id, MortgageApplication.lender_id, SavedProperty.listing_id,
+    MortgageListing.lender_id, ActiveMortgage.lender_id,
+    PaymentSchedule.mortgage_id, PaymentSchedule.status, PaymentSchedule.amount_paid
+)
+
+
+def counter_expressions():
+    """Model -> {counter column: correlated subquery computing its true value}"""
+    def paid(model, aggregate):
+        return select(aggregate).where(
+            model.mortgage_id == ActiveMortgage.id, model.status == PaymentStatus.PAID
+        ).scalar_subquery()
+
+    return {
+        MortgageListing: {
+            'applications_count': select(func.count(MortgageApplication.id))
+                .where(MortgageApplication.listing_id == MortgageListing.id).scalar_subquery()
+                + select(func.count(MortgageApplicationArchive.id))
+                .where(MortgageApplicationArchive.listing_id == MortgageListing.id).scalar_subquery(),
+            'saved_count': select(func.count(SavedProperty.id))
+                .where(SavedProperty.listing_id == MortgageListing.id).scalar_subquery()
+        },
+        ActiveMortgage: {
+            # Archived installments (utils/archive.py) still count
+            'payments_made': paid(PaymentSchedule, func.count(PaymentSchedule.id))
+                + paid(PaymentScheduleArchive, func.count(PaymentScheduleArchive.id)),
+            'total_paid': paid(PaymentSchedule, func.coalesce(func.sum(PaymentSchedule.amount_paid), 0))
+                + paid(PaymentScheduleArchive, func.coalesce(func.sum(PaymentScheduleArchive.amount_paid), 0))
+        },
+        Lender: {
+            'listings_count': select(func.count(MortgageListing.id))
+                .where(MortgageListing.lender_id == Lender.id).scalar_subquery(),
+            'applications_count': select(func.count(MortgageApplication.id))
+                .where(MortgageApplication.lender_id == Lender.id).scalar_subquery()
+                + select(func.count(MortgageApplicationArchive.id))
+                .where(MortgageApplicationArchive.lender_id == Lender.id).scalar_subquery(),
+            'active_mortgages_count': select(func.count(ActiveMortgage.id))
+                .where(ActiveMortgage.lender_id == Lender.id).scalar_subquery()
+        }
+    }
+
+
+def _drifted(model, expressions):
+    conditions = []
+    for column, expression in expressions.items():
+        stored = getattr(model, column)
+        if column == 'total_paid':
+            conditions.append(func.abs(stored - expression) > 0.005)
+        else:
+            conditions.append(stored != expression)
+    return or_(*conditions)
+
+
+def repair_counters(check_only=False):
+    """Recompute every counter cache from the source rows
+
+    Returns {table name: rows whose stored counters were wrong}. With
+    check_only the drift is reported but nothing is written. The caller commits.
+    """
+    drift = {}
+    for model, expressions in counter_expressions().items():
+        drift[model.__tablename__] = db.session.execute(
+            select(func.count()).select_from(model).where(_drifted(model, expressions))
+        ).scalar()
+        if not check_only and drift[model.__tablename__]:
+            db.session.execute(
+                update(model).where(_drifted(model, expressions)).values(**expressions)
+                .execution_options(synchronize_session=False)
+            )
+    return drift
@@ -0,0 +1,193 @@
+# NetLend Backend - Batch Creditworthiness Scoring
+# Re-scores the whole buyer base with the rules in models.py (the CREDIT_*
+# constants), applied with numpy to columnar snapshots of `buyers` instead of
+# one Buyer.calculate_creditworthiness_score() call per row. Scores and their
+# breakdowns are written together, as the before_flush hook in models.py does.
+#
+# The id space is split into ranges. Each range is read in keyset-paged chunks,
+# scored, and only changed scores are written back as one executemany UPDATE
+# per chunk. Ranges can run in parallel worker processes. Each worker opens its
+# own engine from the database URI, so nothing needs to be pickled but ids.
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sqlalchemy import bindparam, create_engine, func, select, update
+
+from models import (
+    Buyer, CREDIT_ASSUMED_ANNUAL_RATE, CREDIT_INCOME_RATIO_BANDS, CREDIT_EMPLOYMENT_BANDS,
+    CREDIT_DOWN_PAYMENT_BANDS, CREDIT_LOAN_BURDEN_BANDS, CREDIT_DOCUMENT_FIELDS,
+    CREDIT_DOCUMENT_POINTS, CREDIT_MAX_SCORE, CREDIT_SCORE_INPUTS, credit_breakdown
+)
+
+SCORE_INPUTS = CREDIT_SCORE_INPUTS
+
+_buyers = Buyer.__table__
+
+
+def _truthy(values):
+    """Vector form of Python truthiness for nullable numbers (NaN = NULL)"""
+    return ~np.isnan(values) & (values != 0)
+
+
+def _points_below(values, mask, bands):
+    conditions = [mask & (values < threshold) for threshold, _ in bands]
+    return np.select(conditions, [points for _, points in bands], default=0)
+
+
+def _points_at_least(values, mask, bands):
+    conditions = [mask & (values >= threshold) for threshold, _ in bands]
+    return np.select(conditions, [points for _, points in bands], default=0)
+
+
+def factor_columns(columns):
+    """Per-factor points for a snapshot {column name: float64 array, NULL as NaN}
+
+    Mirrors Buyer.creditworthiness_factors operation for operation, so the
+    results match the scalar method exactly.
+    """
+    net_income = columns['monthly_net_income']
+    loan = columns['desired_loan_amount']
+    employment = columns['employment_duration']
+    down_payment = columns['down_payment_amount']
+    property_value = columns['estimated_property_value']
+    repayments = columns['monthly_loan_repayments']
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        has_income_ratio = _truthy(net_income) & _truthy(loan)
+        income_ratio = (loan * CREDIT_ASSUMED_ANNUAL_RATE) / 12 / net_income
+        has_down_payment = _truthy(down_payment) & _truthy(property_value)
+        has_burden = _truthy(net_income) & _truthy(repayments)
+        factors = {
+            'incomeRatio': _points_below(income_ratio, has_income_ratio, CREDIT_INCOME_RATIO_BANDS),
+            'employment': _points_at_least(employment, _truthy(employment), CREDIT_EMPLOYMENT_BANDS),
+            'downPayment': _points_at_least(down_payment / property_value, has_down_payment, CREDIT_DOWN_PAYMENT_BANDS),
+            'loanBurden': _points_below(repayments / net_income, has_burden, CREDIT_LOAN_BURDEN_BANDS)
+        }
+
+    docs_uploaded = sum(np.nan_to_num(columns[field]) != 0 for field in CREDIT_DOCUMENT_FIELDS)
+    factors['documents'] = (docs_uploaded / len(CREDIT_DOCUMENT_FIELDS)) * CREDIT_DOCUMENT_POINTS
+    return factors
+
+
+def score_columns(columns, factors=None):
+    """Scores for a snapshot, summing factors in the scalar method's order"""
+    factors = factors or factor_columns(columns)
+    score = np.zeros(len(factors['documents']))
+    for points in factors.values():
+        score = score + points
+    return np.minimum(CREDIT_MAX_SCORE, score)
+
+
+def snapshot(rows, fields=SCORE_INPUTS):
+    """Columnar float64 arrays from row tuples/mappings (None becomes NaN)"""
+    return {
+        field: np.array([np.nan if row[field] is None else row[field] for row in rows], dtype=np.float64)
+        for field in fields
+    }
+
+
+def rescore_range(connection, start_id, end_id, chunk_size):
+    """Re-score buyers with start_id <= id < end_id; returns (scanned, updated)"""
+    stored = [_buyers.c.creditworthiness_score, _buyers.c.creditworthiness_breakdown]
+    columns = [_buyers.c.id] + stored + [_buyers.c[f] for f in SCORE_INPUTS]
+    write = update(_buyers).where(_buyers.c.id == bindparam('buyer_id')).values(
+        creditworthiness_score=bindparam('score'),
+        creditworthiness_breakdown=bindparam('breakdown')
+    )
+    scanned = updated = 0
+    last_id = start_id - 1
+
+    while True:
+        rows = connection.execute(
+            select(*columns).where(_buyers.c.id > last_id, _buyers.c.id < end_id)
+            .order_by(_buyers.c.id).limit(chunk_size)
+        ).mappings().all()
+        if not rows:
+            break
+
+        factors = factor_columns(snapshot(rows))
+        scores = score_columns(None, factors)
+        params = []
+        for i, row in enumerate(rows):
+            score = float(scores[i])
+            breakdown = credit_breakdown(score, {
+                name: float(points[i]) if name == 'documents' else int(points[i])
+                for name, points in factors.items()
+            })
+            if row['creditworthiness_score'] != score or row['creditworthiness_breakdown'] != breakdown:
+                params.append({'buyer_id': row['id'], 'score': score, 'breakdown': breakdown})
+        if params:
+            connection.execute(write, params)
+        connection.commit()
+
+        scanned += len(rows)
+        updated += len(params)
+        last_id = rows[-1]['id']
+    return scanned, updated
+
+
+def _rescore_worker(database_uri, start_id, end_id, chunk_size):
+    engine = create_engine(database_uri)
+    try:
+        with engine.connect() as connection:
+            return rescore_range(connection, start_id, end_id, chunk_size)
+    finally:
+        engine.dispose()
+
+
+def id_ranges(min_id, max_id, parts):
+    """Split [min_id, max_id] into at most ``parts`` half-open ranges"""
+    if min_id is None:
+        return []
+    step = max(1, -(-(max_id - min_id + 1) // parts))
+    return [(start, min(start + step, max_id + 1)) for start in range(min_id, max_id + 1, step)]
+
+
+def rescore_all(engine, workers=1, chunk_size=5000):
+    """Re-score every buyer; returns {'scanned': n, 'updated': n}"""
+    with engine.connect() as connection:
+        min_id, max_id = connection.execute(select(func.min(_buyers.c.id), func.max(_buyers.c.id))).one()
+
+    totals = {'scanned': 0, 'updated': 0}
+    if workers <= 1:
+        ranges = id_ranges(min_id, max_id, 1)
+        with engine.connect() as connection:
+            results = [rescore_range(connection, start, end, chunk_size) for start, end in ranges]
+    else:
+        # Several ranges per worker so one dense range does not leave the rest idle
+        ranges = id_ranges(min_id, max_id, workers * 4)
+        database_uri = engine.url.render_as_string(hide_password=False)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_rescore_worker, database_uri, start, end, chunk_size) for start, end in ranges]
+            results = [future.result() for future in futures]
+
+    for scanned, updated in results:
+        totals['scanned'] += scanned
+        totals['updated'] += updated
+    return totals
+
+
+def verify_parity(session, limit=None):
+    """Compare the batch scorer with the scalar method on ORM-loaded buyers
+
+    Returns a list of (buyer_id, scalar score, batch score) for every buyer
+    whose score or factor breakdown differs. Nothing is assigned or written.
+    """
+    query = session.query(Buyer).order_by(Buyer.id)
+    if limit:
+        query = query.limit(limit)
+    buyers = query.all()
+    if not buyers:
+        return []
+    rows = [{field: getattr(buyer, field) for field in SCORE_INPUTS} for buyer in buyers]
+    factors = factor_columns(snapshot(rows))
+    batch_scores = score_columns(None, factors)
+
+    mismatches = []
+    for i, buyer in enumerate(buyers):
+        scalar_score, breakdown = buyer.creditworthiness_assessment()
+        batch_factors = {name: points[i] for name, points in factors.items()}
+        if scalar_score != float(batch_scores[i]) or breakdown['factors'] != batch_factors:
+            mismatches.append((buyer.id, scalar_score, float(batch_scores[i])))
+    return mismatches
@@ -0,0 +1,209 @@
+# NetLend Backend - Delinquency Engine
+# Nightly, set-based status transitions for the payment schedule:
+# - PENDING installments more than DELINQUENCY_GRACE_DAYS past due -> LATE
+# - LATE installments more than DELINQUENCY_MISSED_AFTER_DAYS past due -> MISSED
+# - ACTIVE mortgages with DELINQUENCY_DEFAULT_AFTER_MISSED missed installments -> DEFAULTED
+# - ACTIVE mortgages with nothing left to pay and no open installments -> COMPLETED
+# - next_payment_due of ACTIVE mortgages moves to their oldest open installment
+#
+# Every step is an UPDATE over an indexed range (status, payment_date), capped
+# at batch_size rows and committed per batch, so locks stay short and a
+# crashed run resumes where it stopped. Rows that change leave the range, so
+# each batch simply takes the next slice. Stats of every run are stored in
+# delinquency_runs.
+#
+# These are Core statements: they bypass mapper events, which is fine because
+# only PAID rows feed the counter caches (utils/counters.py).
+
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, exists, func, select, update
+
+from app import db
+from models import ActiveMortgage, DelinquencyRun, MortgageStatus, OPEN_PAYMENT_STATUSES, PaymentSchedule, PaymentStatus
+
+_schedules = PaymentSchedule.__table__
+_mortgages = ActiveMortgage.__table__
+
+
+def _cutoffs(as_of):
+    config = current_app.config
+    return {
+        'late': as_of - timedelta(days=config['DELINQUENCY_GRACE_DAYS']),
+        'missed': as_of - timedelta(days=config['DELINQUENCY_MISSED_AFTER_DAYS'])
+    }
+
+
+def _overdue(status, cutoff):
+    return and_(_schedules.c.status == status, _schedules.c.payment_date < cutoff)
+
+
+def _defaulting():
+    threshold = current_app.config['DELINQUENCY_DEFAULT_AFTER_MISSED']
+    repeat_missers = select(_schedules.c.mortgage_id).where(
+        _schedules.c.status == PaymentStatus.MISSED
+    ).group_by(_schedules.c.mortgage_id).having(func.count() >= threshold)
+    return and_(_mortgages.c.status == MortgageStatus.ACTIVE, _mortgages.c.id.in_(repeat_missers))
+
+
+def _has_open_installments():
+    return exists().where(
+        _schedules.c.mortgage_id == _mortgages.c.id, _schedules.c.status.in_(OPEN_PAYMENT_STATUSES)
+    )
+
+
+def _completing():
+    return and_(
+        _mortgages.c.status == MortgageStatus.ACTIVE,
+        _mortgages.c.remaining_balance <= 0,
+        ~_has_open_installments()
+    )
+
+
+def _next_due():
+    return select(func.min(_schedules.c.payment_date)).where(
+        _schedules.c.mortgage_id == _mortgages.c.id, _schedules.c.status.in_(OPEN_PAYMENT_STATUSES)
+    ).scalar_subquery()
+
+
+def _stale_next_due(as_of):
+    # A due date still in the future cannot have been paid past yet
+    return and_(
+        _mortgages.c.status == MortgageStatus.ACTIVE,
+        (_mortgages.c.next_payment_due < as_of) | _mortgages.c.next_payment_due.is_(None)
+    )
+
+
+def batched_update(connection, table, condition, values, batch_size, stats, order_by=None):
+    """UPDATE rows matching ``condition`` batch_size at a time; returns rows changed
+
+    ``condition`` must stop matching once ``values`` are applied, so each batch
+    takes the next slice. ``order_by`` picks the index the batches walk.
+    """
+    changed = 0
+    while True:
+        batch = select(table.c.id).where(condition).limit(batch_size)
+        if order_by is not None:
+            batch = batch.order_by(order_by)
+        result = connection.execute(update(table).where(table.c.id.in_(batch), condition).values(**values))
+        connection.commit()
+        stats['batches'] += 1
+        changed += result.rowcount
+        if result.rowcount < batch_size:
+            return changed
+
+
+def _advance_next_due(connection, as_of, batch_size, stats):
+    """Point next_payment_due at each mortgage's oldest open installment"""
+    changed = 0
+    last_id = 0
+    next_due = _next_due()
+    while True:
+        ids = connection.execute(
+            select(_mortgages.c.id).where(_stale_next_due(as_of), _mortgages.c.id > last_id)
+            .order_by(_mortgages.c.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return changed
+        result = connection.execute(
+            update(_mortgages).where(_mortgages.c.id.in_(ids), _mortgages.c.next_payment_due.is_distinct_from(next_due))
+            .values(next_payment_due=next_due)
+        )
+        connection.commit()
+        stats['batches'] += 1
+        changed += result.rowcount
+        last_id = ids[-1]
+
+
+def run_delinquency(as_of=None, batch_size=None):
+    """Apply every transition as of ``as_of`` (default today); returns the DelinquencyRun
+
+    The run row is committed before work starts and updated with stats at the
+    end, including failures, whose error is stored before re-raising.
+    """
+    as_of = as_of or date.today()
+    batch_size = batch_size or current_app.config['DELINQUENCY_BATCH_SIZE']
+    cutoffs = _cutoffs(as_of)
+    run = DelinquencyRun(as_of=as_of, status='running', started_at=datetime.utcnow())
+    db.session.add(run)
+    db.session.commit()
+
+    stats = {'batches': 0}
+    try:
+        with db.engine.connect() as connection:
+            # Installment batches walk the (status, payment_date) index
+            stats['payments_late'] = batched_update(
+                connection, _schedules, _overdue(PaymentStatus.PENDING, cutoffs['late']),
+                {'status': PaymentStatus.LATE}, batch_size, stats, order_by=_schedules.c.payment_date
+            )
+            stats['payments_missed'] = batched_update(
+                connection, _schedules, _overdue(PaymentStatus.LATE, cutoffs['missed']),
+                {'status': PaymentStatus.MISSED}, batch_size, stats, order_by=_schedules.c.payment_date
+            )
+            stats['mortgages_defaulted'] = batched_update(
+                connection, _mortgages, _defaulting(), {'status': MortgageStatus.DEFAULTED}, batch_size, stats
+            )
+            stats['mortgages_completed'] = batched_update(
+                connection, _mortgages, _completing(),
+                {'status': MortgageStatus.COMPLETED, 'next_payment_due': None}, batch_size, stats
+            )
+            stats['next_due_updated'] = _advance_next_due(connection, as_of, batch_size, stats)
+        run.status = 'succeeded'
+    except Exception as e:
+        run.status = 'failed'
+        run.error = str(e)
+        raise
+    finally:
+        # Earlier batches stay committed on failure; record how far the run got
+        for field, value in stats.items():
+            setattr(run, field, value)
+        run.finished_at = datetime.utcnow()
+        db.session.commit()
+    return run
+
+
+def preview_delinquency(as_of=None):
+    """Rows each transition would change, without writing anything
+
+    Mortgage counts use current installment statuses, so mortgages that
+    default only because of installments this run marks MISSED are not included.
+    """
+    as_of = as_of or date.today()
+    cutoffs = _cutoffs(as_of)
+
+    def count(table, condition):
+        return db.session.execute(select(func.count()).select_from(table).where(condition)).scalar()
+
+    return {
+        'payments_late': count(_schedules, _overdue(PaymentStatus.PENDING, cutoffs['late'])),
+        # Includes rows that only turn LATE in this run
+        'payments_missed': count(_schedules, and_(
+            _schedules.c.status.in_((PaymentStatus.PENDING, PaymentStatus.LATE)),
+            _schedules.c.payment_date < min(cutoffs['late'], cutoffs['missed'])
+        )),
+        'mortgages_defaulted': count(_mortgages, _defaulting()),
+        'mortgages_completed': count(_mortgages, _completing()),
+        'next_due_updated': count(_mortgages, and_(
+            _stale_next_due(as_of), _mortgages.c.next_payment_due.is_distinct_from(_next_due())
+        ))
+    }
+
+
+def run_summary(run):
+    return {
+        'id': run.id,
+        'asOf': run.as_of.isoformat(),
+        'status': run.status,
+        'startedAt': run.started_at.isoformat() if run.started_at else None,
+        'finishedAt': run.finished_at.isoformat() if run.finished_at else None,
+        'durationSeconds': round((run.finished_at - run.started_at).total_seconds(), 3)
+            if run.finished_at and run.started_at else None,
+        'paymentsLate': run.payments_late,
+        'paymentsMissed': run.payments_missed,
+        'mortgagesDefaulted': run.mortgages_defaulted,
+        'mortgagesCompleted': run.mortgages_completed,
+        'nextDueUpdated': run.next_due_updated,
+        'batches': run.batches,
+        'error': run.error
+    }
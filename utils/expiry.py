@@ -0,0 +1,46 @@
+# NetLend Backend - Expiry Sweeper
+# Moves refinancing offers past offer_expiry and pre-approvals past
+# valid_until to EXPIRED, so read paths can trust the stored status instead
+# of comparing dates row by row. Both are batched range UPDATEs over
+# (status, expiry date) indexes, committed per batch like the delinquency
+# job (utils/delinquency.py). The expiry date is the last valid day: rows
+# expire once it is before as_of.
+
+from datetime import date
+
+from flask import current_app
+
+from app import db
+from models import ApplicationStatus, OfferStatus, PreApproval, RefinancingOffer
+from utils.delinquency import batched_update
+
+_offers = RefinancingOffer.__table__
+_pre_approvals = PreApproval.__table__
+
+# Pre-approvals still usable by the buyer
+OPEN_PRE_APPROVAL_STATUSES = (ApplicationStatus.PENDING, ApplicationStatus.APPROVED)
+
+
+def expired_offers(as_of):
+    return (_offers.c.status == OfferStatus.OFFERED) & (_offers.c.offer_expiry < as_of)
+
+
+def expired_pre_approvals(as_of):
+    return _pre_approvals.c.status.in_(OPEN_PRE_APPROVAL_STATUSES) & (_pre_approvals.c.valid_until < as_of)
+
+
+def sweep_expired(as_of=None, batch_size=None):
+    """Expire lapsed offers and pre-approvals; returns per-table counts"""
+    as_of = as_of or date.today()
+    batch_size = batch_size or current_app.config['EXPIRY_BATCH_SIZE']
+    stats = {'batches': 0}
+    with db.engine.connect() as connection:
+        stats['offers_expired'] = batched_update(
+            connection, _offers, expired_offers(as_of), {'status': OfferStatus.EXPIRED},
+            batch_size, stats, order_by=_offers.c.offer_expiry
+        )
+        stats['pre_approvals_expired'] = batched_update(
+            connection, _pre_approvals, expired_pre_approvals(as_of), {'status': ApplicationStatus.EXPIRED},
+            batch_size, stats, order_by=_pre_approvals.c.valid_until
+        )
+    return stats
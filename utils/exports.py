@@ -0,0 +1,252 @@
+# NetLend Backend - Portfolio Export Helpers
+# Streams ActiveMortgage and PaymentSchedule rows (archived installments
+# included) for regulatory reporting.
+# Rows are read through a server-side cursor (stream_results) one partition at a
+# time and encoded as CSV, or Parquet when pyarrow is installed, so memory stays
+# constant no matter how many rows are exported.
+# The query runs and its first partition is fetched in iter_export, so a
+# failing export raises in the caller instead of after a route has sent 200.
+
+import csv
+import io
+import itertools
+from datetime import date, datetime
+from enum import Enum
+
+from sqlalchemy import select
+
+from app import db
+from config import Config
+from models import ActiveMortgage, MortgageStatus, PaymentStatus
+from utils.archive import schedule_union
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+    pq = None
+
+EXPORT_FORMATS = ('csv', 'parquet')
+
+
+def parquet_available():
+    return pa is not None
+
+
+def _parse_date(value, name):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'{name} must be a date in YYYY-MM-DD format')
+
+
+def _active_mortgages_statement(lender_id=None, start=None, end=None, status=None):
+    stmt = select(
+        ActiveMortgage.id,
+        ActiveMortgage.application_id,
+        ActiveMortgage.borrower_id,
+        ActiveMortgage.lender_id,
+        ActiveMortgage.principal_amount,
+        ActiveMortgage.interest_rate,
+        ActiveMortgage.repayment_term,
+        ActiveMortgage.remaining_balance,
+        ActiveMortgage.next_payment_due,
+        ActiveMortgage.status,
+        ActiveMortgage.created_at
+    )
+    if lender_id is not None:
+        stmt = stmt.where(ActiveMortgage.lender_id == lender_id)
+    if start:
+        stmt = stmt.where(ActiveMortgage.created_at >= start)
+    if end:
+        # Inclusive end date for a DateTime column
+        stmt = stmt.where(ActiveMortgage.created_at < datetime.combine(end, datetime.max.time()))
+    if status:
+        stmt = stmt.where(ActiveMortgage.status == MortgageStatus(status))
+    return stmt.order_by(ActiveMortgage.id)
+
+
+def _payment_schedules_statement(lender_id=None, start=None, end=None, status=None):
+    # Hot and archived installments (utils/archive.py), filtered on each side
+    conditions = []
+    if start:
+        conditions.append(lambda table: table.c.payment_date >= start)
+    if end:
+        conditions.append(lambda table: table.c.payment_date <= end)
+    if status:
+        status = PaymentStatus(status)
+        conditions.append(lambda table: table.c.status == status)
+    schedules = schedule_union(*conditions)
+    stmt = select(
+        schedules.c.id,
+        schedules.c.mortgage_id,
+        ActiveMortgage.lender_id,
+        ActiveMortgage.borrower_id,
+        schedules.c.payment_date,
+        schedules.c.amount_due,
+        schedules.c.amount_paid,
+        schedules.c.status,
+        schedules.c.receipt_url,
+        schedules.c.created_at
+    ).join(ActiveMortgage, ActiveMortgage.id == schedules.c.mortgage_id)
+    if lender_id is not None:
+        stmt = stmt.where(ActiveMortgage.lender_id == lender_id)
+    return stmt.order_by(schedules.c.id)
+
+
+# Dataset name -> (statement builder, parquet column types)
+DATASETS = {
+    'active-mortgages': (_active_mortgages_statement, [
+        ('id', 'int64'), ('application_id', 'int64'), ('borrower_id', 'int64'),
+        ('lender_id', 'int64'), ('principal_amount', 'float64'),
+        ('interest_rate', 'float64'), ('repayment_term', 'int64'),
+        ('remaining_balance', 'float64'), ('next_payment_due', 'date32'),
+        ('status', 'string'), ('created_at', 'timestamp')
+    ]),
+    'payment-schedules': (_payment_schedules_statement, [
+        ('id', 'int64'), ('mortgage_id', 'int64'), ('lender_id', 'int64'),
+        ('borrower_id', 'int64'), ('payment_date', 'date32'),
+        ('amount_due', 'float64'), ('amount_paid', 'float64'),
+        ('status', 'string'), ('receipt_url', 'string'), ('created_at', 'timestamp')
+    ])
+}
+
+
+def build_export_statement(dataset, lender_id=None, start=None, end=None, status=None):
+    """Validate filters and return (statement, column spec) for a dataset
+
+    Raises ValueError for an unknown dataset, malformed date or status.
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f'Unknown dataset: {dataset}')
+    builder, columns = DATASETS[dataset]
+    start = _parse_date(start, 'start') if isinstance(start, str) else start
+    end = _parse_date(end, 'end') if isinstance(end, str) else end
+    try:
+        stmt = builder(lender_id=lender_id, start=start, end=end, status=status)
+    except ValueError:
+        raise ValueError(f'Invalid status: {status}')
+    return stmt, columns
+
+
+def _iter_partitions(stmt, batch_size=None):
+    """Yield lists of rows from a server-side cursor"""
+    batch_size = batch_size or Config.EXPORT_BATCH_SIZE
+    result = db.session.execute(
+        stmt.execution_options(stream_results=True, yield_per=batch_size)
+    )
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+
+def _plain(value):
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _csv_value(value):
+    value = _plain(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(partitions, columns):
+    """Yield CSV text, one chunk per cursor partition"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in columns])
+    for partition in partitions:
+        for row in partition:
+            writer.writerow([_csv_value(value) for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to the caller"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_schema(columns):
+    types = {
+        'int64': pa.int64(),
+        'float64': pa.float64(),
+        'string': pa.string(),
+        'date32': pa.date32(),
+        'timestamp': pa.timestamp('us')
+    }
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+
+def iter_parquet(partitions, columns):
+    """Yield Parquet bytes, one row group per cursor partition"""
+    if pa is None:
+        raise RuntimeError('Parquet export requires pyarrow')
+    schema = _parquet_schema(columns)
+    names = [name for name, _ in columns]
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for partition in partitions:
+            arrays = [[_plain(row[i]) for row in partition] for i in range(len(names))]
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(arrays, schema)],
+                schema=schema
+            ))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def iter_export(dataset, export_format='csv', batch_size=None, **filters):
+    """Return an iterator of encoded chunks for a dataset export
+
+    Executes the query and fetches its first partition before returning, so
+    database errors are raised here rather than by the iterator.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Unsupported format: {export_format}')
+    stmt, columns = build_export_statement(dataset, **filters)
+    if export_format == 'parquet' and pa is None:
+        raise ValueError('Parquet export is not available (pyarrow is not installed)')
+    partitions = _iter_partitions(stmt, batch_size)
+    first = next(partitions, None)
+    if first is not None:
+        partitions = itertools.chain((first,), partitions)
+    if export_format == 'parquet':
+        return iter_parquet(partitions, columns)
+    return iter_csv(partitions, columns)
@@ -0,0 +1,212 @@
+# NetLend Backend - Listing Facet Counts
+# Counts per county, property type, bedroom count and price band for the
+# browse sidebar, computed from ONE grouped query over the four facet columns.
+# Facets are disjunctive: each facet's counts apply every filter except its
+# own, so picking "Nairobi" still shows how many listings the other counties
+# have. The grouped rows are small (distinct facet combinations, not listings),
+# so that per-facet roll-up is done in Python.
+#
+# Results are cached per filter set under a version number that is bumped
+# after any committed listing change. With Redis, the version and the cached
+# payloads are shared by every worker. Without it, each worker keeps its own,
+# and changes made by other workers show up once FACETS_CACHE_TTL expires.
+
+import hashlib
+import json
+
+from flask import current_app, has_app_context
+from sqlalchemy import case, event, func, select
+from sqlalchemy.orm import Session
+
+from app import db
+from models import KenyanCounty, ListingStatus, MortgageListing, PropertyType
+from utils.cache import TTLCache
+from utils.redis_client import get_redis, mark_redis_failed
+
+# (key, label, lower bound inclusive, upper bound exclusive) in KSH
+PRICE_BANDS = (
+    ('under-2m', 'Under KSH 2M', None, 2_000_000),
+    ('2m-5m', 'KSH 2M - 5M', 2_000_000, 5_000_000),
+    ('5m-10m', 'KSH 5M - 10M', 5_000_000, 10_000_000),
+    ('10m-20m', 'KSH 10M - 20M', 10_000_000, 20_000_000),
+    ('20m-plus', 'KSH 20M and above', 20_000_000, None)
+)
+FACETS = ('county', 'propertyType', 'bedrooms', 'priceBand')
+
+VERSION_KEY = 'netlend:facets:version'
+PAYLOAD_KEY = 'netlend:facets:{}:{}'
+
+_local_cache = TTLCache('listing_facets', maxsize=512)
+_local_version = 0
+
+
+def price_band_expression():
+    """SQL CASE mapping price_range to its PRICE_BANDS index"""
+    whens = [(MortgageListing.price_range < upper, i) for i, (_, _, _, upper) in enumerate(PRICE_BANDS) if upper]
+    return case(*whens, else_=len(PRICE_BANDS) - 1)
+
+
+def parse_filters(args):
+    """Canonical filter dict from request args; raises ValueError on bad values
+
+    county, property_type, bedrooms and price_band may repeat (OR within a
+    facet, AND across facets).
+    """
+    bands = {key: i for i, (key, _, _, _) in enumerate(PRICE_BANDS)}
+    for value in args.getlist('price_band'):
+        if value not in bands:
+            raise ValueError(f"'{value}' is not a valid price band")
+    for value in args.getlist('bedrooms'):
+        if not value.isdigit():
+            raise ValueError(f"'{value}' is not a valid bedroom count")
+    filters = {
+        'county': sorted({KenyanCounty(value).name for value in args.getlist('county')}),
+        'propertyType': sorted({PropertyType(value.lower()).name for value in args.getlist('property_type')}),
+        'bedrooms': sorted({int(value) for value in args.getlist('bedrooms')}),
+        'priceBand': sorted({bands[value] for value in args.getlist('price_band')}),
+        'status': ListingStatus(args.get('status', 'active').lower()).name,
+        'q': ' '.join((args.get('q') or '').split()).lower() or None
+    }
+    max_payment = args.get('max_monthly_payment')
+    filters['maxMonthlyPayment'] = float(max_payment) if max_payment else None
+    return filters
+
+
+def _base_query(filters):
+    band = price_band_expression().label('band')
+    query = select(
+        MortgageListing.county, MortgageListing.property_type, MortgageListing.bedrooms, band, func.count()
+    ).where(MortgageListing.status == ListingStatus[filters['status']])
+    if filters['maxMonthlyPayment'] is not None:
+        query = query.where(MortgageListing.monthly_payment <= filters['maxMonthlyPayment'])
+    if filters['q']:
+        from utils.search import search_listings, search_terms
+        terms = search_terms(filters['q'])
+        if terms:
+            matches, _ = search_listings(terms)
+            query = query.where(MortgageListing.id.in_(matches.with_entities(MortgageListing.id).statement))
+    return query.group_by(MortgageListing.county, MortgageListing.property_type, MortgageListing.bedrooms, band)
+
+
+def compute_facets(filters):
+    """Run the grouped query and roll it up into per-facet counts"""
+    rows = []
+    for county, property_type, bedrooms, band, count in db.session.execute(_base_query(filters)):
+        rows.append(({
+            'county': county.name,
+            'propertyType': property_type.name,
+            'bedrooms': bedrooms,
+            'priceBand': int(band)
+        }, count))
+
+    def matches(values, skip=None):
+        return all(not filters[f] or values[f] in filters[f] for f in FACETS if f != skip)
+
+    counts = {facet: {} for facet in FACETS}
+    for values, count in rows:
+        for facet in FACETS:
+            if matches(values, skip=facet):
+                counts[facet][values[facet]] = counts[facet].get(values[facet], 0) + count
+
+    def ranked(facet, label):
+        items = [{'value': label(value), 'count': count} for value, count in counts[facet].items()]
+        return sorted(items, key=lambda item: (-item['count'], str(item['value'])))
+
+    return {
+        'total': sum(count for values, count in rows if matches(values)),
+        'facets': {
+            'county': ranked('county', lambda name: KenyanCounty[name].value),
+            'propertyType': ranked('propertyType', lambda name: PropertyType[name].value),
+            'bedrooms': sorted(
+                ({'value': value, 'count': count} for value, count in counts['bedrooms'].items()),
+                key=lambda item: item['value']
+            ),
+            'priceBand': [
+                {'value': key, 'label': label, 'min': lower, 'max': upper, 'count': counts['priceBand'].get(i, 0)}
+                for i, (key, label, lower, upper) in enumerate(PRICE_BANDS)
+            ]
+        }
+    }
+
+
+# Versioned cache -------------------------------------------------------------
+
+def current_version():
+    client = get_redis()
+    if client is not None:
+        try:
+            return f"r{int(client.get(VERSION_KEY) or 0)}"
+        except Exception as e:
+            current_app.logger.warning(f"Redis facet version lookup failed: {e}")
+            mark_redis_failed()
+    return f'l{_local_version}'
+
+
+def invalidate_facets():
+    """Retire every cached facet payload (listing data changed)"""
+    global _local_version
+    _local_version += 1
+    _local_cache.clear()
+    client = get_redis()
+    if client is not None:
+        try:
+            client.incr(VERSION_KEY)
+        except Exception as e:
+            current_app.logger.warning(f"Redis facet invalidation failed, cleared this worker only: {e}")
+            mark_redis_failed()
+
+
+def get_facets(filters):
+    """Facet counts for ``filters``, from cache when the listings are unchanged"""
+    digest = hashlib.sha1(json.dumps(filters, sort_keys=True).encode()).hexdigest()
+    version = current_version()
+    key = PAYLOAD_KEY.format(version, digest)
+    ttl = current_app.config['FACETS_CACHE_TTL']
+
+    result = _local_cache.get(key)
+    if result is not None:
+        return result
+    client = get_redis()
+    if client is not None:
+        try:
+            cached = client.get(key)
+        except Exception as e:
+            current_app.logger.warning(f"Redis facet lookup failed: {e}")
+            mark_redis_failed()
+        else:
+            if cached:
+                result = json.loads(cached)
+                _local_cache.set(key, result, ttl=ttl)
+                return result
+
+    result = compute_facets(filters)
+    _local_cache.set(key, result, ttl=ttl)
+    if client is not None:
+        try:
+            client.set(key, json.dumps(result), ex=ttl)
+        except Exception as e:
+            current_app.logger.warning(f"Redis facet write failed: {e}")
+            mark_redis_failed()
+    return result
+
+
+# Invalidate on commit, so a rolled-back edit keeps the cache
+
+@event.listens_for(Session, 'after_flush')
+def _note_listing_changes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, MortgageListing) and (obj not in session.dirty or session.is_modified(obj)):
+            session.info['facets_stale'] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    if session.info.pop('facets_stale', False) and has_app_context():
+        invalidate_facets()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_stale(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop('facets_stale', None)
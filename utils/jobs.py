@@ -0,0 +1,202 @@
+# NetLend Backend - Background Jobs
+# Admin tasks too slow for a request (risk simulations, batch runs) are
+# recorded in background_jobs and run on a small per-process thread pool:
+#   POST  -> submit_job() commits a 'queued' row and returns it at once (202)
+#   pool  -> run_job() marks it 'running', calls the registered handler with
+#            the stored params and stores its JSON result, or the error
+#   GET   -> clients poll the row by id
+#
+# The pool has JOB_WORKERS threads and accepts at most JOB_QUEUE_LIMIT jobs
+# queued or running per process; beyond that submit_job raises JobQueueFull.
+# The depth is exported as netlend_background_queue_depth{queue="jobs"}.
+# Handlers that need CPU parallelism start their own process pool (see
+# utils/risk.py); the thread only waits on it.
+#
+# Each job row holds a lease (heartbeat_at). A heartbeat thread in every
+# process renews the lease of the jobs queued or running there, every quarter
+# of JOB_LEASE_SECONDS, and fails the rows whose lease has run out. Those
+# belong to a process that died or was recycled (max_requests) on any host.
+# Live jobs elsewhere keep renewing, so they are left alone.
+#
+# With JOBS_ASYNC off (tests, scripts) jobs run inline in submit_job.
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import or_
+
+from app import db
+from models import BackgroundJob
+from utils.metrics import set_queue_depth
+
+QUEUE_NAME = 'jobs'
+ACTIVE_STATUSES = ('queued', 'running')
+
+_handlers = {}
+_executor = None
+_depth = 0
+_lock = threading.Lock()
+_live = set()  # ids of jobs queued or running in this process
+_heartbeat = None
+
+
+class JobQueueFull(Exception):
+    """Raised when JOB_QUEUE_LIMIT jobs are already queued or running"""
+
+
+def job_handler(kind):
+    """Register ``func(params) -> JSON-serializable result`` for jobs of ``kind``"""
+    def register(func):
+        _handlers[kind] = func
+        return func
+    return register
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=current_app.config['JOB_WORKERS'], thread_name_prefix='background-job'
+        )
+    return _executor
+
+
+def _adjust_depth(delta):
+    global _depth
+    with _lock:
+        _depth += delta
+        set_queue_depth(QUEUE_NAME, _depth)
+        return _depth
+
+
+def run_job(app, job_id):
+    """Execute a queued job inside an app context; never raises"""
+    with app.app_context():
+        job = db.session.get(BackgroundJob, job_id)
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        db.session.commit()
+        try:
+            job.result = _handlers[job.kind](job.params or {})
+            job.status = 'succeeded'
+        except Exception as e:
+            app.logger.exception(f'Background job {job_id} ({job.kind}) failed')
+            db.session.rollback()
+            job = db.session.get(BackgroundJob, job_id)
+            job.status = 'failed'
+            job.error = str(e)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        db.session.remove()
+
+
+def _run_and_release(app, job_id):
+    try:
+        run_job(app, job_id)
+    finally:
+        with _lock:
+            _live.discard(job_id)
+        _adjust_depth(-1)
+
+
+def renew_leases():
+    """Push heartbeat_at forward for the jobs queued or running in this process"""
+    with _lock:
+        job_ids = list(_live)
+    if job_ids:
+        BackgroundJob.query.filter(
+            BackgroundJob.id.in_(job_ids), BackgroundJob.status.in_(ACTIVE_STATUSES)
+        ).update({'heartbeat_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+
+
+def _heartbeat_loop(app):
+    interval = max(1, app.config['JOB_LEASE_SECONDS'] / 4)
+    while True:
+        time.sleep(interval)
+        try:
+            with app.app_context():
+                renew_leases()
+                fail_orphaned_jobs()
+                db.session.remove()
+        except Exception:
+            app.logger.exception('Background job heartbeat failed')
+
+
+def start_heartbeat(app):
+    """Start this process's lease thread (once; call after forking)"""
+    global _heartbeat
+    with _lock:
+        if _heartbeat is None or not _heartbeat.is_alive():
+            _heartbeat = threading.Thread(
+                target=_heartbeat_loop, args=(app,), name='background-job-heartbeat', daemon=True
+            )
+            _heartbeat.start()
+
+
+def submit_job(kind, params=None, created_by=None):
+    """Record a job and hand it to the pool; returns the BackgroundJob
+
+    Raises KeyError for an unknown kind and JobQueueFull when the pool is saturated.
+    """
+    if kind not in _handlers:
+        raise KeyError(f"Unknown job kind '{kind}'")
+    limit = current_app.config['JOB_QUEUE_LIMIT']
+    if _adjust_depth(1) > limit:
+        _adjust_depth(-1)
+        raise JobQueueFull(f'{limit} background jobs are already queued or running, try again later')
+
+    try:
+        job = BackgroundJob(kind=kind, status='queued', params=params or {}, created_by=created_by)
+        db.session.add(job)
+        db.session.commit()
+    except Exception:
+        _adjust_depth(-1)
+        raise
+
+    app = current_app._get_current_object()
+    with _lock:
+        _live.add(job.id)
+    start_heartbeat(app)
+    if app.config['JOBS_ASYNC']:
+        _get_executor().submit(_run_and_release, app, job.id)
+    else:
+        _run_and_release(app, job.id)
+        db.session.refresh(job)
+    return job
+
+
+def fail_orphaned_jobs():
+    """Mark queued/running jobs whose lease ran out as failed; returns the count"""
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['JOB_LEASE_SECONDS'])
+    count = BackgroundJob.query.filter(
+        BackgroundJob.status.in_(ACTIVE_STATUSES),
+        or_(BackgroundJob.heartbeat_at.is_(None), BackgroundJob.heartbeat_at < cutoff)
+    ).update(
+        {'status': 'failed', 'error': 'Interrupted: the process running it stopped', 'finished_at': datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return count
+
+
+def job_summary(job, include_result=True):
+    summary = {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'params': job.params,
+        'createdBy': job.created_by,
+        'createdAt': job.created_at.isoformat() if job.created_at else None,
+        'startedAt': job.started_at.isoformat() if job.started_at else None,
+        'finishedAt': job.finished_at.isoformat() if job.finished_at else None,
+        'durationSeconds': round((job.finished_at - job.started_at).total_seconds(), 3)
+            if job.finished_at and job.started_at else None,
+        'error': job.error
+    }
+    if include_result:
+        summary['result'] = job.result
+    return summary
@@ -0,0 +1,459 @@
+# NetLend Backend - Buyer-to-Listing Match Index
+# Precomputes how well every active listing fits every buyer and keeps each
+# buyer's top MATCH_TOP_K listings in `listing_matches`, so recommendations are
+# one indexed range read on (buyer_id, score) instead of scoring the catalogue
+# per request.
+#
+# A match score (0-100) has two groups of factors, each factor scored 0-1:
+# - affordability: payment-to-income, loan size vs desired loan, down payment
+# - preference: target county, preferred property type, price vs target value
+# Profile fields a buyer has not filled in score a neutral 0.5.
+#
+# Scoring is vectorised with numpy: buyers x listings in one broadcast pass.
+# The index is kept current incrementally. Profile or listing changes are
+# collected per flush and applied after commit, on a single background worker
+# (MATCH_INDEX_ASYNC) or inline:
+# - a buyer change re-ranks that buyer against all active listings
+# - a listing change scores that one listing against every buyer and
+#   inserts it only where it beats the buyer's current K-th match
+# Every gunicorn worker has its own refresh worker, so two processes can write
+# the same (buyer, listing) pair at once; match rows are upserted on that key
+# instead of failing the whole refresh on the unique constraint.
+# rebuild_match_index.py recomputes everything (first deploy, weight changes).
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from flask import current_app, has_app_context
+from sqlalchemy import delete, event, func, insert, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app import db
+from models import Buyer, Lender, ListingMatch, ListingStatus, MortgageListing, KenyanCounty, PropertyType
+
+MATCH_WEIGHTS = {
+    'affordability': 35,
+    'loanFit': 10,
+    'downPayment': 10,
+    'county': 20,
+    'propertyType': 10,
+    'price': 15
+}
+AFFORDABILITY_FACTORS = ('affordability', 'loanFit', 'downPayment')
+PREFERENCE_FACTORS = ('county', 'propertyType', 'price')
+
+COMFORTABLE_PAYMENT_TO_INCOME = 0.30  # full affordability points at or below
+MAX_PAYMENT_TO_INCOME = 0.50  # no affordability points at or above
+LOAN_OVERSHOOT_LIMIT = 0.50  # loan 50% over the desired amount scores 0
+NEUTRAL = 0.5
+
+BUYER_MATCH_INPUTS = (
+    'monthly_net_income', 'desired_loan_amount', 'down_payment_amount',
+    'estimated_property_value', 'target_county', 'preferred_property_type'
+)
+LISTING_MATCH_INPUTS = (
+    'price_range', 'down_payment', 'interest_rate', 'repayment_period', 'monthly_payment',
+    'county', 'property_type', 'status'
+)
+
+_matches = ListingMatch.__table__
+_buyers = Buyer.__table__
+_listings = MortgageListing.__table__
+
+_COUNTY_CODES = {county.name: i for i, county in enumerate(KenyanCounty)}
+_PROPERTY_TYPE_CODES = {property_type.name: i for i, property_type in enumerate(PropertyType)}
+
+
+def _code(value, codes):
+    if value is None:
+        return -1
+    return codes.get(getattr(value, 'name', value), -1)
+
+
+def _floats(rows, field):
+    return np.array([np.nan if row[field] is None else float(row[field]) for row in rows], dtype=np.float64)
+
+
+def _codes(rows, field, codes):
+    return np.array([_code(row[field], codes) for row in rows], dtype=np.int64)
+
+
+def buyer_snapshot(rows):
+    """Columnar arrays for buyer rows (NULL numbers as NaN, enums as codes, -1 for NULL)"""
+    return {
+        'id': np.array([row['id'] for row in rows], dtype=np.int64),
+        'income': _floats(rows, 'monthly_net_income'),
+        'desired_loan': _floats(rows, 'desired_loan_amount'),
+        'down_payment': _floats(rows, 'down_payment_amount'),
+        'target_value': _floats(rows, 'estimated_property_value'),
+        'county': _codes(rows, 'target_county', _COUNTY_CODES),
+        'property_type': _codes(rows, 'preferred_property_type', _PROPERTY_TYPE_CODES)
+    }
+
+
+def listing_snapshot(rows):
+    """Columnar arrays for listing rows"""
+    price = _floats(rows, 'price_range')
+    down_payment = _floats(rows, 'down_payment')
+    return {
+        'id': np.array([row['id'] for row in rows], dtype=np.int64),
+        'price': price,
+        'loan': price - down_payment,
+        'down_payment': down_payment,
+        'monthly_payment': _floats(rows, 'monthly_payment'),
+        'county': _codes(rows, 'county', _COUNTY_CODES),
+        'property_type': _codes(rows, 'property_type', _PROPERTY_TYPE_CODES)
+    }
+
+
+def _known(values):
+    return ~np.isnan(values) & (values > 0)
+
+
+def _category_fit(wanted, offered):
+    return np.where(wanted[:, None] < 0, NEUTRAL, (wanted[:, None] == offered[None, :]).astype(np.float64))
+
+
+def score_matrix(buyers, listings):
+    """Score every buyer against every listing
+
+    Returns (scores, affordability, preference, payment_to_income), each a
+    buyers x listings float64 array. Scores are 0-100, the two groups 0-1.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        income = buyers['income'][:, None]
+        payment_to_income = listings['monthly_payment'][None, :] / income
+        pti_known = _known(buyers['income'])[:, None] & ~np.isnan(payment_to_income)
+        span = MAX_PAYMENT_TO_INCOME - COMFORTABLE_PAYMENT_TO_INCOME
+        affordability = np.clip((MAX_PAYMENT_TO_INCOME - payment_to_income) / span, 0, 1)
+
+        desired_loan = buyers['desired_loan'][:, None]
+        overshoot = (listings['loan'][None, :] - desired_loan) / desired_loan
+        loan_fit = np.clip(1 - overshoot / LOAN_OVERSHOOT_LIMIT, 0, 1)
+
+        savings = buyers['down_payment'][:, None]
+        required = listings['down_payment'][None, :]
+        down_payment_fit = np.where(required > 0, np.clip(savings / required, 0, 1), 1.0)
+
+        target_value = buyers['target_value'][:, None]
+        price_fit = np.clip(1 - np.abs(listings['price'][None, :] - target_value) / target_value, 0, 1)
+
+    factors = {
+        'affordability': np.where(pti_known, affordability, NEUTRAL),
+        'loanFit': np.where(_known(buyers['desired_loan'])[:, None], loan_fit, NEUTRAL),
+        'downPayment': np.where(_known(buyers['down_payment'])[:, None], down_payment_fit, NEUTRAL),
+        'county': _category_fit(buyers['county'], listings['county']),
+        'propertyType': _category_fit(buyers['property_type'], listings['property_type']),
+        'price': np.where(_known(buyers['target_value'])[:, None], price_fit, NEUTRAL)
+    }
+    for name, values in factors.items():
+        factors[name] = np.nan_to_num(values, nan=NEUTRAL)
+
+    def group(names):
+        return sum(factors[n] * MATCH_WEIGHTS[n] for n in names) / sum(MATCH_WEIGHTS[n] for n in names)
+
+    scores = sum(factors[name] * weight for name, weight in MATCH_WEIGHTS.items()) * 100 / sum(MATCH_WEIGHTS.values())
+    payment_to_income = np.where(pti_known, payment_to_income, np.nan)
+    return scores, group(AFFORDABILITY_FACTORS), group(PREFERENCE_FACTORS), payment_to_income
+
+
+def top_matches(buyers, listings, top_k):
+    """Rows for the listing_matches table: each buyer's best ``top_k`` listings"""
+    if not len(buyers['id']) or not len(listings['id']):
+        return []
+    scores, affordability, preference, payment_to_income = score_matrix(buyers, listings)
+    computed_at = datetime.utcnow()
+    k = min(top_k, scores.shape[1])
+    # argpartition finds each row's k best in O(L); only those k get sorted
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < scores.shape[1] else \
+        np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+
+    rows = []
+    for b, buyer_id in enumerate(buyers['id']):
+        picked = candidates[b]
+        # Highest score first, lowest listing id on ties - same order as reads
+        picked = picked[np.lexsort((listings['id'][picked], -scores[b, picked]))]
+        for l in picked:
+            pti = payment_to_income[b, l]
+            rows.append({
+                'buyer_id': int(buyer_id),
+                'listing_id': int(listings['id'][l]),
+                'score': round(float(scores[b, l]), 2),
+                'affordability': round(float(affordability[b, l]), 4),
+                'preference': round(float(preference[b, l]), 4),
+                'payment_to_income': None if np.isnan(pti) else round(float(pti), 4),
+                'computed_at': computed_at
+            })
+    return rows
+
+
+def _buyer_columns():
+    return [_buyers.c.id] + [_buyers.c[field] for field in BUYER_MATCH_INPUTS]
+
+
+def _active_listing_columns():
+    return [_listings.c[field] for field in
+            ('id', 'price_range', 'down_payment', 'monthly_payment', 'county', 'property_type')]
+
+
+def load_active_listings(connection):
+    rows = connection.execute(
+        select(*_active_listing_columns()).where(_listings.c.status == ListingStatus.ACTIVE)
+        .order_by(_listings.c.id)
+    ).mappings().all()
+    return listing_snapshot(rows)
+
+
+def _write_matches(connection, matches):
+    """INSERT match rows, updating any (buyer_id, listing_id) pair already indexed"""
+    dialects = {'postgresql': postgresql, 'sqlite': sqlite}
+    dialect = dialects.get(connection.dialect.name)
+    if dialect is None:
+        connection.execute(insert(_matches), matches)
+        return
+    statement = dialect.insert(_matches)
+    statement = statement.on_conflict_do_update(
+        index_elements=['buyer_id', 'listing_id'],
+        set_={column: statement.excluded[column] for column in
+              ('score', 'affordability', 'preference', 'payment_to_income', 'computed_at')}
+    )
+    connection.execute(statement, matches)
+
+
+def refresh_buyers(connection, buyer_ids, listings=None, top_k=None):
+    """Replace the index rows of ``buyer_ids`` with their current top-K; returns rows written"""
+    buyer_ids = sorted(set(buyer_ids))
+    if not buyer_ids:
+        return 0
+    top_k = top_k or current_app.config['MATCH_TOP_K']
+    if listings is None:
+        listings = load_active_listings(connection)
+    rows = connection.execute(
+        select(*_buyer_columns()).where(_buyers.c.id.in_(buyer_ids))
+    ).mappings().all()
+    matches = top_matches(buyer_snapshot(rows), listings, top_k)
+
+    connection.execute(delete(_matches).where(_matches.c.buyer_id.in_(buyer_ids)))
+    if matches:
+        _write_matches(connection, matches)
+    return len(matches)
+
+
+def refresh_listing(connection, listing_id, chunk_size=None, top_k=None):
+    """Re-rank one listing against every buyer; returns buyers touched
+
+    The listing is inserted wherever it beats a buyer's current K-th match and
+    the displaced row is trimmed. Buyers whose score for it dropped, or who
+    lose it because it is no longer active, are re-ranked in full so their
+    K-th slot is backfilled from the rest of the catalogue.
+    """
+    top_k = top_k or current_app.config['MATCH_TOP_K']
+    chunk_size = chunk_size or current_app.config['MATCH_REBUILD_CHUNK_SIZE']
+    previous = dict(connection.execute(
+        select(_matches.c.buyer_id, _matches.c.score).where(_matches.c.listing_id == listing_id)
+    ).all())
+    connection.execute(delete(_matches).where(_matches.c.listing_id == listing_id))
+
+    row = connection.execute(
+        select(*_active_listing_columns()).where(
+            _listings.c.id == listing_id, _listings.c.status == ListingStatus.ACTIVE
+        )
+    ).mappings().first()
+    if row is None:
+        refresh_buyers(connection, previous, top_k=top_k)
+        return len(previous)
+
+    listing = listing_snapshot([row])
+    backfill = set()
+    touched = 0
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select(*_buyer_columns()).where(_buyers.c.id > last_id).order_by(_buyers.c.id).limit(chunk_size)
+        ).mappings().all()
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        stats = {buyer_id: (count, lowest) for buyer_id, count, lowest in connection.execute(
+            select(_matches.c.buyer_id, func.count(), func.min(_matches.c.score))
+            .where(_matches.c.buyer_id.in_([r['id'] for r in rows])).group_by(_matches.c.buyer_id)
+        )}
+
+        inserts, full = [], []
+        for match in top_matches(buyer_snapshot(rows), listing, 1):
+            buyer_id = match['buyer_id']
+            count, lowest = stats.get(buyer_id, (0, None))
+            if buyer_id in previous and match['score'] < previous[buyer_id] and count >= top_k - 1:
+                backfill.add(buyer_id)  # may have fallen behind a listing outside the top K
+            elif count < top_k or match['score'] > lowest:
+                inserts.append(match)
+                if count >= top_k:
+                    full.append(buyer_id)
+        if inserts:
+            _write_matches(connection, inserts)
+        if full:
+            _trim(connection, full, top_k)
+        touched += len(inserts)
+
+    if backfill:
+        refresh_buyers(connection, backfill, top_k=top_k)
+    return touched + len(backfill)
+
+
+def _trim(connection, buyer_ids, top_k):
+    """Drop rows ranked below the top K for ``buyer_ids``"""
+    ranked = select(
+        _matches.c.id,
+        func.row_number().over(
+            partition_by=_matches.c.buyer_id,
+            order_by=(_matches.c.score.desc(), _matches.c.listing_id)
+        ).label('rank')
+    ).where(_matches.c.buyer_id.in_(buyer_ids)).subquery()
+    connection.execute(
+        delete(_matches).where(_matches.c.id.in_(select(ranked.c.id).where(ranked.c.rank > top_k)))
+    )
+
+
+def rebuild_index(engine, chunk_size=500, top_k=None):
+    """Recompute every buyer's matches in keyset-paged chunks; returns totals"""
+    totals = {'buyers': 0, 'matches': 0}
+    with engine.connect() as connection:
+        listings = load_active_listings(connection)
+        totals['listings'] = len(listings['id'])
+        last_id = 0
+        while True:
+            buyer_ids = connection.execute(
+                select(_buyers.c.id).where(_buyers.c.id > last_id).order_by(_buyers.c.id).limit(chunk_size)
+            ).scalars().all()
+            if not buyer_ids:
+                break
+            totals['matches'] += refresh_buyers(connection, buyer_ids, listings, top_k)
+            connection.commit()
+            totals['buyers'] += len(buyer_ids)
+            last_id = buyer_ids[-1]
+        # Buyers removed since the last rebuild
+        connection.execute(delete(_matches).where(~_matches.c.buyer_id.in_(select(_buyers.c.id))))
+        connection.commit()
+    return totals
+
+
+def recommendations_for(buyer_id, limit):
+    """(ListingMatch-like rows, listing) pairs for a buyer, best first
+
+    Reads the index. A buyer who has not been indexed yet is ranked on the fly
+    and queued for indexing, so the first read does not wait on the write.
+    """
+    matches = db.session.query(ListingMatch, MortgageListing, Lender.institution_name).join(
+        MortgageListing, ListingMatch.listing_id == MortgageListing.id
+    ).join(Lender, MortgageListing.lender_id == Lender.id).filter(
+        ListingMatch.buyer_id == buyer_id,
+        MortgageListing.status == ListingStatus.ACTIVE
+    ).order_by(ListingMatch.score.desc(), ListingMatch.listing_id).limit(limit).all()
+    if matches:
+        return [(match, listing, lender_name) for match, listing, lender_name in matches]
+
+    connection = db.session.connection()
+    listings = load_active_listings(connection)
+    buyer = connection.execute(select(*_buyer_columns()).where(_buyers.c.id == buyer_id)).mappings().all()
+    if not buyer or not len(listings['id']):
+        return []
+    ranked = top_matches(buyer_snapshot(buyer), listings, current_app.config['MATCH_TOP_K'])
+    _schedule(current_app._get_current_object(), set(), {buyer_id})
+
+    ranked = ranked[:limit]
+    lookup = {listing.id: (listing, lender_name) for listing, lender_name in
+              db.session.query(MortgageListing, Lender.institution_name)
+              .join(Lender, MortgageListing.lender_id == Lender.id)
+              .filter(MortgageListing.id.in_([row['listing_id'] for row in ranked]))}
+    return [(ListingMatch(**row), *lookup[row['listing_id']]) for row in ranked if row['listing_id'] in lookup]
+
+
+# Incremental maintenance ----------------------------------------------------
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # One worker: this process applies its refreshes in commit order
+        # (other workers' refreshes can still race; see _write_matches)
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='match-index')
+    return _executor
+
+
+def apply_changes(app, listing_ids, buyer_ids):
+    with app.app_context():
+        try:
+            with db.engine.begin() as connection:
+                for listing_id in sorted(listing_ids):
+                    refresh_listing(connection, listing_id)
+                refresh_buyers(connection, buyer_ids)
+        except Exception:
+            app.logger.exception('Match index refresh failed (listings %s, buyers %s) - '
+                                 'run rebuild_match_index.py', sorted(listing_ids), sorted(buyer_ids))
+
+
+def _schedule(app, listing_ids, buyer_ids):
+    if not (listing_ids or buyer_ids):
+        return
+    if app.config['MATCH_INDEX_ASYNC']:
+        _get_executor().submit(apply_changes, app, set(listing_ids), set(buyer_ids))
+    else:
+        apply_changes(app, listing_ids, buyer_ids)
+
+
+def _pending(session):
+    return session.info.setdefault('match_index', {'listings': set(), 'buyers': set()})
+
+
+def _changed(obj, fields):
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    pending = None
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Buyer) and (obj in session.new or _changed(obj, BUYER_MATCH_INPUTS)):
+            pending = pending or _pending(session)
+            pending['buyers'].add(obj.id)
+        elif isinstance(obj, MortgageListing) and (obj in session.new or _changed(obj, LISTING_MATCH_INPUTS)):
+            pending = pending or _pending(session)
+            pending['listings'].add(obj.id)
+
+
+@event.listens_for(MortgageListing, 'before_delete')
+def _listing_deleted(mapper, connection, target):
+    affected = connection.execute(
+        select(_matches.c.buyer_id).where(_matches.c.listing_id == target.id)
+    ).scalars().all()
+    connection.execute(delete(_matches).where(_matches.c.listing_id == target.id))
+    session = Session.object_session(target)
+    if session is not None and affected:
+        _pending(session)['buyers'].update(affected)
+
+
+@event.listens_for(Buyer, 'before_delete')
+def _buyer_deleted(mapper, connection, target):
+    connection.execute(delete(_matches).where(_matches.c.buyer_id == target.id))
+    session = Session.object_session(target)
+    if session is not None:
+        _pending(session)['buyers'].discard(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_after_commit(session):
+    pending = session.info.pop('match_index', None)
+    if not pending or not has_app_context():
+        return
+    _schedule(current_app._get_current_object(), pending['listings'], pending['buyers'])
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_on_rollback(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop('match_index', None)
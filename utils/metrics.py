@@ -0,0 +1,132 @@
+# NetLend Backend - Prometheus Metrics
+# Operational metrics exposed at /metrics (separate from the business metrics
+# served by /api/admin/metrics):
+# - Request latency histograms labelled by blueprint and endpoint
+# - DB pool checkout wait time
+# - Cache lookups by result (hit ratio = hits / (hits + misses))
+# - Background queue depth
+# - Login attempts refused by the rate limiter, by bucket (ip / email)
+#
+# Under gunicorn, set PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py does this) so
+# every worker writes its samples to a shared directory and /metrics aggregates
+# them with a MultiProcessCollector.
+
+import os
+import time
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess
+)
+from sqlalchemy.pool import QueuePool
+
+REQUEST_LATENCY = Histogram(
+    'netlend_request_duration_seconds',
+    'HTTP request latency',
+    ['blueprint', 'endpoint', 'method']
+)
+REQUEST_COUNT = Counter(
+    'netlend_requests_total',
+    'HTTP requests by response status',
+    ['blueprint', 'endpoint', 'method', 'status']
+)
+DB_POOL_CHECKOUT = Histogram(
+    'netlend_db_pool_checkout_seconds',
+    'Time spent waiting for a pooled database connection',
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+CACHE_REQUESTS = Counter(
+    'netlend_cache_requests_total',
+    'Cache lookups by result',
+    ['cache', 'result']
+)
+BACKGROUND_QUEUE_DEPTH = Gauge(
+    'netlend_background_queue_depth',
+    'Background jobs queued or running',
+    ['queue'],
+    multiprocess_mode='livesum'
+)
+LOGIN_THROTTLED = Counter(
+    'netlend_login_throttled_total',
+    'Login attempts refused by the rate limiter',
+    ['bucket']
+)
+
+
+def record_cache_hit(cache):
+    CACHE_REQUESTS.labels(cache=cache, result='hit').inc()
+
+
+def record_cache_miss(cache):
+    CACHE_REQUESTS.labels(cache=cache, result='miss').inc()
+
+
+def set_queue_depth(queue, depth):
+    BACKGROUND_QUEUE_DEPTH.labels(queue=queue).set(depth)
+
+
+def record_login_throttled(bucket):
+    LOGIN_THROTTLED.labels(bucket=bucket).inc()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT.observe(time.perf_counter() - started)
+
+
+def _registry():
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def init_metrics(app):
+    """Register request timing hooks and the /metrics route
+
+    Must run before db.init_app() so the instrumented pool is picked up.
+    SQLite keeps SQLAlchemy's default pool.
+    """
+    database_uri = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+    if not database_uri.startswith('sqlite'):
+        engine_options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+        engine_options.setdefault('poolclass', InstrumentedQueuePool)
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.get('metrics_started')
+        if started is None:
+            return response
+        labels = {
+            'blueprint': request.blueprint or 'app',
+            'endpoint': request.endpoint or 'unmatched',
+            'method': request.method
+        }
+        REQUEST_COUNT.labels(status=str(response.status_code), **labels).inc()
+
+        # Observe on close so streamed bodies are included in the latency
+        def observe_latency():
+            REQUEST_LATENCY.labels(**labels).observe(time.perf_counter() - started)
+
+        response.call_on_close(observe_latency)
+        return response
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        """Prometheus exposition endpoint"""
+        token = app.config.get('METRICS_TOKEN')
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+        return Response(generate_latest(_registry()), mimetype=CONTENT_TYPE_LATEST)
@@ -0,0 +1,89 @@
+# NetLend Backend - Password Hashing
+# set_password / check_password on User, Buyer, Admin and Lender go through
+# here so the hash cost is set per environment instead of by werkzeug's
+# defaults:
+# - PASSWORD_HASH_METHOD is a werkzeug method string ('scrypt:32768:8:1',
+#   'pbkdf2:sha256:600000', ...) and PASSWORD_HASH_SALT_LENGTH its salt size
+# - hashes made with other parameters still verify, and are replaced with the
+#   configured ones on the next successful login (rehash_on_login)
+# - with PASSWORD_HASH_THREADS > 0 hashing runs on a pool of that many threads
+#   per process. That only pays off under a threaded worker class (gthread):
+#   it caps how many hashes run at once, and so the CPU and the scrypt memory
+#   (128 * n * r bytes each) a login burst can take. Under the default sync
+#   workers there is one request per process and hashing stays inline.
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from config import Config
+
+_executor = None
+_executor_size = 0
+_executor_lock = threading.Lock()
+
+
+def _config(name):
+    return current_app.config[name] if has_app_context() else getattr(Config, name)
+
+
+def _run(fn, *args):
+    global _executor, _executor_size
+    threads = _config('PASSWORD_HASH_THREADS')
+    if threads <= 0:
+        return fn(*args)
+    with _executor_lock:
+        if _executor is None or _executor_size != threads:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='password-hash')
+            _executor_size = threads
+    return _executor.submit(fn, *args).result()
+
+
+def hash_password(password):
+    """Hash ``password`` with the configured method and salt length"""
+    return _run(generate_password_hash, password, _config('PASSWORD_HASH_METHOD'),
+                _config('PASSWORD_HASH_SALT_LENGTH'))
+
+
+def verify_password(password_hash, password):
+    """Check ``password`` against a stored hash made with any method"""
+    return _run(check_password_hash, password_hash, password)
+
+
+@lru_cache(maxsize=8)
+def _method_prefix(method):
+    # werkzeug fills in defaults ('scrypt' -> 'scrypt:32768:8:1'); hash once to
+    # learn the full parameter string stored in front of the salt
+    return generate_password_hash('', method=method, salt_length=1).split('$', 1)[0]
+
+
+def needs_rehash(password_hash):
+    """Whether a stored hash was made with other parameters than the configured ones"""
+    method, _, rest = password_hash.partition('$')
+    salt = rest.partition('$')[0]
+    return (method != _method_prefix(_config('PASSWORD_HASH_METHOD'))
+            or len(salt) != _config('PASSWORD_HASH_SALT_LENGTH'))
+
+
+def rehash_on_login(principal, password):
+    """Re-hash a just-verified password when the hash parameters changed
+
+    Commits the new hash. A failed write is logged and rolled back; the login
+    itself still succeeds and the rehash is retried next time.
+    """
+    if not needs_rehash(principal.password_hash):
+        return False
+    from app import db
+    try:
+        principal.set_password(password)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.warning(f"Password rehash failed for {type(principal).__name__} {principal.id}: {e}")
+        return False
+    return True
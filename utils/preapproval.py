@@ -0,0 +1,259 @@
+# NetLend Backend - Pre-Approval Engine
+# Evaluates buyers against lenders' pre-approval criteria (the preapproval_*
+# columns on lenders; NULL falls back to DEFAULT_CRITERIA) as one numpy pass
+# over a (buyers x lenders) grid:
+# - payment capacity = max_dti * monthly net income - existing loan repayments
+# - loan size = the principal that capacity amortizes at the lender's rate over
+#   the buyer's desired period (capped by the lender's maximum term), capped by
+#   the lender's maximum amount and the amount the buyer asked for
+# - eligible when the buyer has income, meets the minimum creditworthiness
+#   score and employment duration, and the loan reaches PREAPPROVAL_MIN_AMOUNT
+# Eligible pairs are written as APPROVED pre_approvals with one executemany
+# INSERT, in the same transaction as the UPDATE that expires the open
+# pre-approvals they replace.
+#
+# A buyer against every lender is small and runs in the request. A lender
+# against every completed buyer profile runs as the 'pre_approvals' background
+# job, in keyset-paged chunks of PREAPPROVAL_BATCH_SIZE buyers.
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import insert, select, update
+
+from app import db
+from models import ApplicationStatus, Buyer, Lender, PreApproval
+from utils.cashflow import annuity_payment
+from utils.expiry import OPEN_PRE_APPROVAL_STATUSES
+from utils.jobs import job_handler
+
+DEFAULT_CRITERIA = {
+    'min_score': 50.0,
+    'max_dti': 0.4,
+    'rate': 13.0,
+    'max_amount': None,
+    'max_term_years': 25,
+    'min_employment_months': 6
+}
+CRITERIA_COLUMNS = {name: f'preapproval_{name}' for name in DEFAULT_CRITERIA}
+BUYER_INPUTS = (
+    'monthly_net_income', 'monthly_loan_repayments', 'employment_duration',
+    'creditworthiness_score', 'desired_loan_amount', 'desired_repayment_period'
+)
+
+_buyers = Buyer.__table__
+_lenders = Lender.__table__
+_pre_approvals = PreApproval.__table__
+
+
+def lender_criteria(lender):
+    """Effective criteria of a Lender (defaults filled in)"""
+    return {
+        name: getattr(lender, column) if getattr(lender, column) is not None else DEFAULT_CRITERIA[name]
+        for name, column in CRITERIA_COLUMNS.items()
+    }
+
+
+def _lender_arrays(rows):
+    def column(name):
+        default = DEFAULT_CRITERIA[name]
+        return np.array([
+            np.nan if row[CRITERIA_COLUMNS[name]] is None and default is None
+            else default if row[CRITERIA_COLUMNS[name]] is None
+            else row[CRITERIA_COLUMNS[name]]
+            for row in rows
+        ], dtype=np.float64)
+    arrays = {name: column(name) for name in DEFAULT_CRITERIA}
+    arrays['id'] = np.array([row['id'] for row in rows], dtype=np.int64)
+    return arrays
+
+
+def _buyer_arrays(rows):
+    arrays = {
+        field: np.array([np.nan if row[field] is None else row[field] for row in rows], dtype=np.float64)
+        for field in BUYER_INPUTS
+    }
+    arrays['id'] = np.array([row['id'] for row in rows], dtype=np.int64)
+    return arrays
+
+
+def evaluate(buyers, lenders):
+    """(buyers x lenders) pre-approval grid; every value is a 2-D array
+
+    Keys: amount, term, payment, eligible and the individual checks
+    (income_ok, score_ok, employment_ok, amount_ok).
+    """
+    column = lambda values: values[:, None]  # noqa: E731 - buyers down, lenders across
+    income = column(buyers['monthly_net_income'])
+    existing = column(np.nan_to_num(buyers['monthly_loan_repayments']))
+    desired_amount = column(buyers['desired_loan_amount'])
+    desired_years = column(buyers['desired_repayment_period'])
+
+    rate = lenders['rate'] / 100 / 12
+    years = np.fmin(np.where(desired_years > 0, desired_years, np.inf), lenders['max_term_years'])
+    term = years * 12
+    capacity = np.maximum(lenders['max_dti'] * np.nan_to_num(income) - existing, 0)
+    # Principal a level payment of `capacity` repays: capacity / payment per unit principal
+    amount = capacity / annuity_payment(np.ones_like(term), np.broadcast_to(rate, term.shape), term)
+    amount = np.fmin(amount, lenders['max_amount'])  # fmin ignores NaN (no cap)
+    amount = np.fmin(amount, np.where(desired_amount > 0, desired_amount, np.nan))
+    amount = np.floor(amount / 1000) * 1000
+
+    checks = {
+        'income_ok': np.broadcast_to(income > 0, amount.shape),
+        'score_ok': column(buyers['creditworthiness_score']) >= lenders['min_score'],
+        'employment_ok': column(np.nan_to_num(buyers['employment_duration'])) >= lenders['min_employment_months'],
+        'amount_ok': amount >= current_app.config['PREAPPROVAL_MIN_AMOUNT']
+    }
+    eligible = checks['income_ok'] & checks['score_ok'] & checks['employment_ok'] & checks['amount_ok']
+    payment = annuity_payment(amount, np.broadcast_to(rate, amount.shape), term)
+    return dict(checks, amount=amount, term=term, payment=payment, eligible=eligible)
+
+
+def _records(buyers, lenders, grid, valid_until):
+    created_at = datetime.utcnow()
+    rows, columns = np.nonzero(grid['eligible'])
+    return [{
+        'buyer_id': int(buyers['id'][i]),
+        'lender_id': int(lenders['id'][j]),
+        'approved_amount': float(grid['amount'][i, j]),
+        'interest_rate': float(lenders['rate'][j]),
+        'valid_until': valid_until,
+        'status': ApplicationStatus.APPROVED,
+        'created_at': created_at
+    } for i, j in zip(rows, columns)]
+
+
+def _lender_rows(connection, lender_id=None):
+    query = select(_lenders.c.id, *[_lenders.c[column] for column in CRITERIA_COLUMNS.values()])
+    if lender_id is not None:
+        query = query.where(_lenders.c.id == lender_id)
+    return connection.execute(query.order_by(_lenders.c.id)).mappings().all()
+
+
+def _valid_until():
+    return date.today() + timedelta(days=current_app.config['PREAPPROVAL_VALIDITY_DAYS'])
+
+
+def evaluate_buyer(buyer_id):
+    """Pre-approve a buyer with every lender; replaces the buyer's open pre-approvals
+
+    Returns one result per lender with the amount, payment and failed checks.
+    """
+    connection = db.session.connection()
+    buyer_rows = connection.execute(
+        select(_buyers.c.id, *[_buyers.c[field] for field in BUYER_INPUTS]).where(_buyers.c.id == buyer_id)
+    ).mappings().all()
+    lender_rows = _lender_rows(connection)
+    if not buyer_rows or not lender_rows:
+        return []
+    buyers, lenders = _buyer_arrays(buyer_rows), _lender_arrays(lender_rows)
+    grid = evaluate(buyers, lenders)
+
+    connection.execute(
+        update(_pre_approvals).where(
+            _pre_approvals.c.buyer_id == buyer_id, _pre_approvals.c.status.in_(OPEN_PRE_APPROVAL_STATUSES)
+        ).values(status=ApplicationStatus.EXPIRED)
+    )
+    records = _records(buyers, lenders, grid, _valid_until())
+    if records:
+        connection.execute(insert(_pre_approvals), records)
+    db.session.commit()
+
+    results = []
+    for j, lender_id in enumerate(lenders['id']):
+        failed = [check[:-3] for check in ('income_ok', 'score_ok', 'employment_ok', 'amount_ok')
+                  if not grid[check][0, j]]
+        results.append({
+            'lenderId': int(lender_id),
+            'approved': not failed,
+            'approvedAmount': float(grid['amount'][0, j]) if not failed else None,
+            'interestRate': float(lenders['rate'][j]),
+            'termMonths': int(grid['term'][0, j]) if np.isfinite(grid['term'][0, j]) else None,
+            'monthlyPayment': round(float(grid['payment'][0, j]), 2) if not failed else None,
+            'failedChecks': failed
+        })
+    return results
+
+
+def _expire_lender_range(connection, lender_id, after_id, through_id=None):
+    """Expire the lender's open pre-approvals of buyers with after_id < id <= through_id"""
+    condition = (
+        (_pre_approvals.c.lender_id == lender_id)
+        & _pre_approvals.c.status.in_(OPEN_PRE_APPROVAL_STATUSES)
+        & (_pre_approvals.c.buyer_id > after_id)
+    )
+    if through_id is not None:
+        condition &= _pre_approvals.c.buyer_id <= through_id
+    return connection.execute(
+        update(_pre_approvals).where(condition).values(status=ApplicationStatus.EXPIRED)
+    ).rowcount
+
+
+def evaluate_lender(lender_id, chunk_size=None):
+    """Pre-approve every completed buyer profile with one lender; returns stats
+
+    Each chunk expires the lender's open pre-approvals for its buyer id range
+    and inserts their replacements in one transaction, so a run that stops
+    halfway leaves every buyer with either the old or the new pre-approval.
+    Buyers past the last chunk (incomplete profiles) are expired at the end.
+    """
+    chunk_size = chunk_size or current_app.config['PREAPPROVAL_BATCH_SIZE']
+    valid_until = _valid_until()
+    stats = {'batches': 0, 'buyers': 0, 'approved': 0, 'approvedAmount': 0.0, 'replaced': 0}
+    with db.engine.connect() as connection:
+        lender_rows = _lender_rows(connection, lender_id)
+        if not lender_rows:
+            raise ValueError(f'Lender {lender_id} not found')
+        lenders = _lender_arrays(lender_rows)
+
+        query = select(_buyers.c.id, *[_buyers.c[field] for field in BUYER_INPUTS]).where(
+            _buyers.c.profile_complete.is_(True)
+        )
+        last_id = 0
+        while True:
+            rows = connection.execute(
+                query.where(_buyers.c.id > last_id).order_by(_buyers.c.id).limit(chunk_size)
+            ).mappings().all()
+            if not rows:
+                break
+            buyers = _buyer_arrays(rows)
+            records = _records(buyers, lenders, evaluate(buyers, lenders), valid_until)
+            stats['replaced'] += _expire_lender_range(connection, lender_id, last_id, rows[-1]['id'])
+            if records:
+                connection.execute(insert(_pre_approvals), records)
+            connection.commit()
+            last_id = rows[-1]['id']
+            stats['batches'] += 1
+            stats['buyers'] += len(rows)
+            stats['approved'] += len(records)
+            stats['approvedAmount'] += sum(record['approved_amount'] for record in records)
+        stats['replaced'] += _expire_lender_range(connection, lender_id, last_id)
+        connection.commit()
+    stats['validUntil'] = valid_until.isoformat()
+    return stats
+
+
+@job_handler('pre_approvals')
+def run_lender_pre_approvals(params):
+    """Background job: params = {'lender_id': id}"""
+    return evaluate_lender(params['lender_id'])
+
+
+def pre_approval_summary(pre_approval, lender_name=None, buyer_name=None):
+    summary = {
+        'id': pre_approval.id,
+        'buyerId': pre_approval.buyer_id,
+        'lenderId': pre_approval.lender_id,
+        'approvedAmount': pre_approval.approved_amount,
+        'interestRate': pre_approval.interest_rate,
+        'validUntil': pre_approval.valid_until.isoformat(),
+        'status': pre_approval.status.value,
+        'createdAt': pre_approval.created_at.isoformat() if pre_approval.created_at else None
+    }
+    if lender_name is not None:
+        summary['lenderName'] = lender_name
+    if buyer_name is not None:
+        summary['buyerName'] = buyer_name
+    return summary
@@ -0,0 +1,198 @@
+# NetLend Backend - Per-Request Query Profiler
+# Hooks SQLAlchemy cursor events to measure how many statements each request
+# runs, how long they take in total and which ones were slowest.
+#
+# - Debug mode (or QUERY_PROFILER_HEADERS): X-DB-* response headers
+# - Production: one structured JSON log line for a sampled fraction of
+#   requests, plus every request that exceeds QUERY_PROFILER_SLOW_MS
+# - Tests/scripts: count_queries() / query_budget() context managers
+
+import heapq
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('netlend.queries')
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_local = threading.local()
+_listeners_installed = False
+
+STATEMENT_PREVIEW_CHARS = 300
+
+
+class QueryStats:
+    """Query count, total DB time and the N slowest statements"""
+
+    def __init__(self, keep_slowest=3):
+        self.count = 0
+        self.total_time = 0.0
+        self.keep_slowest = keep_slowest
+        self._slowest = []  # min-heap of (duration, sequence, statement)
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.total_time += duration
+        if self.keep_slowest <= 0:
+            return
+        entry = (duration, self.count, statement)
+        if len(self._slowest) < self.keep_slowest:
+            heapq.heappush(self._slowest, entry)
+        elif duration > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    @property
+    def total_ms(self):
+        return round(self.total_time * 1000, 2)
+
+    @property
+    def slowest(self):
+        return [
+            {'ms': round(duration * 1000, 2), 'statement': statement[:STATEMENT_PREVIEW_CHARS]}
+            for duration, _, statement in sorted(self._slowest, reverse=True)
+        ]
+
+
+def _active_collectors():
+    collectors = getattr(_local, 'collectors', None)
+    if collectors is None:
+        collectors = _local.collectors = []
+    return collectors
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start_time')
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    if has_request_context():
+        stats = g.get('query_stats')
+        if stats is not None:
+            stats.record(statement, duration)
+    for stats in _active_collectors():
+        stats.record(statement, duration)
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute never fires for a failed statement; drop its start
+    # time so it doesn't linger on the pooled connection
+    conn = exception_context.connection
+    if conn is None or exception_context.execution_context is None:
+        return
+    starts = conn.info.get('query_start_time')
+    if starts:
+        starts.pop()
+
+
+def install_query_listeners():
+    """Attach cursor listeners to every Engine (idempotent)"""
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(Engine, 'handle_error', _handle_error)
+    _listeners_installed = True
+
+
+@contextmanager
+def count_queries(keep_slowest=3):
+    """Collect query stats for everything executed inside the block
+
+    Works around test-client calls as well, since the view runs in the
+    calling thread:
+
+        with count_queries() as stats:
+            client.get('/api/lender/my-listings', headers=auth)
+        assert stats.count <= 3
+    """
+    install_query_listeners()
+    stats = QueryStats(keep_slowest=keep_slowest)
+    collectors = _active_collectors()
+    collectors.append(stats)
+    try:
+        yield stats
+    finally:
+        collectors.remove(stats)
+
+
+@contextmanager
+def query_budget(max_queries):
+    """Fail with AssertionError if the block runs more than max_queries statements"""
+    with count_queries(keep_slowest=max_queries + 1) as stats:
+        yield stats
+    if stats.count > max_queries:
+        statements = '\n'.join(f"  {s['ms']}ms {s['statement']}" for s in stats.slowest)
+        raise AssertionError(
+            f'Query budget exceeded: {stats.count} queries (budget {max_queries})\n{statements}'
+        )
+
+
+def init_query_profiler(app):
+    """Register request hooks for the per-request profiler"""
+    if not app.config.get('QUERY_PROFILER_ENABLED', True):
+        return
+    install_query_listeners()
+    logger.disabled = False  # logging.config.fileConfig() disables existing loggers
+
+    keep_slowest = app.config.get('QUERY_PROFILER_TOP_N', 3)
+    sample_rate = app.config.get('QUERY_PROFILER_SAMPLE_RATE', 0.01)
+    slow_seconds = app.config.get('QUERY_PROFILER_SLOW_MS', 500) / 1000
+
+    @app.before_request
+    def start_query_profile():
+        g.query_stats = QueryStats(keep_slowest=keep_slowest)
+        g.query_profile_started = time.perf_counter()
+
+    @app.after_request
+    def finish_query_profile(response):
+        stats = g.get('query_stats')
+        if stats is None:
+            return response
+
+        if app.debug or app.config.get('QUERY_PROFILER_HEADERS'):
+            response.headers['X-DB-Query-Count'] = str(stats.count)
+            response.headers['X-DB-Time-Ms'] = str(stats.total_ms)
+            if stats.slowest:
+                response.headers['X-DB-Slowest-Ms'] = str(stats.slowest[0]['ms'])
+
+        # Log once the body has been sent so streamed responses are counted too
+        started = g.query_profile_started
+        method, path, endpoint = request.method, request.path, request.endpoint
+        status = response.status_code
+
+        def log_profile():
+            if stats.total_time < slow_seconds and random.random() >= sample_rate:
+                return
+            logger.info(json.dumps({
+                'event': 'request_queries',
+                'method': method,
+                'path': path,
+                'endpoint': endpoint,
+                'status': status,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+                'query_count': stats.count,
+                'db_time_ms': stats.total_ms,
+                'slow': stats.total_time >= slow_seconds,
+                'slowest': stats.slowest
+            }))
+
+        response.call_on_close(log_profile)
+        return response
@@ -0,0 +1,152 @@
+# NetLend Backend - Login Rate Limiting
+# A login attempt can run up to four password-hash checks (User, Buyer, Admin,
+# Lender), so credential stuffing is a cheap way to pin every sync worker.
+# Attempts are metered by two token buckets, one per client IP and one per
+# email address:
+# - a bucket holds up to *_BURST tokens and refills at *_PER_MINUTE per minute
+# - an attempt takes one token from each bucket; when either is empty the
+#   attempt is refused (429 + Retry-After) before any query or hash runs, and
+#   neither bucket is charged
+# With Redis both buckets are read and charged by one Lua script, so the
+# limits hold across workers and hosts. Without it each worker meters on its
+# own, which multiplies the effective limits by the worker count.
+#
+# Behind a proxy the client IP is taken from X-Forwarded-For, counting
+# LOGIN_RATE_PROXY_HOPS trusted proxies from the right; with 0 hops the header
+# is ignored (clients could forge it) and the socket address is used.
+
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, request
+
+from utils.metrics import record_login_throttled
+from utils.redis_client import get_redis, mark_redis_failed
+
+BUCKET_KEY = 'netlend:login-rate:{}:{}'
+
+# KEYS: bucket keys. ARGV: now, then capacity and refill rate (tokens/second)
+# per key. Returns {seconds to wait, index of the empty bucket}; {'0', 0} when
+# the attempt was admitted and every bucket charged.
+TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local levels = {}
+local wait, blocked = 0, 0
+for i, key in ipairs(KEYS) do
+    local capacity, rate = tonumber(ARGV[i * 2]), tonumber(ARGV[i * 2 + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local level = tonumber(state[1]) or capacity
+    local elapsed = math.max(0, now - (tonumber(state[2]) or now))
+    levels[i] = math.min(capacity, level + elapsed * rate)
+    if levels[i] < 1 and (1 - levels[i]) / rate > wait then
+        wait, blocked = (1 - levels[i]) / rate, i
+    end
+end
+if blocked > 0 then
+    return {tostring(wait), blocked}
+end
+for i, key in ipairs(KEYS) do
+    local capacity, rate = tonumber(ARGV[i * 2]), tonumber(ARGV[i * 2 + 1])
+    redis.call('HSET', key, 'tokens', tostring(levels[i] - 1), 'ts', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(capacity / rate))
+end
+return {'0', 0}
+"""
+
+
+class TokenBuckets:
+    """Per-process token buckets, the fallback when Redis is unreachable
+
+    Buckets are kept in LRU order and the least recently used are dropped past
+    ``maxsize``; a dropped bucket simply starts full again.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, keys, limits, now):
+        """Same contract as TOKEN_BUCKET_SCRIPT: (wait seconds, 1-based index of the empty bucket or 0)"""
+        with self._lock:
+            levels = []
+            wait, blocked = 0.0, 0
+            for i, (key, (capacity, rate)) in enumerate(zip(keys, limits), start=1):
+                level, last = self._buckets.get(key, (capacity, now))
+                level = min(capacity, level + max(0.0, now - last) * rate)
+                levels.append(level)
+                if level < 1 and (1 - level) / rate > wait:
+                    wait, blocked = (1 - level) / rate, i
+            if blocked:
+                return wait, blocked
+
+            for key, level in zip(keys, levels):
+                self._buckets[key] = (level - 1, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return 0.0, 0
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+_local_buckets = TokenBuckets()
+
+
+def client_ip():
+    """The caller's address, honouring LOGIN_RATE_PROXY_HOPS trusted proxies"""
+    hops = current_app.config['LOGIN_RATE_PROXY_HOPS']
+    if hops:
+        forwarded = [ip.strip() for ip in request.headers.get('X-Forwarded-For', '').split(',') if ip.strip()]
+        if len(forwarded) >= hops:
+            return forwarded[-hops]
+    return request.remote_addr or 'unknown'
+
+
+def _email_key(email):
+    # Hashed so Redis never holds the addresses themselves. str() because a
+    # JSON body can carry any type; the lookup then simply finds no account
+    return hashlib.sha256(str(email).strip().lower().encode()).hexdigest()[:32]
+
+
+def _take(keys, limits):
+    now = time.time()
+    client = get_redis()
+    if client is not None:
+        try:
+            args = [now] + [value for limit in limits for value in limit]
+            wait, blocked = client.register_script(TOKEN_BUCKET_SCRIPT)(keys=keys, args=args)
+            return float(wait), int(blocked)
+        except Exception as e:
+            current_app.logger.warning(f"Redis login rate limit failed, limiting in this worker only: {e}")
+            mark_redis_failed()
+    return _local_buckets.take(keys, limits, now)
+
+
+def check_login_rate(email=None):
+    """Charge one login attempt to the caller's IP and ``email`` buckets
+
+    Returns 0 when the attempt may go ahead, otherwise the whole seconds to
+    wait before retrying (for Retry-After). Touches no database.
+    """
+    config = current_app.config
+    if not config['LOGIN_RATE_LIMIT_ENABLED']:
+        return 0
+
+    buckets = [('ip', client_ip(), config['LOGIN_RATE_IP_BURST'], config['LOGIN_RATE_IP_PER_MINUTE'])]
+    if email:
+        buckets.append(('email', _email_key(email), config['LOGIN_RATE_EMAIL_BURST'],
+                        config['LOGIN_RATE_EMAIL_PER_MINUTE']))
+
+    keys = [BUCKET_KEY.format(name, value) for name, value, _, _ in buckets]
+    limits = [(float(burst), per_minute / 60.0) for _, _, burst, per_minute in buckets]
+    wait, blocked = _take(keys, limits)
+    if not blocked:
+        return 0
+    record_login_throttled(buckets[blocked - 1][0])
+    return max(1, math.ceil(wait))
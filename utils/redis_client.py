@@ -0,0 +1,50 @@
+# NetLend Backend - Shared Redis Connection
+# Redis is optional: callers get None when it is not installed or unreachable
+# and fall back to per-process state. A failed connection is retried after
+# REDIS_RETRY_SECONDS rather than on every call.
+
+import time
+
+from flask import current_app
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+REDIS_RETRY_SECONDS = 30
+
+_client = None
+_client_url = None
+_retry_at = 0.0
+
+
+def get_redis():
+    """Return a connected Redis client, or None to use the in-memory fallback"""
+    global _client, _client_url, _retry_at
+
+    url = current_app.config.get('REDIS_URL')
+    if redis is None or not url:
+        return None
+    if _client is not None and _client_url == url:
+        return _client
+    if time.monotonic() < _retry_at:
+        return None
+
+    try:
+        client = redis.Redis.from_url(url, socket_connect_timeout=0.5, socket_timeout=0.5)
+        client.ping()
+    except redis.RedisError as e:
+        current_app.logger.warning(f"Redis unavailable at {url}, using in-memory fallback: {e}")
+        _retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+        return None
+
+    _client, _client_url = client, url
+    return _client
+
+
+def mark_redis_failed():
+    """Drop the client after a failed command; reconnect after the retry delay"""
+    global _client, _retry_at
+    _client = None
+    _retry_at = time.monotonic() + REDIS_RETRY_SECONDS
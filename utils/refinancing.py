@@ -0,0 +1,201 @@
+# NetLend Backend - Batch Refinancing Offers
+# When a lender cuts rates, generate_offers() offers the new rate to every
+# eligible mortgage of their book in one pass:
+# - SQL narrows the book to ACTIVE mortgages with a balance left whose rate is
+#   at least min_spread points above the new one, that have no open offer and,
+#   unless include_delinquent is set, no LATE or MISSED installment
+# - numpy prices each chunk of candidates: remaining installments, the current
+#   level payment, the payment at the new rate (over the remaining term or
+#   new_term) and the monthly and lifetime savings
+# - candidates with enough remaining term and savings are inserted as OFFERED
+#   refinancing_offers rows with one executemany INSERT per chunk
+# The book is walked in keyset-paged chunks, each committed on its own, so
+# memory stays flat and a rerun skips mortgages that already have an offer.
+# A partial unique index allows one OFFERED row per mortgage; when two runs
+# for the same lender overlap, the later INSERT skips the mortgages the other
+# one offered in the meantime (ON CONFLICT DO NOTHING).
+# Runs as the 'refinancing_offers' background job (utils/jobs.py).
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import and_, exists, insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from models import (
+    ActiveMortgage, MortgageStatus, OPEN_OFFER_WHERE, OfferStatus, PaymentSchedule, PaymentStatus,
+    RefinancingOffer
+)
+from utils.cashflow import annuity_payment, month_index
+from utils.jobs import job_handler
+
+_mortgages = ActiveMortgage.__table__
+_schedules = PaymentSchedule.__table__
+_offers = RefinancingOffer.__table__
+
+
+def _parse_flag(value):
+    # JSON booleans, or 'true'/'false' as sent for query flags
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    raise ValueError('include_delinquent must be true or false')
+
+
+def parse_offer_params(body):
+    """Normalized batch params from a request body; raises ValueError on bad values"""
+    config = current_app.config
+    body = body or {}
+    try:
+        params = {
+            'new_rate': float(body['new_rate']),
+            'min_spread': float(body.get('min_spread', config['REFI_MIN_RATE_SPREAD'])),
+            'min_remaining_months': int(body.get('min_remaining_months', 12)),
+            'new_term': int(body['new_term']) if body.get('new_term') is not None else None,
+            'min_monthly_savings': float(body.get('min_monthly_savings', 0)),
+            'validity_days': int(body.get('validity_days', config['REFI_OFFER_VALIDITY_DAYS']))
+        }
+    except KeyError:
+        raise ValueError('new_rate is required')
+    except (TypeError, ValueError):
+        raise ValueError('Offer parameters must be numbers')
+    params['include_delinquent'] = _parse_flag(body.get('include_delinquent', False))
+    if not 0 <= params['new_rate'] < 100:
+        raise ValueError('new_rate must be an annual percentage between 0 and 100')
+    if params['min_spread'] < 0 or params['min_remaining_months'] < 1:
+        raise ValueError('min_spread cannot be negative and min_remaining_months must be at least 1')
+    if params['new_term'] is not None and not 1 <= params['new_term'] <= 360:
+        raise ValueError('new_term must be between 1 and 360 months')
+    if not 1 <= params['validity_days'] <= 365:
+        raise ValueError('validity_days must be between 1 and 365')
+    return params
+
+
+def _candidates(lender_id, params):
+    open_offer = exists().where(
+        _offers.c.mortgage_id == _mortgages.c.id, _offers.c.status == OfferStatus.OFFERED
+    )
+    conditions = [
+        _mortgages.c.lender_id == lender_id,
+        _mortgages.c.status == MortgageStatus.ACTIVE,
+        _mortgages.c.remaining_balance > 0,
+        _mortgages.c.interest_rate >= params['new_rate'] + params['min_spread'],
+        ~open_offer
+    ]
+    if not params['include_delinquent']:
+        conditions.append(~exists().where(
+            _schedules.c.mortgage_id == _mortgages.c.id,
+            _schedules.c.status.in_((PaymentStatus.LATE, PaymentStatus.MISSED))
+        ))
+    return select(
+        _mortgages.c.id, _mortgages.c.remaining_balance, _mortgages.c.interest_rate,
+        _mortgages.c.repayment_term, _mortgages.c.created_at
+    ).where(and_(*conditions))
+
+
+def price_offers(rows, params, start_month):
+    """Vectorized offer terms for candidate rows; returns arrays keyed by field"""
+    balance = np.array([row.remaining_balance for row in rows], dtype=np.float64)
+    rate = np.array([row.interest_rate for row in rows], dtype=np.float64) / 100 / 12
+    created = np.array([month_index(row.created_at) for row in rows], dtype=np.int64)
+    maturity = created + np.array([row.repayment_term for row in rows], dtype=np.int64)
+    remaining = np.maximum(maturity - np.maximum(created + 1, start_month) + 1, 1)
+
+    new_term = np.full(len(rows), params['new_term']) if params['new_term'] else remaining
+    current_payment = annuity_payment(balance, rate, remaining)
+    new_payment = annuity_payment(balance, np.full(len(rows), params['new_rate'] / 100 / 12), new_term)
+    return {
+        'remaining': remaining,
+        'new_term': new_term,
+        'current_payment': current_payment,
+        'new_payment': new_payment,
+        'monthly_savings': current_payment - new_payment,
+        'lifetime_savings': current_payment * remaining - new_payment * new_term
+    }
+
+
+def _insert_offers(connection, offers):
+    """INSERT offers, skipping mortgages that already have an open one; returns the offered mortgage ids"""
+    dialects = {'postgresql': postgresql, 'sqlite': sqlite}
+    dialect = dialects.get(connection.dialect.name)
+    if dialect is None:
+        connection.execute(insert(_offers), offers)
+        return {offer['mortgage_id'] for offer in offers}
+    statement = dialect.insert(_offers).on_conflict_do_nothing(
+        index_elements=['mortgage_id'], index_where=text(OPEN_OFFER_WHERE)
+    ).returning(_offers.c.mortgage_id)
+    return set(connection.execute(statement, offers).scalars())
+
+
+def generate_offers(lender_id, params, chunk_size=None, today=None):
+    """Offer ``params['new_rate']`` to every eligible mortgage of a lender; returns stats"""
+    chunk_size = chunk_size or current_app.config['REFI_BATCH_SIZE']
+    today = today or date.today()
+    expiry = today + timedelta(days=params['validity_days'])
+    query = _candidates(lender_id, params)
+
+    stats = {'candidates': 0, 'offered': 0, 'monthlySavings': 0.0, 'lifetimeSavings': 0.0}
+    last_id = 0
+    with db.engine.connect() as connection:
+        while True:
+            rows = connection.execute(
+                query.where(_mortgages.c.id > last_id).order_by(_mortgages.c.id).limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            stats['candidates'] += len(rows)
+
+            priced = price_offers(rows, params, month_index(today))
+            chosen = np.flatnonzero(
+                (priced['remaining'] >= params['min_remaining_months'])
+                & (priced['monthly_savings'] > 0)
+                & (priced['monthly_savings'] >= params['min_monthly_savings'])
+            )
+            if not len(chosen):
+                continue
+            created_at = datetime.utcnow()
+            offered = _insert_offers(connection, [{
+                'lender_id': lender_id,
+                'mortgage_id': rows[i].id,
+                'new_interest_rate': params['new_rate'],
+                'new_term': int(priced['new_term'][i]),
+                'new_monthly_payment': round(float(priced['new_payment'][i]), 2),
+                'monthly_savings': round(float(priced['monthly_savings'][i]), 2),
+                'offer_expiry': expiry,
+                'status': OfferStatus.OFFERED,
+                'created_at': created_at
+            } for i in chosen])
+            connection.commit()
+            chosen = [i for i in chosen if rows[i].id in offered]
+            stats['offered'] += len(chosen)
+            stats['monthlySavings'] += float(priced['monthly_savings'][chosen].sum())
+            stats['lifetimeSavings'] += float(priced['lifetime_savings'][chosen].sum())
+
+    stats['monthlySavings'] = round(stats['monthlySavings'], 2)
+    stats['lifetimeSavings'] = round(stats['lifetimeSavings'], 2)
+    stats['offerExpiry'] = expiry.isoformat()
+    return stats
+
+
+@job_handler('refinancing_offers')
+def run_refinancing_offers(params):
+    """Background job: params are parse_offer_params() output plus lender_id"""
+    return generate_offers(params['lender_id'], params)
+
+
+def offer_summary(offer):
+    return {
+        'id': offer.id,
+        'mortgageId': offer.mortgage_id,
+        'newInterestRate': offer.new_interest_rate,
+        'newTerm': offer.new_term,
+        'newMonthlyPayment': offer.new_monthly_payment,
+        'monthlySavings': offer.monthly_savings,
+        'offerExpiry': offer.offer_expiry.isoformat(),
+        'status': offer.status.value,
+        'createdAt': offer.created_at.isoformat() if offer.created_at else None
+    }
@@ -0,0 +1,323 @@
+# NetLend Backend - Monte Carlo Portfolio Risk
+# Credit-loss distribution of the mortgage book over a horizon under
+# interest-rate shocks and stochastic defaults and prepayments, per lender and
+# platform-wide. Runs as the 'portfolio_risk' background job (utils/jobs.py).
+#
+# Every scenario draws:
+# - a parallel rate shock, N(rate_shock_bps, rate_volatility_bps), which
+#   re-prices each loan's level payment over its remaining term
+# - a systematic credit factor that scales every borrower's default
+#   probability by a mean-one lognormal multiplier (pd_volatility)
+# Each loan's annual default probability starts from the borrower's
+# creditworthiness score (PD_BEST at the top score, PD_WORST at zero) and is
+# raised by payment shock ** PAYMENT_SHOCK_ELASTICITY. Default and prepayment
+# months are then sampled as geometric draws. A loan that prepays first never
+# defaults. A defaulted loan loses lgd of its amortized balance at default.
+#
+# Scenarios are split into fixed-size shards, each with its own child of the
+# run's seed, and the shards are spread over a process pool. Results depend on
+# the seed only, not on the number of workers. The pool starts its processes
+# from a forkserver (spawn where unavailable), never by forking the
+# multithreaded web worker. RISK_WORKERS is per job, and every gunicorn worker
+# can run JOB_WORKERS jobs at once, so keep it small. Each shard computes
+# (scenarios x loans) matrices in chunks of at most RISK_CHUNK_ELEMENTS and
+# keeps only per-lender losses per scenario.
+
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from models import ActiveMortgage, Buyer, CREDIT_MAX_SCORE, Lender, MortgageStatus
+from utils.cashflow import month_index
+from utils.jobs import job_handler
+
+# Annual default probability at the best and worst credit scores, and for
+# borrowers without a score
+PD_BEST = 0.01
+PD_WORST = 0.15
+PD_UNSCORED = 0.08
+# Default probability multiplier = (shocked payment / current payment) ** elasticity
+PAYMENT_SHOCK_ELASTICITY = 2.0
+# Prepayment speed falls by this fraction per +100bps of shock (compounded)
+PREPAYMENT_SHOCK_SENSITIVITY = 0.25
+HISTOGRAM_BINS = 20
+
+DEFAULT_PARAMS = {
+    'horizon_months': 12,
+    'rate_shock_bps': 0.0,
+    'rate_volatility_bps': 100.0,
+    'pd_volatility': 0.5,
+    'lgd': 0.35,
+    'cpr': 0.06,
+    'confidence': 0.99,
+    'lender_id': None
+}
+
+_mortgages = ActiveMortgage.__table__
+_buyers = Buyer.__table__
+
+
+def parse_risk_params(body):
+    """Normalized simulation params from a request body; raises ValueError on bad values
+
+    The seed is drawn here when missing, so the stored job params reproduce the run.
+    """
+    config = current_app.config
+    body = body or {}
+    params = dict(DEFAULT_PARAMS)
+    for name, default in DEFAULT_PARAMS.items():
+        value = body.get(name)
+        if value is None:
+            continue
+        try:
+            params[name] = int(value) if name in ('horizon_months', 'lender_id') else float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{name} must be a number')
+
+    try:
+        params['scenarios'] = int(body.get('scenarios') or config['RISK_DEFAULT_SCENARIOS'])
+        params['seed'] = int(body['seed']) if body.get('seed') is not None else random.randrange(2 ** 32)
+    except (TypeError, ValueError):
+        raise ValueError('scenarios and seed must be integers')
+
+    if not 1 <= params['scenarios'] <= config['RISK_MAX_SCENARIOS']:
+        raise ValueError(f"scenarios must be between 1 and {config['RISK_MAX_SCENARIOS']}")
+    if not 1 <= params['horizon_months'] <= 120:
+        raise ValueError('horizon_months must be between 1 and 120')
+    if not 0.5 <= params['confidence'] < 1:
+        raise ValueError('confidence must be between 0.5 and 1 (e.g. 0.99)')
+    for name in ('lgd', 'cpr'):
+        if not 0 <= params[name] <= 1:
+            raise ValueError(f'{name} must be between 0 and 1')
+    for name in ('rate_volatility_bps', 'pd_volatility'):
+        if params[name] < 0:
+            raise ValueError(f'{name} cannot be negative')
+    return params
+
+
+def load_risk_portfolio(lender_id=None, as_of=None):
+    """Columnar snapshot of ACTIVE mortgages with a balance left, grouped by lender"""
+    start_month = month_index(as_of or date.today())
+    query = select(
+        _mortgages.c.lender_id, _mortgages.c.remaining_balance, _mortgages.c.interest_rate,
+        _mortgages.c.repayment_term, _mortgages.c.created_at, _buyers.c.creditworthiness_score
+    ).select_from(
+        _mortgages.outerjoin(_buyers, _buyers.c.id == _mortgages.c.borrower_id)
+    ).where(
+        _mortgages.c.status == MortgageStatus.ACTIVE, _mortgages.c.remaining_balance > 0
+    ).order_by(_mortgages.c.lender_id)
+    if lender_id is not None:
+        query = query.where(_mortgages.c.lender_id == lender_id)
+    rows = db.session.execute(query).all()
+
+    scores = np.array([np.nan if row[5] is None else row[5] for row in rows], dtype=np.float64)
+    base_pd = np.where(
+        np.isnan(scores), PD_UNSCORED,
+        PD_WORST - (PD_WORST - PD_BEST) * np.clip(scores, 0, CREDIT_MAX_SCORE) / CREDIT_MAX_SCORE
+    )
+    maturity = np.array([month_index(row[4]) + row[3] for row in rows], dtype=np.int64)
+    first = np.array([month_index(row[4]) + 1 for row in rows], dtype=np.int64)
+    lender_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    return {
+        'lender_id': lender_ids,
+        'balance': np.array([row[1] for row in rows], dtype=np.float64),
+        'rate': np.array([row[2] or 0 for row in rows], dtype=np.float64) / 100 / 12,
+        # Installments left from this month on; loans past maturity owe one more
+        'term': np.maximum(maturity - np.maximum(first, start_month) + 1, 1),
+        'base_pd': base_pd
+    }
+
+
+def _annuity_factor(rate, term):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(rate > 0, rate / (1 - (1 + rate) ** -term), 1 / term)
+
+
+def _balance_after(balance, rate, term, paid):
+    """Amortized balance after ``paid`` level payments"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = (1 + rate) ** term
+        remaining = balance * (growth - (1 + rate) ** paid) / (growth - 1)
+    return np.where(rate > 0, remaining, balance * (1 - paid / term))
+
+
+def _event_month(draws, annual_probability):
+    """Month (1-based) of the first event from Exp(1) draws; inf when the probability is zero
+
+    An annual probability p is a monthly hazard of -log(1 - p) / 12, so the
+    first month whose cumulative hazard exceeds the draw is geometric with the
+    matching monthly probability.
+    """
+    hazard = -np.log1p(-annual_probability) / 12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        month = np.floor(draws / hazard) + 1
+    return np.where(hazard > 0, month, np.inf)
+
+
+def _lender_groups(lender_ids):
+    """Start offset of each lender's run of loans (portfolios are sorted by lender)"""
+    if not len(lender_ids):
+        return np.zeros(0, dtype=np.int64)
+    return np.flatnonzero(np.r_[True, np.diff(lender_ids) != 0])
+
+
+def simulate_chunk(portfolio, params, rng, scenarios, groups):
+    """Loss and default count per (scenario, lender group) for ``scenarios`` draws"""
+    balance, rate, term, base_pd = portfolio['balance'], portfolio['rate'], portfolio['term'], portfolio['base_pd']
+    horizon = np.minimum(term, params['horizon_months'])
+
+    shock_bps = params['rate_shock_bps'] + params['rate_volatility_bps'] * rng.standard_normal((scenarios, 1))
+    shocked_rate = np.maximum(rate + shock_bps / 10000 / 12, 0)
+    payment_shock = _annuity_factor(shocked_rate, term) / _annuity_factor(rate, term)
+
+    sigma = params['pd_volatility']
+    systematic = np.exp(sigma * rng.standard_normal((scenarios, 1)) - sigma ** 2 / 2)
+    annual_pd = np.minimum(base_pd * payment_shock ** PAYMENT_SHOCK_ELASTICITY * systematic, 0.999)
+    default_month = _event_month(rng.standard_exponential(annual_pd.shape), annual_pd)
+
+    cpr = np.minimum(params['cpr'] * (1 - PREPAYMENT_SHOCK_SENSITIVITY) ** (shock_bps / 100), 0.999)
+    prepay_month = _event_month(rng.standard_exponential(annual_pd.shape), cpr)
+
+    defaulted = (default_month <= horizon) & (default_month <= prepay_month)
+    # Defaults are rare; amortize only the loans that default
+    scenario, loan = np.nonzero(defaulted)
+    losses = np.zeros(defaulted.shape)
+    losses[scenario, loan] = params['lgd'] * _balance_after(
+        balance[loan], shocked_rate[scenario, loan], term[loan], default_month[scenario, loan] - 1
+    )
+    return (
+        np.add.reduceat(losses, groups, axis=1),
+        np.add.reduceat(defaulted.astype(np.int64), groups, axis=1)
+    )
+
+
+def simulate_shard(portfolio, params, seed, scenarios, chunk_elements):
+    """One shard of scenarios: (losses, defaults), each (scenarios x lender groups)"""
+    rng = np.random.default_rng(seed)
+    groups = _lender_groups(portfolio['lender_id'])
+    chunk = max(1, chunk_elements // max(len(portfolio['balance']), 1))
+    losses, defaults = [], []
+    for start in range(0, scenarios, chunk):
+        chunk_losses, chunk_defaults = simulate_chunk(portfolio, params, rng, min(chunk, scenarios - start), groups)
+        losses.append(chunk_losses)
+        defaults.append(chunk_defaults)
+    return np.vstack(losses), np.vstack(defaults)
+
+
+# Worker processes receive the portfolio once, through the pool initializer
+_worker_portfolio = None
+
+
+def _mp_context():
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+
+def _init_worker(portfolio):
+    global _worker_portfolio
+    _worker_portfolio = portfolio
+
+
+def _shard_worker(params, seed, scenarios, chunk_elements):
+    return simulate_shard(_worker_portfolio, params, seed, scenarios, chunk_elements)
+
+
+def _distribution(losses, exposure, confidence):
+    """Summary statistics of a per-scenario loss vector"""
+    ordered = np.sort(losses)
+    var = float(np.quantile(ordered, confidence))
+    tail = ordered[int(np.floor(confidence * len(ordered))):]
+    expected_loss = float(ordered.mean())
+    return {
+        'exposure': round(exposure, 2),
+        'expectedLoss': round(expected_loss, 2),
+        'lossStdDev': round(float(ordered.std()), 2),
+        'lossRate': round(expected_loss / exposure, 6) if exposure else 0.0,
+        'valueAtRisk': round(var, 2),
+        'expectedShortfall': round(float(tail.mean()) if len(tail) else var, 2),
+        'percentiles': {
+            f'p{pct}': round(float(np.quantile(ordered, pct / 100)), 2) for pct in (50, 90, 95, 99)
+        }
+    }
+
+
+def simulate(portfolio, params, workers=1, shard_scenarios=1000, chunk_elements=1_000_000):
+    """Run the Monte Carlo; returns the result dict (without lender names)"""
+    started = time.perf_counter()
+    scenarios = params['scenarios']
+    sizes = [min(shard_scenarios, scenarios - start) for start in range(0, scenarios, shard_scenarios)]
+    seeds = np.random.SeedSequence(params['seed']).spawn(len(sizes))
+
+    lender_ids = portfolio['lender_id']
+    if not len(lender_ids):
+        shards = [(np.zeros((size, 0)), np.zeros((size, 0), dtype=np.int64)) for size in sizes]
+    elif workers <= 1:
+        shards = [simulate_shard(portfolio, params, seed, size, chunk_elements) for seed, size in zip(seeds, sizes)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context(),
+                                 initializer=_init_worker, initargs=(portfolio,)) as pool:
+            futures = [
+                pool.submit(_shard_worker, params, seed, size, chunk_elements) for seed, size in zip(seeds, sizes)
+            ]
+            shards = [future.result() for future in futures]
+    losses = np.vstack([shard[0] for shard in shards])
+    defaults = np.vstack([shard[1] for shard in shards])
+
+    group_starts = _lender_groups(lender_ids)
+    group_exposure = np.add.reduceat(portfolio['balance'], group_starts) if len(group_starts) else []
+    group_loans = np.diff(np.r_[group_starts, len(lender_ids)])
+
+    confidence = params['confidence']
+    platform_losses = losses.sum(axis=1)
+    platform = _distribution(platform_losses, float(portfolio['balance'].sum()), confidence)
+    platform['loans'] = len(lender_ids)
+    platform['expectedDefaults'] = round(float(defaults.sum(axis=1).mean()), 2)
+    counts, edges = np.histogram(platform_losses, bins=HISTOGRAM_BINS)
+    platform['histogram'] = [
+        {'from': round(float(edges[i]), 2), 'to': round(float(edges[i + 1]), 2), 'count': int(count)}
+        for i, count in enumerate(counts)
+    ]
+
+    lenders = []
+    for i, lender_id in enumerate(lender_ids[group_starts]):
+        stats = _distribution(losses[:, i], float(group_exposure[i]), confidence)
+        stats.update(lenderId=int(lender_id), loans=int(group_loans[i]),
+                     expectedDefaults=round(float(defaults[:, i].mean()), 2))
+        lenders.append(stats)
+    lenders.sort(key=lambda stats: -stats['expectedShortfall'])
+
+    return {
+        'scenarios': scenarios,
+        'shards': len(sizes),
+        'workers': workers,
+        'elapsedSeconds': round(time.perf_counter() - started, 3),
+        'platform': platform,
+        'lenders': lenders
+    }
+
+
+@job_handler('portfolio_risk')
+def run_portfolio_risk(params):
+    """Background job: simulate the book described by parse_risk_params() output"""
+    config = current_app.config
+    portfolio = load_risk_portfolio(params.get('lender_id'))
+    result = simulate(
+        portfolio, params,
+        workers=config['RISK_WORKERS'] or os.cpu_count() or 1,
+        shard_scenarios=config['RISK_SHARD_SCENARIOS'],
+        chunk_elements=config['RISK_CHUNK_ELEMENTS']
+    )
+    names = dict(db.session.query(Lender.id, Lender.institution_name).filter(
+        Lender.id.in_([stats['lenderId'] for stats in result['lenders']])
+    ))
+    for stats in result['lenders']:
+        stats['lenderName'] = names.get(stats['lenderId'])
+    return result
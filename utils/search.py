@@ -0,0 +1,206 @@
+# NetLend Backend - Listing Full-Text Search
+# Indexes each listing's title, location (address + county) and eligibility
+# criteria, weighted in that order, so /api/mortgages/search can rank matches
+# in the database instead of clients filtering whole lists:
+# - PostgreSQL: mortgage_listings.search_vector (tsvector) with a GIN index
+# - SQLite: the mortgage_listings_fts FTS5 table, keyed by listing id (rowid)
+#
+# Queries are split into words and every word must match, as a prefix
+# ("westl" finds "Westlands"). Ranking is ts_rank_cd / bm25 with the same
+# field weights, so a title hit outranks a criteria hit on both databases.
+#
+# ORM inserts, updates and deletes of listings keep the index in step inside
+# the same flush. Core/bulk writes bypass those events - run
+# rebuild_search_index.py after them.
+
+import re
+
+from sqlalchemy import bindparam, delete, event, func, insert, inspect, literal, literal_column, or_, select, update
+from sqlalchemy.sql import column, table
+
+from app import db
+from models import KenyanCounty, MortgageListing
+
+SEARCH_FIELDS = ('property_title', 'address', 'county', 'eligibility_criteria')
+SEARCH_CONFIG = 'english'
+MAX_SEARCH_TERMS = 10
+_WEIGHTS = (('title', 'A', 10.0), ('location', 'B', 5.0), ('criteria', 'C', 1.0))
+
+FTS_TABLE = 'mortgage_listings_fts'
+_fts = table(FTS_TABLE, column('rowid'), column('title'), column('location'), column('criteria'))
+_listings = MortgageListing.__table__
+
+
+def search_terms(text):
+    """Lower-cased words of a user query (punctuation and operators dropped)"""
+    return re.findall(r'[^\W_]+', (text or '').lower())[:MAX_SEARCH_TERMS]
+
+
+def _county_name(county):
+    if county is None:
+        return ''
+    if isinstance(county, KenyanCounty):
+        return county.value
+    try:
+        return KenyanCounty[county].value
+    except KeyError:
+        return str(county).replace('_', ' ').title()
+
+
+def listing_document(listing):
+    """Searchable text of a listing (ORM object or row mapping) per weighted field"""
+    get = listing.get if isinstance(listing, dict) else (lambda field: getattr(listing, field))
+    return {
+        'title': get('property_title') or '',
+        'location': f"{get('address') or ''} {_county_name(get('county'))}".strip(),
+        'criteria': get('eligibility_criteria') or ''
+    }
+
+
+def _tsvector(title, location, criteria):
+    parts = {'title': title, 'location': location, 'criteria': criteria}
+    vector = None
+    for name, weight, _ in _WEIGHTS:
+        part = func.setweight(func.to_tsvector(SEARCH_CONFIG, func.coalesce(parts[name], '')), weight)
+        vector = part if vector is None else vector.op('||')(part)
+    return vector
+
+
+# Index maintenance -----------------------------------------------------------
+
+def ensure_search_index(connection):
+    """Create the dialect's search structures if missing (idempotent)"""
+    if connection.dialect.name == 'postgresql':
+        connection.exec_driver_sql(
+            'CREATE INDEX IF NOT EXISTS ix_mortgage_listings_search_vector '
+            'ON mortgage_listings USING gin (search_vector)'
+        )
+    elif connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            f"USING fts5(title, location, criteria, tokenize='porter unicode61')"
+        )
+
+
+def _write_sqlite(connection, listing_id, document):
+    connection.execute(delete(_fts).where(_fts.c.rowid == listing_id))
+    connection.execute(insert(_fts).values(rowid=listing_id, **document))
+
+
+@event.listens_for(_listings, 'after_create')
+def _create_search_index(target, connection, **kw):
+    ensure_search_index(connection)
+
+
+def _search_fields_changed(target):
+    state = inspect(target)
+    return any(state.attrs[field].history.has_changes() for field in SEARCH_FIELDS)
+
+
+def _vectorize(target):
+    document = listing_document(target)
+    target.search_vector = _tsvector(document['title'], document['location'], document['criteria'])
+
+
+@event.listens_for(MortgageListing, 'before_insert')
+def _listing_inserting(mapper, connection, target):
+    if connection.dialect.name == 'postgresql':
+        _vectorize(target)
+
+
+@event.listens_for(MortgageListing, 'before_update')
+def _listing_updating(mapper, connection, target):
+    if connection.dialect.name == 'postgresql' and _search_fields_changed(target):
+        _vectorize(target)
+
+
+@event.listens_for(MortgageListing, 'after_insert')
+def _listing_inserted(mapper, connection, target):
+    if connection.dialect.name == 'sqlite':
+        _write_sqlite(connection, target.id, listing_document(target))
+
+
+@event.listens_for(MortgageListing, 'after_update')
+def _listing_updated(mapper, connection, target):
+    if connection.dialect.name == 'sqlite' and _search_fields_changed(target):
+        _write_sqlite(connection, target.id, listing_document(target))
+
+
+@event.listens_for(MortgageListing, 'after_delete')
+def _listing_deleted(mapper, connection, target):
+    if connection.dialect.name == 'sqlite':
+        connection.execute(delete(_fts).where(_fts.c.rowid == target.id))
+
+
+def rebuild_search_index(connection, full=False, chunk_size=1000):
+    """Index listings missing from the search index (all of them with ``full``)
+
+    Returns the number of listings written. The caller commits.
+    """
+    ensure_search_index(connection)
+    dialect = connection.dialect.name
+    if dialect not in ('postgresql', 'sqlite'):
+        return 0
+
+    query = select(_listings.c.id, *[_listings.c[field] for field in SEARCH_FIELDS])
+    if dialect == 'sqlite':
+        if full:
+            connection.execute(delete(_fts))
+        else:
+            connection.execute(delete(_fts).where(_fts.c.rowid.not_in(select(_listings.c.id))))
+            query = query.where(_listings.c.id.not_in(select(_fts.c.rowid)))
+    elif not full:
+        query = query.where(_listings.c.search_vector.is_(None))
+    write = update(_listings).where(_listings.c.id == bindparam('listing_id')).values(
+        search_vector=_tsvector(bindparam('title'), bindparam('location'), bindparam('criteria'))
+    )
+
+    written = 0
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            query.where(_listings.c.id > last_id).order_by(_listings.c.id).limit(chunk_size)
+        ).mappings().all()
+        if not rows:
+            break
+        if dialect == 'sqlite':
+            connection.execute(insert(_fts), [{'rowid': row['id'], **listing_document(dict(row))} for row in rows])
+        else:
+            connection.execute(write, [{'listing_id': row['id'], **listing_document(dict(row))} for row in rows])
+        written += len(rows)
+        last_id = rows[-1]['id']
+    return written
+
+
+# Querying --------------------------------------------------------------------
+
+def search_listings(terms):
+    """Listing query matching every term as a prefix, with a relevance column
+
+    Returns (query, rank) where query selects (MortgageListing, rank) and rank
+    is higher-is-better. Callers add structured filters, ordering and paging.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        tsquery = func.to_tsquery(SEARCH_CONFIG, literal(' & '.join(f'{term}:*' for term in terms)))
+        rank = func.ts_rank_cd(MortgageListing.search_vector, tsquery).label('rank')
+        query = db.session.query(MortgageListing, rank).filter(MortgageListing.search_vector.op('@@')(tsquery))
+    elif dialect == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        # bm25() is lower-is-better
+        rank = (-func.bm25(literal_column(FTS_TABLE), *[w for _, _, w in _WEIGHTS])).label('rank')
+        query = db.session.query(MortgageListing, rank).join(
+            _fts, _fts.c.rowid == MortgageListing.id
+        ).filter(literal_column(FTS_TABLE).op('MATCH')(match))
+    else:
+        # No full-text support - every term must appear somewhere, unranked
+        rank = literal(0.0).label('rank')
+        query = db.session.query(MortgageListing, rank)
+        for term in terms:
+            pattern = f'%{term}%'
+            query = query.filter(or_(
+                MortgageListing.property_title.ilike(pattern),
+                MortgageListing.address.ilike(pattern),
+                MortgageListing.eligibility_criteria.ilike(pattern)
+            ))
+    return query, rank
@@ -0,0 +1,77 @@
+# NetLend Backend - Streaming Response Helpers
+# Builds chunked JSON responses from row iterators so large admin listings
+# never have to be materialized in worker memory.
+#
+# The first row (for a yield_per query, its first batch) is fetched before
+# the Response is returned, so a failing query still raises inside the view
+# and reaches its error handling. Only a failure in a later batch happens
+# mid-stream, after the 200 has been sent, and cuts the body short.
+
+import itertools
+
+from flask import Response, current_app, request, stream_with_context
+from config import Config
+
+
+def iter_query(query, batch_size=None):
+    """Iterate a query with a yield_per cursor instead of loading .all()"""
+    return query.yield_per(batch_size or Config.STREAM_YIELD_PER)
+
+
+def _prefetch(rows):
+    """Fetch the first row now; returns an iterator over all rows"""
+    rows = iter(rows)
+    for first in rows:
+        return itertools.chain((first,), rows)
+    return iter(())
+
+
+def _identity(row):
+    return row
+
+
+def _json_array_chunks(rows, serialize):
+    """Yield a JSON array one element at a time"""
+    dumps = current_app.json.dumps
+    first = True
+    yield '['
+    for row in rows:
+        if first:
+            first = False
+            yield dumps(serialize(row))
+        else:
+            yield ',' + dumps(serialize(row))
+    yield ']'
+
+
+def _ndjson_chunks(rows, serialize):
+    """Yield one JSON document per line"""
+    dumps = current_app.json.dumps
+    for row in rows:
+        yield dumps(serialize(row)) + '\n'
+
+
+def wants_ndjson():
+    """NDJSON is opt-in via ?format=ndjson or an Accept header"""
+    if request.args.get('format') == 'ndjson':
+        return True
+    return 'application/x-ndjson' in request.headers.get('Accept', '')
+
+
+def stream_json(rows, serialize=None):
+    """Stream rows as a JSON array (default) or NDJSON
+
+    The body of the default JSON array is identical to jsonify(list), so
+    existing clients keep working while memory stays flat for any table size.
+    Query errors up to the first row are raised here, in the calling view.
+    """
+    if serialize is None:
+        serialize = _identity
+    rows = _prefetch(rows)
+    if wants_ndjson():
+        chunks = _ndjson_chunks(rows, serialize)
+        mimetype = 'application/x-ndjson'
+    else:
+        chunks = _json_array_chunks(rows, serialize)
+        mimetype = 'application/json'
+    return Response(stream_with_context(chunks), mimetype=mimetype)